@@ -0,0 +1,172 @@
+"""Keyset (seek) pagination with opaque cursors.
+
+Unlike ``django.core.paginator.Paginator`` this never issues ``COUNT(*)`` or
+``OFFSET``: each page filters on the sort key of the last row seen, so page N
+costs the same as page 1. The ordering must end in a unique field (normally
+``pk``) and its columns (model fields or annotations) must be non-nullable.
+"""
+import base64
+import binascii
+import json
+from datetime import date, datetime, time
+from decimal import Decimal
+from functools import reduce
+from operator import or_
+
+from django.db import connections
+from django.db.models import Q
+
+
+class InvalidCursor(ValueError):
+    pass
+
+
+def _resolve_field(queryset, path):
+    annotation = queryset.query.annotations.get(path)
+    if annotation is not None:
+        return annotation.output_field
+    model = queryset.model
+    field = None
+    for part in path.split("__"):
+        field = model._meta.pk if part == "pk" else model._meta.get_field(part)
+        if field.is_relation:
+            model = field.related_model
+    return field
+
+
+def _value_for(obj, path):
+    for part in path.split("__"):
+        obj = obj[part] if isinstance(obj, dict) else getattr(obj, part)
+    return obj
+
+
+def _dump_value(value):
+    if isinstance(value, (datetime, date, time)):
+        return value.isoformat()
+    if isinstance(value, Decimal):
+        return str(value)
+    return value
+
+
+def approximate_count(queryset):
+    """Planner row estimate on PostgreSQL (no scan); exact count elsewhere."""
+    connection = connections[queryset.db]
+    if connection.vendor != "postgresql":
+        return queryset.count()
+    sql, params = queryset.order_by().query.sql_with_params()
+    with connection.cursor() as cursor:
+        cursor.execute(f"EXPLAIN (FORMAT JSON) {sql}", params)
+        plan = cursor.fetchone()[0]
+    if isinstance(plan, str):
+        plan = json.loads(plan)
+    return int(plan[0]["Plan"]["Plan Rows"])
+
+
+class KeysetPage:
+    def __init__(self, paginator, object_list, next_cursor, previous_cursor, is_first):
+        self.paginator = paginator
+        self.object_list = object_list
+        self.next_cursor = next_cursor
+        self.previous_cursor = previous_cursor
+        self.is_first = is_first
+        self._total = None
+
+    def __iter__(self):
+        return iter(self.object_list)
+
+    def __len__(self):
+        return len(self.object_list)
+
+    @property
+    def has_next(self):
+        return self.next_cursor is not None
+
+    @property
+    def has_previous(self):
+        return self.previous_cursor is not None
+
+    @property
+    def approximate_total(self):
+        """Estimated size of the full result set, computed on first access."""
+        if self._total is None:
+            if self.is_first and not self.has_next:
+                self._total = len(self.object_list)
+            else:
+                self._total = approximate_count(self.paginator.queryset)
+        return self._total
+
+
+class KeysetPaginator:
+    def __init__(self, queryset, ordering, per_page):
+        self.queryset = queryset
+        self.ordering = tuple(ordering)
+        self.per_page = per_page
+        self.fields = [
+            (name.lstrip("-"), name.startswith("-"))
+            for name in self.ordering
+        ]
+
+    def encode_cursor(self, obj, direction):
+        values = [_dump_value(_value_for(obj, name)) for name, _desc in self.fields]
+        payload = json.dumps({"d": direction, "v": values}, separators=(",", ":"))
+        return base64.urlsafe_b64encode(payload.encode("utf-8")).decode("ascii").rstrip("=")
+
+    def decode_cursor(self, cursor):
+        try:
+            raw = base64.urlsafe_b64decode(cursor + "=" * (-len(cursor) % 4))
+            data = json.loads(raw.decode("utf-8"))
+            direction, values = data["d"], data["v"]
+        except (binascii.Error, ValueError, UnicodeDecodeError, KeyError, TypeError):
+            raise InvalidCursor("Malformed cursor.")
+        if direction not in ("n", "p") or not isinstance(values, list) or len(values) != len(self.fields):
+            raise InvalidCursor("Cursor does not match this ordering.")
+        try:
+            values = [
+                _resolve_field(self.queryset, name).to_python(value)
+                for (name, _desc), value in zip(self.fields, values)
+            ]
+        except Exception:
+            raise InvalidCursor("Cursor does not match this ordering.")
+        return direction, values
+
+    def _seek(self, values, backwards):
+        clauses = []
+        equal = {}
+        for (name, descending), value in zip(self.fields, values):
+            lookup = "gt" if descending == backwards else "lt"
+            clauses.append(Q(**equal, **{f"{name}__{lookup}": value}))
+            equal[name] = value
+        return reduce(or_, clauses)
+
+    def get_page(self, cursor=None):
+        """Return the page after (or before) ``cursor``; invalid cursors restart at page 1."""
+        direction, values = "n", None
+        if cursor:
+            try:
+                direction, values = self.decode_cursor(cursor)
+            except InvalidCursor:
+                direction, values = "n", None
+
+        backwards = direction == "p"
+        queryset = self.queryset
+        if values is not None:
+            queryset = queryset.filter(self._seek(values, backwards))
+        ordering = self.ordering
+        if backwards:
+            ordering = tuple(name[1:] if name.startswith("-") else f"-{name}" for name in ordering)
+
+        rows = list(queryset.order_by(*ordering)[:self.per_page + 1])
+        has_more = len(rows) > self.per_page
+        rows = rows[:self.per_page]
+        if backwards:
+            rows.reverse()
+
+        has_next = has_more if not backwards else True
+        has_previous = values is not None if not backwards else has_more
+        return KeysetPage(
+            self,
+            rows,
+            next_cursor=self.encode_cursor(rows[-1], "n") if rows and has_next else None,
+            previous_cursor=self.encode_cursor(rows[0], "p") if rows and has_previous else None,
+            is_first=values is None,
+        )
@@ -148,6 +148,28 @@ DATABASES = {
 
 
 
+# Cache
+# Cache versions, slot events and locks must be seen by every worker, so
+# deployments use Redis (REDIS_URL, set by docker-compose). Without it each
+# process falls back to its own memory, which is only right for a single
+# development server.
+REDIS_URL = os.getenv("REDIS_URL", "")
+if REDIS_URL:
+    CACHES = {
+        "default": {
+            "BACKEND": "django.core.cache.backends.redis.RedisCache",
+            "LOCATION": REDIS_URL,
+        }
+    }
+else:
+    CACHES = {
+        "default": {
+            "BACKEND": os.getenv("CACHE_BACKEND", "django.core.cache.backends.locmem.LocMemCache"),
+            "LOCATION": os.getenv("CACHE_LOCATION", ""),
+        }
+    }
+
+
 # Password validation
 # https://docs.djangoproject.com/en/5.2/ref/settings/#auth-password-validators
 
@@ -220,3 +242,14 @@ MEDIA_ROOT = os.environ.get('MEDIA_ROOT', os.path.join(BASE_DIR, 'media'))
 # Razorpay Configuration
 RAZORPAY_KEY_ID = os.environ.get('RAZORPAY_KEY_ID', 'rzp_test_Rk4le8jnciq2ov')
 RAZORPAY_KEY_SECRET = os.environ.get('RAZORPAY_KEY_SECRET', '4bxhNDkPIANWjI9sdwPKesFO')
+# Webhook secret set in the Razorpay dashboard; webhooks are rejected while it is empty.
+RAZORPAY_WEBHOOK_SECRET = os.environ.get('RAZORPAY_WEBHOOK_SECRET', '')
+# Gateway client: seconds to connect / wait for a response, retries for idempotent
+# calls, pooled keep-alive connections per worker, and the circuit breaker's
+# consecutive-failure threshold and seconds to stay open.
+RAZORPAY_CONNECT_TIMEOUT = float(os.environ.get('RAZORPAY_CONNECT_TIMEOUT', '3.05'))
+RAZORPAY_READ_TIMEOUT = float(os.environ.get('RAZORPAY_READ_TIMEOUT', '10'))
+RAZORPAY_MAX_RETRIES = int(os.environ.get('RAZORPAY_MAX_RETRIES', '2'))
+RAZORPAY_POOL_SIZE = int(os.environ.get('RAZORPAY_POOL_SIZE', '10'))
+RAZORPAY_BREAKER_THRESHOLD = int(os.environ.get('RAZORPAY_BREAKER_THRESHOLD', '5'))
+RAZORPAY_BREAKER_COOLDOWN = float(os.environ.get('RAZORPAY_BREAKER_COOLDOWN', '30'))
@@ -13,6 +13,10 @@ from .models import (
     Language, AgeGroup, Certification, EmailVerification, 
     BackgroundVerification, Review
 )
+from .review_stats import (
+    apply_review_deltas, deltas_for, record_review_change, review_state, reviews_changed
+)
+from django.db import transaction
 from django.utils import timezone
 
 
@@ -499,24 +503,63 @@ class ReviewAdmin(admin.ModelAdmin):
     actions = ['verify_reviews', 'unverify_reviews', 'publish_reviews', 'unpublish_reviews']
     
     def verify_reviews(self, request, queryset):
+        counsellor_ids = list(queryset.values_list('counsellor_id', flat=True))
         updated = queryset.update(is_verified=True)
+        reviews_changed(counsellor_ids)
         self.message_user(request, f'{updated} review(s) marked as verified.')
     verify_reviews.short_description = "Mark selected reviews as verified"
     
     def unverify_reviews(self, request, queryset):
+        counsellor_ids = list(queryset.values_list('counsellor_id', flat=True))
         updated = queryset.update(is_verified=False)
+        reviews_changed(counsellor_ids)
         self.message_user(request, f'{updated} review(s) marked as unverified.')
     unverify_reviews.short_description = "Mark selected reviews as unverified"
     
     def publish_reviews(self, request, queryset):
-        updated = queryset.update(is_published=True)
+        with transaction.atomic():
+            # Only reviews that actually change state move the stats
+            deltas = deltas_for(queryset.filter(is_published=False).select_for_update(), 1)
+            updated = queryset.update(is_published=True)
+            for counsellor_id, counsellor_deltas in deltas.items():
+                apply_review_deltas(counsellor_id, counsellor_deltas)
         self.message_user(request, f'{updated} review(s) published.')
     publish_reviews.short_description = "Publish selected reviews"
     
     def unpublish_reviews(self, request, queryset):
-        updated = queryset.update(is_published=False)
+        with transaction.atomic():
+            deltas = deltas_for(queryset.filter(is_published=True).select_for_update(), -1)
+            updated = queryset.update(is_published=False)
+            for counsellor_id, counsellor_deltas in deltas.items():
+                apply_review_deltas(counsellor_id, counsellor_deltas)
         self.message_user(request, f'{updated} review(s) unpublished.')
     unpublish_reviews.short_description = "Unpublish selected reviews"
+    
+    # Edits from the change form and list_editable keep the stats in step too
+    def save_model(self, request, obj, form, change):
+        with transaction.atomic():
+            before = None
+            if change:
+                previous = Review.objects.select_for_update().filter(pk=obj.pk).first()
+                before = review_state(previous) if previous else None
+            super().save_model(request, obj, form, change)
+            record_review_change(before, review_state(obj))
+    
+    def delete_model(self, request, obj):
+        with transaction.atomic():
+            previous = Review.objects.select_for_update().filter(pk=obj.pk).first()
+            if previous is None:
+                return
+            before = review_state(previous)
+            super().delete_model(request, obj)
+            record_review_change(before)
+    
+    def delete_queryset(self, request, queryset):
+        with transaction.atomic():
+            deltas = deltas_for(queryset.filter(is_published=True).select_for_update(), -1)
+            super().delete_queryset(request, queryset)
+            for counsellor_id, counsellor_deltas in deltas.items():
+                apply_review_deltas(counsellor_id, counsellor_deltas)
 
 
 admin.site.register(Review, ReviewAdmin)
@@ -0,0 +1,11 @@
+from django.core.management.base import BaseCommand
+
+from accounts.review_stats import rebuild_review_stats
+
+
+class Command(BaseCommand):
+    help = "Recompute every counsellor's review statistics from the reviews table."
+
+    def handle(self, *args, **options):
+        total = rebuild_review_stats()
+        self.stdout.write(self.style.SUCCESS(f"Rebuilt review stats for {total} counsellor(s)."))
@@ -1,9 +1,16 @@
+from datetime import datetime, timezone as dt_timezone
+
 from django.db import models
+from django.db.models.functions import Coalesce
 from django.contrib.auth.models import AbstractUser
 from django.core.validators import MinValueValidator, MaxValueValidator
 from django.utils import timezone
 import os
 
+# Sort key for counsellors with no known opening: after everyone else, since
+# keyset cursors need a non-null value in every ordering column.
+NO_OPENING = datetime(9999, 1, 1, tzinfo=dt_timezone.utc)
+
 
 
 # Custom user model extending AbstractUser
@@ -237,6 +244,9 @@ class Counsellor(models.Model):
     available_to = models.TimeField(default='18:00:00')
     default_session_duration = models.PositiveIntegerField(default=45)
     default_break_duration = models.PositiveIntegerField(default=5)
+    # Denormalized from CounsellorAvailability (see therapists.availability)
+    next_available_at = models.DateTimeField(null=True, blank=True)
+    free_slots_next_7_days = models.PositiveIntegerField(default=0)
     
     created_at = models.DateTimeField(auto_now_add=True)
     updated_at = models.DateTimeField(auto_now=True)
@@ -268,6 +278,19 @@ class Counsellor(models.Model):
     
     class Meta:
         db_table = 'counsellors'
+        # Back the directory sort orders (each ends in the primary key for keyset paging)
+        indexes = [
+            models.Index(fields=['session_fee', 'user']),
+            models.Index(fields=['rating', 'user']),
+            models.Index(fields=['years_experience', 'user']),
+            models.Index(fields=['created_at', 'user']),
+            models.Index(fields=['next_available_at', 'user']),
+            # The "soonest" sort orders by this expression, so it needs its own index.
+            models.Index(
+                Coalesce('next_available_at', models.Value(NO_OPENING)), 'user',
+                name='counsellors_next_opening_idx',
+            ),
+        ]
 
 
 
@@ -394,4 +417,38 @@ class Review(models.Model):
         indexes = [
             models.Index(fields=['counsellor', '-created_at']),
             models.Index(fields=['rating']),
-        ]
\ No newline at end of file
+        ]
+
+# Published-review aggregates per counsellor, kept current with atomic deltas
+# (see accounts/review_stats.py) so profile pages read one row.
+class ReviewStats(models.Model):
+    counsellor = models.OneToOneField(Counsellor, on_delete=models.CASCADE, primary_key=True, related_name='review_stats')
+    review_count = models.PositiveIntegerField(default=0)
+    rating_sum = models.PositiveIntegerField(default=0)
+    average_rating = models.DecimalField(max_digits=3, decimal_places=2, default=0.00)
+
+    # Histogram buckets
+    rating_1 = models.PositiveIntegerField(default=0)
+    rating_2 = models.PositiveIntegerField(default=0)
+    rating_3 = models.PositiveIntegerField(default=0)
+    rating_4 = models.PositiveIntegerField(default=0)
+    rating_5 = models.PositiveIntegerField(default=0)
+
+    updated_at = models.DateTimeField(auto_now=True)
+
+    def __str__(self):
+        return f"{self.counsellor.user.get_full_name()} - {self.review_count} reviews ({self.average_rating})"
+
+    def distribution(self):
+        """Review count per star rating, highest first."""
+        return {rating: getattr(self, f'rating_{rating}') for rating in (5, 4, 3, 2, 1)}
+
+    def percentages(self):
+        return {
+            rating: round(count / self.review_count * 100) if self.review_count else 0
+            for rating, count in self.distribution().items()
+        }
+
+    class Meta:
+        db_table = 'review_stats'
+        verbose_name_plural = 'Review stats'
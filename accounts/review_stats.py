@@ -0,0 +1,189 @@
+"""Incremental maintenance of ``ReviewStats``.
+
+Every write that changes which published reviews a counsellor has (or their
+ratings) passes the difference here as ``{rating: +/-n}`` deltas. They are
+applied with a single ``F()`` UPDATE, so concurrent writers never lose counts,
+and mirrored onto ``Counsellor.rating`` / ``total_reviews`` in the same
+transaction. A missing stats row is rebuilt from the reviews table instead.
+
+Each counsellor also has a reviews version in the cache, bumped on commit of
+any review write, which profile page caches use as part of their key.
+"""
+import time
+from collections import Counter, defaultdict
+from decimal import Decimal
+
+from django.core.cache import cache
+from django.db import transaction
+from django.db.models import Count, DecimalField, F, FloatField, OuterRef, Q, Subquery, Sum, Value
+from django.db.models.functions import Cast, Coalesce, NullIf
+from django.dispatch import Signal
+from django.utils import timezone
+
+from .models import Counsellor, Review, ReviewStats
+
+RATINGS = (1, 2, 3, 4, 5)
+
+REVIEWS_VERSION_KEY = 'accounts:reviews:version:{}'
+
+# Sent with ``counsellor_ids`` after ratings shown in the directory change.
+review_stats_changed = Signal()
+
+
+def reviews_version(counsellor_id):
+    key = REVIEWS_VERSION_KEY.format(counsellor_id)
+    version = cache.get(key)
+    if version is None:
+        cache.add(key, time.time_ns(), None)
+        version = cache.get(key, 0)
+    return version
+
+
+def bump_reviews_version(counsellor_ids):
+    for counsellor_id in set(counsellor_ids):
+        key = REVIEWS_VERSION_KEY.format(counsellor_id)
+        try:
+            cache.incr(key)
+        except ValueError:
+            cache.set(key, time.time_ns(), None)
+
+
+def reviews_changed(counsellor_ids):
+    """Retire cached review data for the given counsellors once the transaction commits."""
+    counsellor_ids = set(counsellor_ids)
+    if counsellor_ids:
+        transaction.on_commit(lambda: bump_reviews_version(counsellor_ids))
+
+
+def review_state(review):
+    """What of a review counts towards stats: (counsellor id, rating, is published)."""
+    return (review.counsellor_id, review.rating, review.is_published)
+
+
+def record_review_change(before=None, after=None):
+    """Apply the stats change for one review going from state ``before`` to ``after``.
+
+    States come from ``review_state``; None means the review did not (or no longer) exist.
+    """
+    deltas = defaultdict(Counter)
+    if before is not None and before[2]:
+        deltas[before[0]][before[1]] -= 1
+    if after is not None and after[2]:
+        deltas[after[0]][after[1]] += 1
+    for counsellor_id, counsellor_deltas in deltas.items():
+        apply_review_deltas(counsellor_id, counsellor_deltas)
+
+
+def deltas_for(reviews, sign):
+    """Per-counsellor deltas for adding (sign=1) or removing (sign=-1) published ``reviews``."""
+    by_counsellor = defaultdict(Counter)
+    for counsellor_id, rating in reviews.values_list('counsellor_id', 'rating'):
+        by_counsellor[counsellor_id][rating] += sign
+    return by_counsellor
+
+
+def _sync_counsellors(counsellor_ids):
+    """Copy the average and count onto the counsellor rows that are out of date."""
+    stats = ReviewStats.objects.filter(counsellor_id=OuterRef('pk'))
+    average = Subquery(stats.values('average_rating')[:1])
+    count = Subquery(stats.values('review_count')[:1])
+    stale_ids = list(
+        Counsellor.objects.filter(pk__in=counsellor_ids)
+        .exclude(rating=average, total_reviews=count)
+        .values_list('pk', flat=True)
+    )
+    if not stale_ids:
+        return
+    Counsellor.objects.filter(pk__in=stale_ids).update(rating=average, total_reviews=count)
+    transaction.on_commit(lambda: review_stats_changed.send(sender=ReviewStats, counsellor_ids=stale_ids))
+
+
+def apply_review_deltas(counsellor_id, deltas):
+    """Shift one counsellor's stats by ``deltas`` ({rating: change in published reviews})."""
+    deltas = {rating: change for rating, change in deltas.items() if change}
+    if not deltas:
+        return
+
+    count_change = sum(deltas.values())
+    sum_change = sum(rating * change for rating, change in deltas.items())
+    reviews_changed([counsellor_id])
+    with transaction.atomic():
+        # F() refers to the pre-update values, so the average uses the new totals explicitly.
+        updated = ReviewStats.objects.filter(counsellor_id=counsellor_id).update(
+            review_count=F('review_count') + count_change,
+            rating_sum=F('rating_sum') + sum_change,
+            average_rating=Coalesce(
+                Cast(F('rating_sum') + sum_change, FloatField())
+                / NullIf(F('review_count') + count_change, 0),
+                Value(0.0),
+                output_field=DecimalField(max_digits=3, decimal_places=2),
+            ),
+            **{f'rating_{rating}': F(f'rating_{rating}') + change for rating, change in deltas.items()},
+        )
+        if not updated:
+            rebuild_review_stats([counsellor_id])
+            return
+        _sync_counsellors([counsellor_id])
+
+
+def rebuild_review_stats(counsellor_ids=None):
+    """Recompute stats from the reviews table; all counsellors when ``counsellor_ids`` is None.
+
+    Missing rows are inserted first (a concurrent insert is ignored, not an
+    error) and every row is locked before the reviews are counted, so deltas
+    applied by concurrent writers land either in the count or on top of it.
+    """
+    counsellors = Counsellor.objects.all()
+    if counsellor_ids is not None:
+        counsellors = counsellors.filter(pk__in=counsellor_ids)
+    counsellor_ids = list(counsellors.order_by('pk').values_list('pk', flat=True))
+
+    with transaction.atomic():
+        ReviewStats.objects.bulk_create(
+            [ReviewStats(counsellor_id=counsellor_id) for counsellor_id in counsellor_ids],
+            ignore_conflicts=True,
+        )
+        stats = list(
+            ReviewStats.objects.select_for_update().filter(counsellor_id__in=counsellor_ids).order_by('pk')
+        )
+
+        published = Review.objects.filter(counsellor_id__in=counsellor_ids, is_published=True).order_by()
+        totals = {
+            row['counsellor_id']: row
+            for row in published.values('counsellor_id').annotate(
+                review_count=Count('id'),
+                rating_sum=Sum('rating'),
+                **{f'rating_{rating}': Count('id', filter=Q(rating=rating)) for rating in RATINGS},
+            )
+        }
+
+        now = timezone.now()
+        for row_stats in stats:
+            row = totals.get(row_stats.counsellor_id, {})
+            row_stats.review_count = row.get('review_count', 0)
+            row_stats.rating_sum = row.get('rating_sum') or 0
+            row_stats.average_rating = (
+                round(Decimal(row_stats.rating_sum) / row_stats.review_count, 2)
+                if row_stats.review_count else Decimal('0.00')
+            )
+            for rating in RATINGS:
+                setattr(row_stats, f'rating_{rating}', row.get(f'rating_{rating}', 0))
+            # bulk_update skips auto_now.
+            row_stats.updated_at = now
+        ReviewStats.objects.bulk_update(
+            stats,
+            ['review_count', 'rating_sum', 'average_rating', *[f'rating_{rating}' for rating in RATINGS], 'updated_at'],
+            batch_size=500,
+        )
+        if counsellor_ids:
+            _sync_counsellors(counsellor_ids)
+    return len(counsellor_ids)
+
+
+def get_review_stats(counsellor):
+    """The counsellor's stats row, built on first access."""
+    try:
+        return ReviewStats.objects.get(counsellor=counsellor)
+    except ReviewStats.DoesNotExist:
+        rebuild_review_stats([counsellor.pk])
+        return ReviewStats.objects.get(counsellor=counsellor)
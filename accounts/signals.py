@@ -0,0 +1,26 @@
+"""Cache invalidation hooks for account-level reference data."""
+from django.db import transaction
+from django.db.models.signals import post_delete, post_save
+from django.dispatch import receiver
+
+from .models import AgeGroup, Language, Review, Specialization, TherapyApproach
+from .review_stats import reviews_changed
+from .taxonomy import bump_taxonomy_version
+
+
+@receiver(post_save, sender=Specialization)
+@receiver(post_save, sender=TherapyApproach)
+@receiver(post_save, sender=Language)
+@receiver(post_save, sender=AgeGroup)
+@receiver(post_delete, sender=Specialization)
+@receiver(post_delete, sender=TherapyApproach)
+@receiver(post_delete, sender=Language)
+@receiver(post_delete, sender=AgeGroup)
+def taxonomy_changed(sender, **kwargs):
+    transaction.on_commit(bump_taxonomy_version)
+
+
+@receiver(post_save, sender=Review)
+@receiver(post_delete, sender=Review)
+def review_changed(sender, instance, **kwargs):
+    reviews_changed([instance.counsellor_id])
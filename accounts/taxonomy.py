@@ -0,0 +1,94 @@
+"""Process-local registry of the counsellor taxonomy tables.
+
+Specializations, therapy approaches, languages and age groups almost never
+change, yet the directory dropdowns and counsellor registration looked them up
+on every request. Each worker keeps an in-memory copy of all four tables and
+only reloads it when the shared version key moves; saves and deletes bump that
+key on commit, so the other workers pick the change up on their next lookup.
+"""
+import threading
+import time
+from collections import namedtuple
+
+from django.core.cache import cache
+
+from .models import AgeGroup, Language, Specialization, TherapyApproach
+
+TAXONOMY_VERSION_KEY = "accounts:taxonomy:version"
+TAXONOMY_MODELS = (Specialization, TherapyApproach, Language, AgeGroup)
+
+TaxonomyEntry = namedtuple("TaxonomyEntry", ["id", "name", "is_active", "min_age", "max_age"])
+
+
+def taxonomy_version():
+    version = cache.get(TAXONOMY_VERSION_KEY)
+    if version is None:
+        cache.add(TAXONOMY_VERSION_KEY, time.time_ns(), None)
+        version = cache.get(TAXONOMY_VERSION_KEY, 0)
+    return version
+
+
+def bump_taxonomy_version():
+    try:
+        cache.incr(TAXONOMY_VERSION_KEY)
+    except ValueError:
+        cache.set(TAXONOMY_VERSION_KEY, time.time_ns(), None)
+
+
+class TaxonomyRegistry:
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._version = None
+        self._tables = {}
+
+    def _load(self, model):
+        fields = ["id", "name", "is_active"]
+        if model is AgeGroup:
+            fields += ["min_age", "max_age"]
+        entries = []
+        for row in model.objects.order_by("name").values(*fields):
+            entries.append(TaxonomyEntry(
+                id=row["id"],
+                name=row["name"],
+                is_active=row["is_active"],
+                min_age=row.get("min_age"),
+                max_age=row.get("max_age"),
+            ))
+        return {
+            "entries": entries,
+            "by_id": {entry.id: entry for entry in entries},
+            "by_name": {entry.name: entry for entry in entries},
+        }
+
+    def _table(self, model):
+        version = taxonomy_version()
+        if version != self._version:
+            with self._lock:
+                if version != self._version:
+                    self._tables = {model: self._load(model) for model in TAXONOMY_MODELS}
+                    self._version = version
+        return self._tables[model]
+
+    def active(self, model):
+        """Active rows of a taxonomy table, ordered by name."""
+        return [entry for entry in self._table(model)["entries"] if entry.is_active]
+
+    def get(self, model, pk):
+        return self._table(model)["by_id"].get(pk)
+
+    def id_for(self, model, name):
+        entry = self._table(model)["by_name"].get(name)
+        return entry.id if entry else None
+
+    def name_for(self, model, pk):
+        entry = self.get(model, pk)
+        return entry.name if entry else None
+
+    def name_to_id(self, model):
+        return {name: entry.id for name, entry in self._table(model)["by_name"].items()}
+
+    def id_to_name(self, model):
+        return {pk: entry.name for pk, entry in self._table(model)["by_id"].items()}
+
+
+registry = TaxonomyRegistry()
@@ -23,6 +23,7 @@ from .models import (
     Language, AgeGroup, Certification, EmailVerification, 
     BackgroundVerification
 )
+from .taxonomy import registry as taxonomy
 from django.contrib.admin.views.decorators import staff_member_required
 from django.contrib import messages
 from django.shortcuts import get_object_or_404, redirect
@@ -444,55 +445,74 @@ def create_counsellor_profile(user, request):
 def add_many_to_many_relationships(counsellor, request):
     """Add specializations, approaches, languages, and age groups to counsellor"""
     
+    # Names are resolved through the in-memory taxonomy registry; only names
+    # that do not exist yet cost a query (to create them).
+
     # Specializations
-    specialization_names = request.POST.getlist('specializations')
-    for spec_name in specialization_names:
-        specialization, created = Specialization.objects.get_or_create(
-            name=spec_name,
-            defaults={'description': f'Specialization in {spec_name}'}
-        )
-        counsellor.specializations.add(specialization)
+    specialization_ids = []
+    for spec_name in request.POST.getlist('specializations'):
+        spec_id = taxonomy.id_for(Specialization, spec_name)
+        if spec_id is None:
+            spec_id = Specialization.objects.get_or_create(
+                name=spec_name,
+                defaults={'description': f'Specialization in {spec_name}'}
+            )[0].id
+        specialization_ids.append(spec_id)
+    if specialization_ids:
+        counsellor.specializations.add(*specialization_ids)
     
     # Therapy approaches
-    approach_names = request.POST.getlist('therapy_approaches')
-    for approach_name in approach_names:
-        approach, created = TherapyApproach.objects.get_or_create(
-            name=approach_name,
-            defaults={'description': f'{approach_name} therapy approach'}
-        )
-        counsellor.therapy_approaches.add(approach)
+    approach_ids = []
+    for approach_name in request.POST.getlist('therapy_approaches'):
+        approach_id = taxonomy.id_for(TherapyApproach, approach_name)
+        if approach_id is None:
+            approach_id = TherapyApproach.objects.get_or_create(
+                name=approach_name,
+                defaults={'description': f'{approach_name} therapy approach'}
+            )[0].id
+        approach_ids.append(approach_id)
+    if approach_ids:
+        counsellor.therapy_approaches.add(*approach_ids)
     
     # Languages
-    language_names = request.POST.getlist('languages')
-    for lang_name in language_names:
-        language, created = Language.objects.get_or_create(
-            name=lang_name,
-            defaults={'code': lang_name[:3].upper()}
-        )
-        counsellor.languages.add(language)
+    language_ids = []
+    for lang_name in request.POST.getlist('languages'):
+        language_id = taxonomy.id_for(Language, lang_name)
+        if language_id is None:
+            language_id = Language.objects.get_or_create(
+                name=lang_name,
+                defaults={'code': lang_name[:3].upper()}
+            )[0].id
+        language_ids.append(language_id)
+    if language_ids:
+        counsellor.languages.add(*language_ids)
     
     # Age groups
-    age_group_names = request.POST.getlist('age_groups')
-    for age_group_name in age_group_names:
-        # Map age group names to predefined age ranges
-        age_group_map = {
-            'Children': ('Children', 6, 12),
-            'Adolescents': ('Adolescents', 13, 17),
-            'Adults': ('Adults', 18, 64),
-            'Seniors': ('Seniors', 65, 100)
-        }
-        
-        if age_group_name in age_group_map:
-            name, min_age, max_age = age_group_map[age_group_name]
-            age_group, created = AgeGroup.objects.get_or_create(
+    # Map age group names to predefined age ranges
+    age_group_map = {
+        'Children': ('Children', 6, 12),
+        'Adolescents': ('Adolescents', 13, 17),
+        'Adults': ('Adults', 18, 64),
+        'Seniors': ('Seniors', 65, 100)
+    }
+    age_group_ids = []
+    for age_group_name in request.POST.getlist('age_groups'):
+        if age_group_name not in age_group_map:
+            continue
+        name, min_age, max_age = age_group_map[age_group_name]
+        age_group_id = taxonomy.id_for(AgeGroup, name)
+        if age_group_id is None:
+            age_group_id = AgeGroup.objects.get_or_create(
                 name=name,
                 defaults={
                     'min_age': min_age,
                     'max_age': max_age,
                     'description': f'{name} age group'
                 }
-            )
-            counsellor.age_groups.add(age_group)
+            )[0].id
+        age_group_ids.append(age_group_id)
+    if age_group_ids:
+        counsellor.age_groups.add(*age_group_ids)
 
 
 
@@ -1,6 +1,7 @@
 from django.contrib import admin
+from django.utils import timezone
 
-from .models import Booking, Payment
+from .models import Booking, Payment, PaymentEvent
 
 
 @admin.register(Booking)
@@ -39,3 +40,21 @@ class PaymentAdmin(admin.ModelAdmin):
     list_filter = ('status', 'payment_method', 'created_at')
     search_fields = ('payment_id', 'booking__booking_reference', 'razorpay_order_id')
 
+
+@admin.register(PaymentEvent)
+class PaymentEventAdmin(admin.ModelAdmin):
+    list_display = ('event_id', 'event_type', 'status', 'attempts', 'next_attempt_at', 'received_at', 'processed_at')
+    list_filter = ('status', 'event_type', 'received_at')
+    search_fields = ('event_id', 'last_error')
+    readonly_fields = ('event_id', 'event_type', 'payload', 'received_at', 'processed_at')
+    ordering = ('-received_at',)
+    actions = ['requeue']
+
+    @admin.action(description='Requeue selected events for the payment event worker')
+    def requeue(self, request, queryset):
+        updated = queryset.exclude(status=PaymentEvent.STATUS_PENDING).update(
+            status=PaymentEvent.STATUS_PENDING,
+            attempts=0,
+            next_attempt_at=timezone.now(),
+        )
+        self.message_user(request, f'Requeued {updated} event(s).')
@@ -0,0 +1,273 @@
+"""Shared Razorpay client with connection pooling, timeouts, retries and a circuit breaker.
+
+Every worker process builds one ``RazorpayGateway`` on first use. It wraps one
+``razorpay.Client`` whose ``requests`` session keeps connections to the gateway
+alive between calls and applies a connect and read timeout to every request.
+Calls that are safe to repeat (fetches) are retried a few times with jittered
+backoff. Order creation is retried only when the connection was never made, so
+a retry cannot create a second order.
+
+Timeouts, connection errors, gateway 5xx responses and any other unexpected
+error (such as an unreadable response) count as failures. After
+``RAZORPAY_BREAKER_THRESHOLD`` failures in a row the breaker opens and calls
+fail fast with ``GatewayUnavailable`` for ``RAZORPAY_BREAKER_COOLDOWN``
+seconds. After that one trial call is let through: success closes the breaker
+and failure opens it again. Request errors (4xx) mean the gateway is healthy
+and do not count.
+
+Each operation records its call count, error count and latency histogram in
+this process; ``metrics()`` returns a snapshot of them.
+"""
+import random
+import threading
+import time
+
+import razorpay
+import requests
+from django.conf import settings
+from requests.adapters import HTTPAdapter
+
+# Upper bounds, in milliseconds, of the latency histogram buckets; the last one is open-ended.
+LATENCY_BUCKETS_MS = (50, 100, 250, 500, 1000, 2500, 5000, 10000)
+
+CLOSED = 'closed'
+OPEN = 'open'
+HALF_OPEN = 'half_open'
+
+
+class GatewayError(Exception):
+    """The gateway could not be reached or timed out."""
+
+
+class GatewayUnavailable(GatewayError):
+    """The circuit breaker is open; the call was not attempted."""
+
+
+def _setting(name, default):
+    return getattr(settings, name, default)
+
+
+class _TimeoutSession(requests.Session):
+    """Session that applies a default (connect, read) timeout to every request."""
+
+    def __init__(self, timeout):
+        super().__init__()
+        self.timeout = timeout
+
+    def request(self, method, url, **kwargs):
+        kwargs.setdefault('timeout', self.timeout)
+        return super().request(method, url, **kwargs)
+
+
+class CircuitBreaker:
+    def __init__(self, threshold, cooldown):
+        self.threshold = threshold
+        self.cooldown = cooldown
+        self.state = CLOSED
+        self.failures = 0
+        self.opened_at = 0.0
+        self._trial_running = False
+        self._lock = threading.Lock()
+
+    def allow(self):
+        """Whether a call may go out now; in the half-open state only one trial call may."""
+        with self._lock:
+            if self.state == OPEN and time.monotonic() - self.opened_at >= self.cooldown:
+                self.state = HALF_OPEN
+                self._trial_running = False
+            if self.state == CLOSED:
+                return True
+            if self.state == HALF_OPEN and not self._trial_running:
+                self._trial_running = True
+                return True
+            return False
+
+    def record_success(self):
+        with self._lock:
+            self.state = CLOSED
+            self.failures = 0
+            self._trial_running = False
+
+    def record_failure(self):
+        with self._lock:
+            self.failures += 1
+            if self.state == HALF_OPEN or self.failures >= self.threshold:
+                self.state = OPEN
+                self.opened_at = time.monotonic()
+            self._trial_running = False
+
+    def record_neutral(self):
+        """End a call that says nothing about the gateway's health, e.g. a 4xx response."""
+        with self._lock:
+            self._trial_running = False
+
+
+class OperationMetrics:
+    def __init__(self):
+        self.calls = 0
+        self.errors = 0
+        self.rejected = 0
+        self.retries = 0
+        self.total_ms = 0.0
+        self.max_ms = 0.0
+        self.buckets = [0] * (len(LATENCY_BUCKETS_MS) + 1)
+
+    def observe(self, elapsed_ms, failed):
+        self.calls += 1
+        if failed:
+            self.errors += 1
+        self.total_ms += elapsed_ms
+        self.max_ms = max(self.max_ms, elapsed_ms)
+        for index, bound in enumerate(LATENCY_BUCKETS_MS):
+            if elapsed_ms <= bound:
+                self.buckets[index] += 1
+                break
+        else:
+            self.buckets[-1] += 1
+
+    def percentile(self, fraction):
+        """Upper bound of the bucket holding the given fraction of calls (None above the last bound)."""
+        if not self.calls:
+            return None
+        target = fraction * self.calls
+        seen = 0
+        for index, count in enumerate(self.buckets):
+            seen += count
+            if seen >= target:
+                return LATENCY_BUCKETS_MS[index] if index < len(LATENCY_BUCKETS_MS) else None
+        return None
+
+    def snapshot(self):
+        return {
+            'calls': self.calls,
+            'errors': self.errors,
+            'rejected': self.rejected,
+            'retries': self.retries,
+            'error_rate': round(self.errors / self.calls, 4) if self.calls else 0.0,
+            'avg_ms': round(self.total_ms / self.calls, 1) if self.calls else None,
+            'max_ms': round(self.max_ms, 1),
+            'p50_ms': self.percentile(0.5),
+            'p95_ms': self.percentile(0.95),
+            'p99_ms': self.percentile(0.99),
+            'histogram_ms': dict(zip([str(bound) for bound in LATENCY_BUCKETS_MS] + ['inf'], self.buckets)),
+        }
+
+
+class RazorpayGateway:
+    def __init__(self, key_id, key_secret, connect_timeout, read_timeout, max_retries, pool_size,
+                 breaker_threshold, breaker_cooldown):
+        session = _TimeoutSession((connect_timeout, read_timeout))
+        adapter = HTTPAdapter(pool_connections=1, pool_maxsize=pool_size)
+        session.mount('https://', adapter)
+        session.mount('http://', adapter)
+        self.client = razorpay.Client(session=session, auth=(key_id, key_secret))
+        self.max_retries = max_retries
+        self.breaker = CircuitBreaker(breaker_threshold, breaker_cooldown)
+        self._metrics = {}
+        self._metrics_lock = threading.Lock()
+
+    def _operation(self, name):
+        with self._metrics_lock:
+            return self._metrics.setdefault(name, OperationMetrics())
+
+    def _call(self, name, func, idempotent):
+        metrics = self._operation(name)
+        attempt = 0
+        while True:
+            if not self.breaker.allow():
+                with self._metrics_lock:
+                    metrics.rejected += 1
+                raise GatewayUnavailable('Payment gateway is temporarily unavailable.')
+
+            started = time.monotonic()
+            try:
+                result = func()
+            except razorpay.errors.BadRequestError:
+                self._observe(metrics, started, failed=False)
+                self.breaker.record_neutral()
+                raise
+            except (requests.Timeout, requests.ConnectionError, razorpay.errors.ServerError,
+                    razorpay.errors.GatewayError) as exc:
+                self._observe(metrics, started, failed=True)
+                self.breaker.record_failure()
+                # A request that never connected was never seen by the gateway and is safe to resend.
+                retryable = idempotent or isinstance(exc, requests.ConnectTimeout)
+                if not retryable or attempt >= self.max_retries:
+                    if isinstance(exc, requests.RequestException):
+                        raise GatewayError(f'{name} failed: {exc}') from exc
+                    raise
+                attempt += 1
+                with self._metrics_lock:
+                    metrics.retries += 1
+                # Full jitter: a random wait up to 0.1s, 0.2s, 0.4s, ... so retries from many workers spread out.
+                time.sleep(random.uniform(0, 0.1 * 2 ** (attempt - 1)))
+                continue
+            except Exception:
+                # Anything else (e.g. an unreadable response body) still ends the call, so a
+                # half-open trial cannot stay marked as running.
+                self._observe(metrics, started, failed=True)
+                self.breaker.record_failure()
+                raise
+            self._observe(metrics, started, failed=False)
+            self.breaker.record_success()
+            return result
+
+    def _observe(self, metrics, started, failed):
+        elapsed_ms = (time.monotonic() - started) * 1000
+        with self._metrics_lock:
+            metrics.observe(elapsed_ms, failed)
+
+    def create_order(self, data):
+        return self._call('order.create', lambda: self.client.order.create(data), idempotent=False)
+
+    def fetch_order(self, order_id):
+        return self._call('order.fetch', lambda: self.client.order.fetch(order_id), idempotent=True)
+
+    def fetch_payment(self, payment_id):
+        return self._call('payment.fetch', lambda: self.client.payment.fetch(payment_id), idempotent=True)
+
+    def verify_payment_signature(self, params):
+        """Check the checkout signature; a local HMAC, so no breaker or retries, but still timed."""
+        metrics = self._operation('payment.verify_signature')
+        started = time.monotonic()
+        failed = True
+        try:
+            result = self.client.utility.verify_payment_signature(params)
+            failed = False
+            return result
+        finally:
+            self._observe(metrics, started, failed)
+
+    def metrics(self):
+        with self._metrics_lock:
+            operations = {name: metrics.snapshot() for name, metrics in sorted(self._metrics.items())}
+        return {
+            'breaker': {
+                'state': self.breaker.state,
+                'consecutive_failures': self.breaker.failures,
+            },
+            'operations': operations,
+        }
+
+
+_gateway = None
+_gateway_lock = threading.Lock()
+
+
+def get_gateway():
+    """This process's shared gateway, built from settings on first use."""
+    global _gateway
+    if _gateway is None:
+        with _gateway_lock:
+            if _gateway is None:
+                _gateway = RazorpayGateway(
+                    key_id=settings.RAZORPAY_KEY_ID,
+                    key_secret=settings.RAZORPAY_KEY_SECRET,
+                    connect_timeout=_setting('RAZORPAY_CONNECT_TIMEOUT', 3.05),
+                    read_timeout=_setting('RAZORPAY_READ_TIMEOUT', 10),
+                    max_retries=_setting('RAZORPAY_MAX_RETRIES', 2),
+                    pool_size=_setting('RAZORPAY_POOL_SIZE', 10),
+                    breaker_threshold=_setting('RAZORPAY_BREAKER_THRESHOLD', 5),
+                    breaker_cooldown=_setting('RAZORPAY_BREAKER_COOLDOWN', 30),
+                )
+    return _gateway
@@ -0,0 +1,92 @@
+"""Idempotency keys for the booking POST endpoints.
+
+A client may send an ``Idempotency-Key`` header. The first request with a key
+runs the view, and its response is cached for ``KEY_TTL`` together with a
+fingerprint of the request. A retry with the same key gets that response back
+without running the view again: no gateway call, no row locks, no counter
+updates. Other cases:
+
+* a retry that arrives while the first request is still running gets 409;
+* a key reused for a different request gets 422;
+* server errors (5xx) are not stored, so a retry after one runs the view again;
+* requests without the header are not affected.
+
+Keys are scoped to the view and the user. Like the other cache-based
+coordination here, they only span workers when the cache is shared.
+"""
+import hashlib
+from functools import wraps
+
+from django.core.cache import cache
+from django.http import HttpResponse, JsonResponse
+
+HEADER = 'Idempotency-Key'
+REPLAYED_HEADER = 'Idempotent-Replayed'
+CACHE_KEY = 'bookings:idempotency:{}:{}:{}'
+KEY_TTL = 24 * 60 * 60
+# Longest a first request is expected to run (gateway timeouts included) before a retry may take over.
+IN_FLIGHT_TTL = 60
+MAX_KEY_LENGTH = 255
+
+
+def _fingerprint(request):
+    digest = hashlib.sha256()
+    for part in (request.method.encode(), request.path.encode(), request.body):
+        digest.update(part)
+        digest.update(b'\0')
+    return digest.hexdigest()
+
+
+def _replay(stored):
+    response = HttpResponse(stored['content'], status=stored['status'], content_type=stored['content_type'])
+    response[REPLAYED_HEADER] = 'true'
+    return response
+
+
+def idempotent(view):
+    """Answer retries of a keyed request with the first response instead of running ``view`` again."""
+
+    @wraps(view)
+    def wrapper(request, *args, **kwargs):
+        key = request.headers.get(HEADER)
+        if not key:
+            return view(request, *args, **kwargs)
+        if len(key) > MAX_KEY_LENGTH:
+            return JsonResponse({'success': False, 'error': 'Idempotency key is too long.'}, status=400)
+
+        cache_key = CACHE_KEY.format(view.__name__, request.user.pk, hashlib.sha256(key.encode()).hexdigest())
+        fingerprint = _fingerprint(request)
+        if not cache.add(cache_key, {'fingerprint': fingerprint}, IN_FLIGHT_TTL):
+            stored = cache.get(cache_key)
+            if stored is not None:
+                if stored['fingerprint'] != fingerprint:
+                    return JsonResponse(
+                        {'success': False, 'error': 'This idempotency key was already used for a different request.'},
+                        status=422,
+                    )
+                if 'status' not in stored:
+                    return JsonResponse(
+                        {'success': False, 'error': 'This request is already being processed.'},
+                        status=409,
+                    )
+                return _replay(stored)
+            # Expired between add and get; claim it again.
+            cache.add(cache_key, {'fingerprint': fingerprint}, IN_FLIGHT_TTL)
+
+        try:
+            response = view(request, *args, **kwargs)
+        except Exception:
+            cache.delete(cache_key)
+            raise
+        if response.status_code >= 500 or response.streaming:
+            cache.delete(cache_key)
+        else:
+            cache.set(cache_key, {
+                'fingerprint': fingerprint,
+                'status': response.status_code,
+                'content': response.content,
+                'content_type': response['Content-Type'],
+            }, KEY_TTL)
+        return response
+
+    return wrapper
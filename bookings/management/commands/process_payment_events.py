@@ -0,0 +1,29 @@
+import time
+
+from django.core.management.base import BaseCommand
+
+from bookings.webhooks import BATCH_SIZE, process_events
+
+
+class Command(BaseCommand):
+    help = (
+        'Apply logged Razorpay webhook events to bookings and payments. '
+        'Drains the pending events once, or with --loop keeps running as the payment event worker.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--batch-size', type=int, default=BATCH_SIZE)
+        parser.add_argument('--loop', action='store_true', help='Keep polling for new events.')
+        parser.add_argument('--interval', type=float, default=2.0, help='Seconds to wait when no events are pending.')
+
+    def handle(self, *args, **options):
+        total = 0
+        while True:
+            processed = process_events(batch_size=options['batch_size'])
+            total += processed
+            if processed >= options['batch_size']:
+                continue
+            if not options['loop']:
+                break
+            time.sleep(options['interval'])
+        self.stdout.write(self.style.SUCCESS(f'Processed {total} payment event(s).'))
@@ -0,0 +1,22 @@
+from django.core.management.base import BaseCommand
+
+from bookings.reservations import SWEEP_BATCH_SIZE, release_expired_holds
+
+
+class Command(BaseCommand):
+    help = (
+        'Abandon unpaid bookings whose slot hold has expired and free their slots. '
+        'Run on a schedule (e.g. every minute) so abandoned checkouts do not keep slots booked.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--batch-size', type=int, default=SWEEP_BATCH_SIZE)
+
+    def handle(self, *args, **options):
+        total = 0
+        while True:
+            released = release_expired_holds(batch_size=options['batch_size'])
+            total += released
+            if released < options['batch_size']:
+                break
+        self.stdout.write(self.style.SUCCESS(f'Released {total} expired hold(s).'))
@@ -0,0 +1,71 @@
+import json
+import urllib.error
+import urllib.request
+import uuid
+
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+
+from bookings.models import PaymentEvent
+from bookings.webhooks import sign
+
+
+class Command(BaseCommand):
+    help = (
+        'Stand in for Razorpay: sign webhook events with the webhook secret and post them to the webhook URL. '
+        'Events come from a file (one JSON event per line, e.g. copied from the Razorpay dashboard) '
+        'or from the stored event log by event id.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('event_ids', nargs='*', help='Ids of stored events to replay.')
+        parser.add_argument('--file', help='File with one JSON webhook event per line.')
+        parser.add_argument('--url', default='http://localhost:8000/bookings/webhooks/razorpay/')
+        parser.add_argument('--secret', default=None, help='Defaults to RAZORPAY_WEBHOOK_SECRET.')
+        parser.add_argument(
+            '--new-ids',
+            action='store_true',
+            help='Send each event under a fresh event id so the log does not drop it as a redelivery.',
+        )
+
+    def _events(self, options):
+        if options['file']:
+            with open(options['file'], encoding='utf-8') as handle:
+                for number, line in enumerate(handle, 1):
+                    if line.strip():
+                        yield f'replay-{number}', json.loads(line)
+        for event in PaymentEvent.objects.filter(event_id__in=options['event_ids']).order_by('received_at'):
+            yield event.event_id, event.payload
+
+    def handle(self, *args, **options):
+        secret = options['secret'] or settings.RAZORPAY_WEBHOOK_SECRET
+        if not secret:
+            raise CommandError('Set RAZORPAY_WEBHOOK_SECRET or pass --secret.')
+        if not options['file'] and not options['event_ids']:
+            raise CommandError('Pass --file or one or more event ids.')
+
+        sent = 0
+        for event_id, event in self._events(options):
+            if options['new_ids']:
+                event_id = f'replay-{uuid.uuid4().hex}'
+            body = json.dumps(event).encode()
+            request = urllib.request.Request(
+                options['url'],
+                data=body,
+                method='POST',
+                headers={
+                    'Content-Type': 'application/json',
+                    'X-Razorpay-Event-Id': event_id,
+                    'X-Razorpay-Signature': sign(body, secret),
+                },
+            )
+            try:
+                with urllib.request.urlopen(request, timeout=10) as response:
+                    status = response.status
+            except urllib.error.HTTPError as exc:
+                status = exc.code
+            except urllib.error.URLError as exc:
+                raise CommandError(f'Could not reach {options["url"]}: {exc.reason}') from exc
+            self.stdout.write(f'{event_id} {event.get("event")}: HTTP {status}')
+            sent += 1
+        self.stdout.write(self.style.SUCCESS(f'Replayed {sent} event(s).'))
@@ -20,6 +20,7 @@ class Booking(models.Model):
     PAYMENT_PAID = 'paid'
     PAYMENT_FAILED = 'failed'
     PAYMENT_REFUNDED = 'refunded'
+    PAYMENT_ABANDONED = 'abandoned'
 
     STATUS_CHOICES = (
         (STATUS_PENDING, 'Pending'),
@@ -34,6 +35,7 @@ class Booking(models.Model):
         (PAYMENT_PAID, 'Paid'),
         (PAYMENT_FAILED, 'Failed'),
         (PAYMENT_REFUNDED, 'Refunded'),
+        (PAYMENT_ABANDONED, 'Abandoned'),
     )
 
     booking_reference = models.CharField(max_length=50, unique=True, editable=False)
@@ -65,6 +67,8 @@ class Booking(models.Model):
     counsellor_notes = models.TextField(blank=True, help_text="Counsellor's private notes")
     cancellation_reason = models.TextField(blank=True)
 
+    # Until then an unpaid booking keeps its slot (see bookings.reservations).
+    hold_expires_at = models.DateTimeField(blank=True, null=True)
     confirmed_at = models.DateTimeField(blank=True, null=True)
     cancelled_at = models.DateTimeField(blank=True, null=True)
     completed_at = models.DateTimeField(blank=True, null=True)
@@ -78,6 +82,8 @@ class Booking(models.Model):
             models.Index(fields=['client', 'session_date']),
             models.Index(fields=['counsellor', 'session_date']),
             models.Index(fields=['status', 'payment_status']),
+            # Finds expired holds without scanning old bookings.
+            models.Index(fields=['payment_status', 'created_at']),
         ]
 
     def __str__(self) -> str:
@@ -121,12 +127,14 @@ class Payment(models.Model):
     STATUS_SUCCESS = 'success'
     STATUS_FAILED = 'failed'
     STATUS_REFUNDED = 'refunded'
+    STATUS_ABANDONED = 'abandoned'
 
     STATUS_CHOICES = (
         (STATUS_INITIATED, 'Initiated'),
         (STATUS_SUCCESS, 'Success'),
         (STATUS_FAILED, 'Failed'),
         (STATUS_REFUNDED, 'Refunded'),
+        (STATUS_ABANDONED, 'Abandoned'),
     )
 
     booking = models.OneToOneField(Booking, on_delete=models.CASCADE, related_name='payment')
@@ -153,6 +161,7 @@ class Payment(models.Model):
         validators=[MinValueValidator(0)],
     )
     refund_id = models.CharField(max_length=100, blank=True, null=True)
+    refund_ids = models.JSONField(default=list, blank=True, help_text='Razorpay refund ids already applied')
     refund_reason = models.TextField(blank=True)
     refunded_at = models.DateTimeField(blank=True, null=True)
 
@@ -202,3 +211,58 @@ class Payment(models.Model):
         self.payment_data = payload or self.payment_data
         self.save(update_fields=['status', 'error_message', 'payment_data', 'updated_at'])
 
+    def mark_refunded(self, refund_id, refund_amount, payload=None):
+        """Add a processed refund; the payment counts as refunded once the whole amount is back.
+
+        A refund id that was already applied (e.g. redelivered under a new event id)
+        is ignored. Returns whether the refund was applied.
+        """
+        if refund_id in self.refund_ids:
+            return False
+        self.refund_id = refund_id
+        self.refund_ids = [*self.refund_ids, refund_id]
+        self.refund_amount += refund_amount
+        self.refunded_at = timezone.now()
+        if self.refund_amount >= self.amount:
+            self.status = self.STATUS_REFUNDED
+        self.payment_data = payload or self.payment_data
+        self.save(update_fields=[
+            'refund_id', 'refund_ids', 'refund_amount', 'refunded_at', 'status', 'payment_data', 'updated_at',
+        ])
+        return True
+
+
+class PaymentEvent(models.Model):
+    """A Razorpay webhook event, stored once per event id and applied by the payment event worker."""
+
+    STATUS_PENDING = 'pending'
+    STATUS_PROCESSED = 'processed'
+    STATUS_FAILED = 'failed'
+
+    STATUS_CHOICES = (
+        (STATUS_PENDING, 'Pending'),
+        (STATUS_PROCESSED, 'Processed'),
+        (STATUS_FAILED, 'Failed'),
+    )
+
+    event_id = models.CharField(max_length=100, unique=True)
+    event_type = models.CharField(max_length=50)
+    payload = models.JSONField()
+    status = models.CharField(max_length=20, choices=STATUS_CHOICES, default=STATUS_PENDING)
+    attempts = models.PositiveIntegerField(default=0)
+    last_error = models.TextField(blank=True)
+    # A pending event is not tried again before this; pushed back after each failed attempt.
+    next_attempt_at = models.DateTimeField(default=timezone.now)
+    received_at = models.DateTimeField(auto_now_add=True)
+    processed_at = models.DateTimeField(blank=True, null=True)
+
+    class Meta:
+        db_table = 'payment_events'
+        ordering = ['received_at']
+        indexes = [
+            models.Index(fields=['status', 'received_at']),
+            models.Index(fields=['status', 'next_attempt_at']),
+        ]
+
+    def __str__(self) -> str:
+        return f"{self.event_type} {self.event_id} ({self.get_status_display()})"
@@ -0,0 +1,277 @@
+"""Two-phase booking: hold the slot, create the gateway order, then finalize.
+
+``place_hold`` runs one short transaction: it locks the slot, marks it
+booked, and creates the ``Booking`` (with ``hold_expires_at``) and its
+``Payment``. The gateway order is created after that transaction has
+committed, so a slow gateway holds no row lock or open transaction.
+``finalize_hold`` then records the order id. If the gateway call or the
+finalize step fails, ``release_hold`` frees the slot and marks the booking
+failed, just as a payment failure reported by the client does.
+
+Holds whose payment never arrives (a closed tab) expire: ``release_expired_holds``
+marks every expired pending booking and its payment abandoned and frees their
+slots with set-based UPDATEs. It runs from the ``release_expired_holds``
+command and, for a single slot, whenever someone tries to book a held slot.
+
+``confirm_payment`` records a captured payment and confirms its booking. Both the
+browser callback and the Razorpay webhook worker call it, so it does nothing for a
+booking that is already paid.
+"""
+from collections import defaultdict
+from datetime import timedelta
+
+from django.db import transaction
+from django.db.models import F, Q
+from django.utils import timezone
+
+from accounts.models import Client, Counsellor
+from therapists import events
+from therapists.availability import slots_changed
+from therapists.models import CounsellorAvailability
+from therapists.slots import lock_slot
+from .models import Booking, Payment
+
+# How long a held slot waits for payment before it may be released.
+HOLD_MINUTES = 15
+SWEEP_BATCH_SIZE = 500
+
+
+class HoldError(Exception):
+    """The slot could not be held; ``status`` is the HTTP status to answer with."""
+
+    status = 400
+
+    def __init__(self, message, status=None):
+        super().__init__(message)
+        self.message = message
+        if status is not None:
+            self.status = status
+
+
+def place_hold(client, counsellor, session_date, session_time, session_fee, duration, client_notes=''):
+    """Hold the slot and create the pending booking and payment; returns (booking, payment)."""
+    with transaction.atomic():
+        # Stored slots and ones generated from weekly rules alike
+        slot = lock_slot(counsellor, session_date, session_time)
+        if slot is None:
+            raise HoldError('This counsellor is not available at the selected time.')
+        if slot.is_booked and release_expired_holds(slot_ids=[slot.pk]):
+            slot.refresh_from_db(fields=['is_booked'])
+        if slot.is_booked:
+            raise HoldError('This slot has already been booked. Please choose another time.', status=409)
+
+        booking = Booking.objects.create(
+            client=client,
+            counsellor=counsellor,
+            session_date=session_date,
+            session_time=session_time,
+            session_duration=slot.duration_minutes or duration,
+            session_fee=session_fee,
+            client_notes=client_notes,
+            google_meet_link=counsellor.google_meet_link,
+            availability_slot=slot,
+            hold_expires_at=timezone.now() + timedelta(minutes=HOLD_MINUTES),
+        )
+        payment = Payment.objects.create(
+            booking=booking,
+            amount=session_fee,
+            currency='INR',
+            payment_method=Payment.METHOD_RAZORPAY,
+        )
+
+        slot.is_booked = True
+        slot.save(update_fields=['is_booked', 'updated_at'])
+        slots_changed(counsellor.pk, [session_date])
+        events.publish(
+            counsellor.pk,
+            events.SLOT_BOOKED,
+            date=session_date.isoformat(),
+            start_time=session_time.strftime('%H:%M'),
+        )
+    return booking, payment
+
+
+def finalize_hold(payment, order_id):
+    """Attach the gateway order to a held payment; False if the hold was released meanwhile."""
+    with transaction.atomic():
+        updated = Payment.objects.filter(
+            pk=payment.pk,
+            status=Payment.STATUS_INITIATED,
+            booking__payment_status=Booking.PAYMENT_PENDING,
+        ).update(razorpay_order_id=order_id, updated_at=timezone.now())
+    if updated:
+        payment.razorpay_order_id = order_id
+    return bool(updated)
+
+
+def release_hold(booking, error_message, payload=None):
+    """Mark a pending booking failed and free its slot, e.g. after a failed gateway call.
+
+    Bookings no longer pending (paid, already failed or abandoned) are left
+    alone: their slot is either theirs for good or may already be someone else's.
+    """
+    with transaction.atomic():
+        booking = Booking.objects.select_for_update().get(pk=booking.pk)
+        if booking.payment_status != Booking.PAYMENT_PENDING:
+            return False
+
+        payment = Payment.objects.filter(booking=booking).first()
+        if payment is not None:
+            payment.mark_failed(error_message, payload)
+        booking.payment_status = Booking.PAYMENT_FAILED
+        booking.save(update_fields=['payment_status', 'updated_at'])
+
+        slot = None
+        if booking.availability_slot_id:
+            slot = CounsellorAvailability.objects.select_for_update().filter(
+                pk=booking.availability_slot_id,
+                is_booked=True,
+            ).first()
+        if slot is not None:
+            slot.is_booked = False
+            slot.save(update_fields=['is_booked', 'updated_at'])
+            slots_changed(slot.counsellor_id, [slot.date])
+            events.publish(
+                slot.counsellor_id,
+                events.SLOT_RELEASED,
+                date=slot.date.isoformat(),
+                start_time=slot.start_time.strftime('%H:%M'),
+            )
+    return True
+
+
+def release_expired_holds(slot_ids=None, batch_size=SWEEP_BATCH_SIZE):
+    """Abandon pending bookings whose hold has expired and free their slots.
+
+    Limited to bookings on ``slot_ids`` when given. Returns how many bookings
+    were abandoned.
+    """
+    now = timezone.now()
+    expired = Booking.objects.filter(
+        payment_status=Booking.PAYMENT_PENDING,
+        created_at__lt=now - timedelta(minutes=HOLD_MINUTES),
+    ).filter(Q(hold_expires_at__isnull=True) | Q(hold_expires_at__lt=now))
+    if slot_ids is not None:
+        expired = expired.filter(availability_slot_id__in=slot_ids)
+
+    with transaction.atomic():
+        rows = list(
+            expired.select_for_update(skip_locked=True)
+            .order_by('created_at')
+            .values_list('pk', 'availability_slot_id')[:batch_size]
+        )
+        if not rows:
+            return 0
+        booking_ids = [booking_id for booking_id, _slot_id in rows]
+        slot_ids = [slot_id for _booking_id, slot_id in rows if slot_id]
+
+        Booking.objects.filter(pk__in=booking_ids).update(
+            payment_status=Booking.PAYMENT_ABANDONED,
+            status=Booking.STATUS_CANCELLED,
+            cancellation_reason='Payment was not completed before the slot hold expired.',
+            cancelled_at=now,
+            updated_at=now,
+        )
+        Payment.objects.filter(booking_id__in=booking_ids, status=Payment.STATUS_INITIATED).update(
+            status=Payment.STATUS_ABANDONED,
+            error_message='Slot hold expired before payment.',
+            updated_at=now,
+        )
+
+        released = list(
+            CounsellorAvailability.objects.filter(pk__in=slot_ids, is_booked=True)
+            .exclude(bookings__payment_status=Booking.PAYMENT_PAID)
+            .values_list('pk', 'counsellor_id', 'date', 'start_time')
+        )
+        CounsellorAvailability.objects.filter(pk__in=[row[0] for row in released]).update(
+            is_booked=False,
+            updated_at=now,
+        )
+
+        days = defaultdict(set)
+        for _slot_id, counsellor_id, slot_date, start_time in released:
+            days[counsellor_id].add(slot_date)
+            events.publish(
+                counsellor_id,
+                events.SLOT_RELEASED,
+                date=slot_date.isoformat(),
+                start_time=start_time.strftime('%H:%M'),
+            )
+        for counsellor_id, counsellor_days in days.items():
+            slots_changed(counsellor_id, counsellor_days)
+    return len(booking_ids)
+
+
+def reclaim_slot(booking):
+    """Take the slot back for a booking paid after its hold was released; False if someone else has it.
+
+    Must be called inside a transaction.
+    """
+    if booking.payment_status == Booking.PAYMENT_PENDING or not booking.availability_slot_id:
+        return True
+    slot = CounsellorAvailability.objects.select_for_update().filter(pk=booking.availability_slot_id).first()
+    if slot is None or slot.is_booked:
+        return False
+    slot.is_booked = True
+    slot.save(update_fields=['is_booked', 'updated_at'])
+    slots_changed(slot.counsellor_id, [slot.date])
+    events.publish(
+        slot.counsellor_id,
+        events.SLOT_BOOKED,
+        date=slot.date.isoformat(),
+        start_time=slot.start_time.strftime('%H:%M'),
+    )
+    return True
+
+
+def confirm_payment(payment, razorpay_payment_id, razorpay_signature=None, payload=None):
+    """Record a captured payment and confirm its booking; False if the booking could not be confirmed.
+
+    That happens when the hold lapsed and someone else took the slot (the booking
+    is cancelled with a refund due) or the payment was already refunded.
+    """
+    with transaction.atomic():
+        booking = Booking.objects.select_for_update().get(pk=payment.booking_id)
+        payment.booking = booking
+        if booking.payment_status == Booking.PAYMENT_PAID:
+            return booking.status != Booking.STATUS_CANCELLED
+        if booking.payment_status == Booking.PAYMENT_REFUNDED:
+            return False
+
+        payment.mark_success(razorpay_payment_id, razorpay_signature, payload)
+        # Paid after the hold expired or failed: take the slot back if nobody else has.
+        if not reclaim_slot(booking):
+            booking.payment_status = Booking.PAYMENT_PAID
+            booking.status = Booking.STATUS_CANCELLED
+            booking.cancellation_reason = 'Slot was booked by someone else before payment completed; refund due.'
+            booking.cancelled_at = timezone.now()
+            booking.save(update_fields=['payment_status', 'status', 'cancellation_reason', 'cancelled_at', 'updated_at'])
+            return False
+        booking.payment_status = Booking.PAYMENT_PAID
+        booking.status = Booking.STATUS_CONFIRMED
+        booking.confirmed_at = timezone.now()
+        # Undo an expired hold's cancellation now that the slot is held again.
+        booking.cancelled_at = None
+        booking.cancellation_reason = ''
+        booking.save(update_fields=[
+            'payment_status', 'status', 'confirmed_at', 'cancelled_at', 'cancellation_reason', 'updated_at',
+        ])
+
+        # Increment counters for client and counsellor
+        Client.objects.filter(pk=booking.client_id).update(
+            total_sessions=F('total_sessions') + 1,
+            last_session_date=booking.session_datetime,
+        )
+
+        has_existing_paid_session = Booking.objects.filter(
+            counsellor_id=booking.counsellor_id,
+            client_id=booking.client_id,
+            payment_status=Booking.PAYMENT_PAID,
+        ).exclude(pk=booking.pk).exists()
+
+        counsellor_updates = {'total_sessions': F('total_sessions') + 1}
+        if not has_existing_paid_session:
+            counsellor_updates['total_clients'] = F('total_clients') + 1
+
+        Counsellor.objects.filter(pk=booking.counsellor_id).update(**counsellor_updates)
+    return True
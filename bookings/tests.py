@@ -0,0 +1,210 @@
+import json
+from datetime import date, time, timedelta
+from decimal import Decimal
+
+from django.test import TestCase, override_settings
+from django.urls import reverse
+from django.utils import timezone
+
+from accounts.models import Client, Counsellor, User
+from therapists.models import CounsellorAvailability
+
+from .models import Booking, Payment, PaymentEvent
+from .webhooks import MAX_ATTEMPTS, process_events, retry_delay, sign
+
+WEBHOOK_SECRET = 'test-webhook-secret'
+
+
+@override_settings(RAZORPAY_WEBHOOK_SECRET=WEBHOOK_SECRET)
+class RazorpayWebhookTests(TestCase):
+    def setUp(self):
+        counsellor_user = User.objects.create_user(
+            username='counsellor', email='counsellor@example.com', password='pw',
+            role='counsellor', is_approved=True,
+        )
+        self.counsellor = Counsellor.objects.create(
+            user=counsellor_user,
+            license_number='L-1',
+            license_type='other',
+            license_authority='Board',
+            license_expiry=date(2030, 1, 1),
+            years_experience=5,
+            highest_degree='phd',
+            university='University',
+            graduation_year=2010,
+            session_fee=Decimal('1000.00'),
+            google_meet_link='https://meet.example.com/room',
+            professional_experience='Experience',
+            about_me='About',
+        )
+        client_user = User.objects.create_user(
+            username='client', email='client@example.com', password='pw', role='client',
+        )
+        self.client_profile = Client.objects.create(
+            user=client_user,
+            date_of_birth=date(1990, 1, 1),
+            primary_concern='anxiety',
+            about_me='About',
+        )
+        session_date = timezone.localdate() + timedelta(days=5)
+        self.slot = CounsellorAvailability.objects.create(
+            counsellor=self.counsellor,
+            date=session_date,
+            start_time=time(10, 0),
+            end_time=time(10, 45),
+            is_booked=True,
+        )
+        self.booking = Booking.objects.create(
+            client=self.client_profile,
+            counsellor=self.counsellor,
+            session_date=session_date,
+            session_time=time(10, 0),
+            availability_slot=self.slot,
+            session_fee=Decimal('1000.00'),
+            hold_expires_at=timezone.now() + timedelta(minutes=15),
+        )
+        self.payment = Payment.objects.create(
+            booking=self.booking,
+            razorpay_order_id='order_1',
+            amount=Decimal('1000.00'),
+        )
+
+    def post_event(self, event_type, entity, event_id, signature=None):
+        entity_name = 'refund' if event_type.startswith('refund.') else 'payment'
+        body = json.dumps({'event': event_type, 'payload': {entity_name: {'entity': entity}}}).encode()
+        return self.client.post(
+            reverse('bookings:razorpay_webhook'),
+            body,
+            content_type='application/json',
+            HTTP_X_RAZORPAY_SIGNATURE=signature or sign(body, WEBHOOK_SECRET),
+            HTTP_X_RAZORPAY_EVENT_ID=event_id,
+        )
+
+    def capture(self, event_id='evt_capture'):
+        return self.post_event(
+            'payment.captured',
+            {'id': 'pay_1', 'order_id': 'order_1', 'amount': 100000},
+            event_id,
+        )
+
+    def refund(self, refund_id, amount, event_id):
+        return self.post_event(
+            'refund.processed',
+            {'id': refund_id, 'payment_id': 'pay_1', 'amount': amount},
+            event_id,
+        )
+
+    def test_bad_signature_is_rejected(self):
+        response = self.post_event(
+            'payment.captured',
+            {'id': 'pay_1', 'order_id': 'order_1', 'amount': 100000},
+            'evt_capture',
+            signature='not-the-signature',
+        )
+
+        self.assertEqual(response.status_code, 400)
+        self.assertFalse(PaymentEvent.objects.exists())
+
+    def test_captured_payment_confirms_booking(self):
+        self.assertEqual(self.capture().status_code, 200)
+        process_events()
+
+        self.booking.refresh_from_db()
+        self.payment.refresh_from_db()
+        self.assertEqual(self.booking.status, Booking.STATUS_CONFIRMED)
+        self.assertEqual(self.booking.payment_status, Booking.PAYMENT_PAID)
+        self.assertEqual(self.payment.status, Payment.STATUS_SUCCESS)
+        self.assertEqual(self.payment.razorpay_payment_id, 'pay_1')
+        self.assertEqual(PaymentEvent.objects.get().status, PaymentEvent.STATUS_PROCESSED)
+
+    def test_redelivered_event_is_recorded_once(self):
+        self.capture()
+        self.capture()
+
+        self.assertEqual(PaymentEvent.objects.count(), 1)
+        self.assertEqual(process_events(), 1)
+        self.assertEqual(process_events(), 0)
+
+    def test_failed_payment_releases_hold(self):
+        self.post_event(
+            'payment.failed',
+            {'id': 'pay_1', 'order_id': 'order_1', 'error_description': 'Card declined.'},
+            'evt_failed',
+        )
+        process_events()
+
+        self.booking.refresh_from_db()
+        self.slot.refresh_from_db()
+        self.payment.refresh_from_db()
+        self.assertEqual(self.booking.payment_status, Booking.PAYMENT_FAILED)
+        self.assertEqual(self.payment.error_message, 'Card declined.')
+        self.assertFalse(self.slot.is_booked)
+
+    def test_event_for_unknown_order_stays_pending(self):
+        self.post_event(
+            'payment.captured',
+            {'id': 'pay_2', 'order_id': 'order_unknown', 'amount': 100000},
+            'evt_unknown',
+        )
+        process_events()
+
+        event = PaymentEvent.objects.get()
+        self.assertEqual(event.status, PaymentEvent.STATUS_PENDING)
+        self.assertEqual(event.attempts, 1)
+        self.assertGreater(event.next_attempt_at, timezone.now())
+
+    def test_unapplied_event_backs_off_before_retrying(self):
+        self.post_event(
+            'payment.captured',
+            {'id': 'pay_2', 'order_id': 'order_unknown', 'amount': 100000},
+            'evt_unknown',
+        )
+        process_events()
+
+        self.assertEqual(process_events(), 0)
+        PaymentEvent.objects.update(next_attempt_at=timezone.now())
+        self.assertEqual(process_events(), 1)
+        self.assertEqual(PaymentEvent.objects.get().attempts, 2)
+
+    def test_retry_delay_doubles_up_to_a_cap(self):
+        self.assertEqual(retry_delay(2), retry_delay(1) * 2)
+        self.assertEqual(retry_delay(50), retry_delay(40))
+
+    def test_event_is_failed_after_max_attempts(self):
+        self.post_event(
+            'payment.captured',
+            {'id': 'pay_2', 'order_id': 'order_unknown', 'amount': 100000},
+            'evt_unknown',
+        )
+        PaymentEvent.objects.update(attempts=MAX_ATTEMPTS - 1)
+        process_events()
+
+        self.assertEqual(PaymentEvent.objects.get().status, PaymentEvent.STATUS_FAILED)
+
+    def test_refund_redelivered_under_new_event_id_counts_once(self):
+        self.capture()
+        process_events()
+
+        self.refund('rfnd_1', 40000, 'evt_refund_1')
+        self.refund('rfnd_1', 40000, 'evt_refund_1_again')
+        process_events()
+
+        self.payment.refresh_from_db()
+        self.assertEqual(self.payment.refund_amount, Decimal('400.00'))
+        self.assertEqual(self.payment.refund_ids, ['rfnd_1'])
+        self.assertEqual(self.payment.status, Payment.STATUS_SUCCESS)
+
+    def test_partial_refunds_add_up_to_full_refund(self):
+        self.capture()
+        process_events()
+
+        self.refund('rfnd_1', 40000, 'evt_refund_1')
+        self.refund('rfnd_2', 60000, 'evt_refund_2')
+        process_events()
+
+        self.payment.refresh_from_db()
+        self.booking.refresh_from_db()
+        self.assertEqual(self.payment.refund_amount, Decimal('1000.00'))
+        self.assertEqual(self.payment.refund_ids, ['rfnd_1', 'rfnd_2'])
+        self.assertEqual(self.payment.status, Payment.STATUS_REFUNDED)
+        self.assertEqual(self.booking.payment_status, Booking.PAYMENT_REFUNDED)
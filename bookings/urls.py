@@ -8,5 +8,7 @@ urlpatterns = [
     path('bookings/create/', views.create_booking, name='create_booking'),
     path('bookings/verify/', views.verify_payment, name='verify_payment'),
     path('bookings/payment-failed/', views.payment_failed, name='payment_failed'),
+    path('bookings/webhooks/razorpay/', views.razorpay_webhook, name='razorpay_webhook'),
+    path('bookings/gateway/metrics/', views.gateway_metrics, name='gateway_metrics'),
 ]
 
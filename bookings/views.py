@@ -1,19 +1,22 @@
 import json
+import os
 from datetime import datetime, date, timedelta
 from decimal import Decimal
 
 import razorpay
 from django.conf import settings
+from django.contrib.admin.views.decorators import staff_member_required
 from django.contrib.auth.decorators import login_required
-from django.db import transaction
-from django.db.models import F
 from django.http import JsonResponse
-from django.utils import timezone
-from django.views.decorators.http import require_POST
+from django.views.decorators.csrf import csrf_exempt
+from django.views.decorators.http import require_GET, require_POST
 
-from accounts.models import Counsellor, Client
-from therapists.models import CounsellorAvailability
+from accounts.models import Counsellor
+from .gateway import GatewayError, GatewayUnavailable, get_gateway
+from .idempotency import idempotent
 from .models import Booking, Payment
+from .reservations import HoldError, confirm_payment, finalize_hold, place_hold, release_hold
+from .webhooks import record_event, verify_signature
 
 
 def _parse_time_slot(time_str: str):
@@ -38,6 +41,7 @@ def _validate_session_date(date_str: str):
 
 @login_required
 @require_POST
+@idempotent
 def create_booking(request):
     if not hasattr(request.user, 'client'):
         return JsonResponse({'success': False, 'error': 'Only clients can book sessions.'}, status=403)
@@ -75,90 +79,56 @@ def create_booking(request):
 
     session_fee = counsellor.session_fee or Decimal('0.00')
 
+    # Ensure amount is at least 1 INR (100 paise) for Razorpay
+    amount_in_paise = int(session_fee * 100)
+    if amount_in_paise < 100:
+        return JsonResponse(
+            {'success': False, 'error': 'Minimum payment amount is ₹1.00'},
+            status=400,
+        )
+
+    # Phase 1: a short transaction holds the slot and creates the pending booking.
     try:
-        with transaction.atomic():
-            try:
-                availability_slot = CounsellorAvailability.objects.select_for_update().get(
-                    counsellor=counsellor,
-                    date=session_date,
-                    start_time=session_time,
-                )
-            except CounsellorAvailability.DoesNotExist:
-                return JsonResponse(
-                    {'success': False, 'error': 'This counsellor is not available at the selected time.'},
-                    status=400,
-                )
-
-            if availability_slot.is_booked:
-                return JsonResponse(
-                    {'success': False, 'error': 'This slot has already been booked. Please choose another time.'},
-                    status=409,
-                )
-
-            duration = availability_slot.duration_minutes or duration
-
-            booking = Booking.objects.create(
-                client=client,
-                counsellor=counsellor,
-                session_date=session_date,
-                session_time=session_time,
-                session_duration=duration,
-                session_fee=session_fee,
-                client_notes=client_notes,
-                google_meet_link=counsellor.google_meet_link,
-                availability_slot=availability_slot,
-            )
-
-            payment = Payment.objects.create(
-                booking=booking,
-                amount=session_fee,
-                currency='INR',
-                payment_method=Payment.METHOD_RAZORPAY,
-            )
-
-            availability_slot.is_booked = True
-            availability_slot.save(update_fields=['is_booked', 'updated_at'])
-
-            razorpay_client = razorpay.Client(
-                auth=(settings.RAZORPAY_KEY_ID, settings.RAZORPAY_KEY_SECRET)
-            )
-            
-            # Ensure amount is at least 1 INR (100 paise) for Razorpay
-            amount_in_paise = int(session_fee * 100)
-            if amount_in_paise < 100:
-                return JsonResponse(
-                    {'success': False, 'error': 'Minimum payment amount is ₹1.00'},
-                    status=400,
-                )
-            
-            order = razorpay_client.order.create({
-                "amount": amount_in_paise,
-                "currency": "INR",
-                "receipt": booking.booking_reference,
-                "notes": {
-                "booking_reference": booking.booking_reference,
-                "client": client.user.get_full_name(),
-                "counsellor": counsellor.user.get_full_name(),
-                },
-            })
-            
-
-
-
-            payment.razorpay_order_id = order.get('id')
-            payment.save(update_fields=['razorpay_order_id', 'updated_at'])
-            
-            # Log order creation for debugging
-            print(f"Razorpay order created: {order.get('id')} for booking {booking.booking_reference}, amount: {amount_in_paise} paise")
+        booking, payment = place_hold(client, counsellor, session_date, session_time, session_fee, duration, client_notes)
+    except HoldError as exc:
+        return JsonResponse({'success': False, 'error': exc.message}, status=exc.status)
 
+    # Phase 2: the gateway call, with no transaction or row lock held.
+    try:
+        order = get_gateway().create_order({
+            "amount": amount_in_paise,
+            "currency": "INR",
+            "receipt": booking.booking_reference,
+            "notes": {
+            "booking_reference": booking.booking_reference,
+            "client": client.user.get_full_name(),
+            "counsellor": counsellor.user.get_full_name(),
+            },
+        })
+    except GatewayUnavailable as exc:
+        print(f"Razorpay circuit open: {str(exc)}")
+        release_hold(booking, f'Order creation skipped: {exc}')
+        return JsonResponse(
+            {'success': False, 'error': 'Payment gateway is temporarily unavailable. Please try again in a minute.'},
+            status=503,
+        )
+    except GatewayError as exc:
+        print(f"Razorpay unreachable: {str(exc)}")
+        release_hold(booking, f'Order creation failed: {exc}')
+        return JsonResponse(
+            {'success': False, 'error': 'Payment gateway did not respond. Please try again later.'},
+            status=504,
+        )
     except razorpay.errors.BadRequestError as exc:
         print(f"Razorpay BadRequestError: {str(exc)}")
+        release_hold(booking, f'Order creation failed: {exc}')
         return JsonResponse(
             {'success': False, 'error': 'Unable to initialise payment. Please try again later.', 'details': str(exc)},
             status=502,
         )
     except razorpay.errors.ServerError as exc:
         print(f"Razorpay ServerError: {str(exc)}")
+        release_hold(booking, f'Order creation failed: {exc}')
         return JsonResponse(
             {'success': False, 'error': 'Payment gateway error. Please try again later.', 'details': str(exc)},
             status=502,
@@ -167,8 +137,26 @@ def create_booking(request):
         print(f"Unexpected error creating booking: {str(exc)}")
         import traceback
         traceback.print_exc()
+        release_hold(booking, f'Order creation failed: {exc}')
         return JsonResponse({'success': False, 'error': str(exc)}, status=500)
 
+    # Phase 3: record the order, unless the hold was released while the gateway answered.
+    try:
+        finalized = finalize_hold(payment, order.get('id'))
+    except Exception as exc:  # pragma: no cover - general safeguard
+        print(f"Unexpected error finalizing booking: {str(exc)}")
+        release_hold(booking, f'Finalizing the order failed: {exc}')
+        return JsonResponse({'success': False, 'error': 'Unable to initialise payment. Please try again later.'}, status=500)
+    if not finalized:
+        release_hold(booking, 'Hold released before the payment order was recorded.')
+        return JsonResponse(
+            {'success': False, 'error': 'Your slot hold expired. Please choose the time again.'},
+            status=409,
+        )
+
+    # Log order creation for debugging
+    print(f"Razorpay order created: {order.get('id')} for booking {booking.booking_reference}, amount: {amount_in_paise} paise")
+
     return JsonResponse(
         {
             'success': True,
@@ -195,6 +183,7 @@ def create_booking(request):
 
 @login_required
 @require_POST
+@idempotent
 def verify_payment(request):
     if not hasattr(request.user, 'client'):
         return JsonResponse({'success': False, 'error': 'Only clients can verify payments.'}, status=403)
@@ -222,10 +211,7 @@ def verify_payment(request):
 
     # Verify signature
     try:
-        razorpay_client = razorpay.Client(
-            auth=(settings.RAZORPAY_KEY_ID, settings.RAZORPAY_KEY_SECRET)
-        )
-        razorpay_client.utility.verify_payment_signature({
+        get_gateway().verify_payment_signature({
             'razorpay_order_id': razorpay_order_id,
             'razorpay_payment_id': razorpay_payment_id,
             'razorpay_signature': razorpay_signature,
@@ -241,34 +227,12 @@ def verify_payment(request):
         payment.booking.save(update_fields=['payment_status', 'updated_at'])
         return JsonResponse({'success': False, 'error': 'Payment verification error. Please contact support.'}, status=500)
 
-    with transaction.atomic():
-        payment.mark_success(razorpay_payment_id, razorpay_signature, payload)
-        payment.booking.payment_status = Booking.PAYMENT_PAID
-        payment.booking.status = Booking.STATUS_CONFIRMED
-        payment.booking.confirmed_at = timezone.now()
-        payment.booking.save(update_fields=['payment_status', 'status', 'confirmed_at', 'updated_at'])
-
-        # Increment counters for client and counsellor
-        client = payment.booking.client
-        counsellor = payment.booking.counsellor
-
-        Client.objects.filter(pk=client.pk).update(
-            total_sessions=F('total_sessions') + 1,
-            last_session_date=payment.booking.session_datetime,
+    if not confirm_payment(payment, razorpay_payment_id, razorpay_signature, payload):
+        return JsonResponse(
+            {'success': False, 'error': 'Your slot hold expired and the time was booked by someone else. Your payment will be refunded.'},
+            status=409,
         )
 
-        has_existing_paid_session = Booking.objects.filter(
-            counsellor=counsellor,
-            client=client,
-            payment_status=Booking.PAYMENT_PAID,
-        ).exclude(pk=payment.booking.pk).exists()
-
-        counsellor_updates = {'total_sessions': F('total_sessions') + 1}
-        if not has_existing_paid_session:
-            counsellor_updates['total_clients'] = F('total_clients') + 1
-
-        Counsellor.objects.filter(pk=counsellor.pk).update(**counsellor_updates)
-
     return JsonResponse({'success': True, 'message': 'Payment verified successfully.'})
 
 
@@ -307,14 +271,30 @@ def payment_failed(request):
     print(f"  Reason: {error_reason}")
     print(f"  Full error: {error}")
     
-    payment.mark_failed(error_description or 'Payment failed.')
-    payment.booking.payment_status = Booking.PAYMENT_FAILED
-    payment.booking.save(update_fields=['payment_status', 'updated_at'])
-
-    slot = payment.booking.availability_slot
-    if slot and slot.is_booked and payment.booking.payment_status != Booking.PAYMENT_PAID:
-        slot.is_booked = False
-        slot.save(update_fields=['is_booked', 'updated_at'])
+    # Marks the booking failed and frees its slot
+    release_hold(payment.booking, error_description or 'Payment failed.')
 
     return JsonResponse({'success': True})
 
+
+@staff_member_required
+@require_GET
+def gateway_metrics(request):
+    """Latency, error and circuit breaker figures for this worker's payment gateway calls."""
+    return JsonResponse({'pid': os.getpid(), **get_gateway().metrics()})
+
+
+@csrf_exempt
+@require_POST
+def razorpay_webhook(request):
+    """Log a signed Razorpay event and acknowledge it; the payment event worker applies it."""
+    signature = request.headers.get('X-Razorpay-Signature', '')
+    if not verify_signature(request.body, signature, settings.RAZORPAY_WEBHOOK_SECRET):
+        return JsonResponse({'success': False, 'error': 'Invalid signature.'}, status=400)
+
+    try:
+        record_event(request.body, request.headers.get('X-Razorpay-Event-Id'))
+    except ValueError:
+        return JsonResponse({'success': False, 'error': 'Invalid payload.'}, status=400)
+
+    return JsonResponse({'success': True})
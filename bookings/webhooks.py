@@ -0,0 +1,158 @@
+"""Razorpay webhook ingestion and the worker that applies the events.
+
+The webhook view only checks the signature and appends the event to the
+``PaymentEvent`` log before answering, so Razorpay gets its acknowledgement at
+once. The log is keyed by Razorpay's event id, which makes redeliveries no-ops.
+``process_events``, run by the ``process_payment_events`` command, then applies
+pending events in the order they arrived:
+
+* ``payment.captured`` confirms the booking (the same path as the browser
+  callback, so a booking is confirmed even if that callback never arrives),
+* ``payment.failed`` releases a still pending hold,
+* ``refund.processed`` records the refund on the payment, once per refund id.
+
+An event that cannot be applied yet (e.g. its order is not recorded yet) stays
+pending and is retried with exponential backoff, starting at
+``RETRY_BASE_SECONDS`` and capped at ``RETRY_MAX_SECONDS``, for up to
+``MAX_ATTEMPTS`` attempts (a few hours) before it is marked failed.
+"""
+import hashlib
+import hmac
+import json
+from datetime import timedelta
+from decimal import Decimal
+
+from django.db import transaction
+from django.utils import timezone
+
+from .models import Booking, Payment, PaymentEvent
+from .reservations import confirm_payment, release_hold
+
+PAYMENT_CAPTURED = 'payment.captured'
+PAYMENT_FAILED = 'payment.failed'
+REFUND_PROCESSED = 'refund.processed'
+HANDLED_EVENTS = (PAYMENT_CAPTURED, PAYMENT_FAILED, REFUND_PROCESSED)
+
+BATCH_SIZE = 100
+MAX_ATTEMPTS = 12
+RETRY_BASE_SECONDS = 5
+RETRY_MAX_SECONDS = 60 * 60
+
+
+def sign(body, secret):
+    """Razorpay's webhook signature: hex HMAC-SHA256 of the raw body."""
+    return hmac.new(secret.encode(), body, hashlib.sha256).hexdigest()
+
+
+def verify_signature(body, signature, secret):
+    if not secret or not signature:
+        return False
+    return hmac.compare_digest(sign(body, secret), signature)
+
+
+def record_event(body, event_id=None):
+    """Append a webhook body to the event log; returns the event type, or None if it is not one we handle.
+
+    Raises ``ValueError`` for a body that is not a JSON event. Razorpay's event
+    id header is the dedupe key; without it, a hash of the body is.
+    """
+    data = json.loads(body)
+    if not isinstance(data, dict):
+        raise ValueError('Webhook body is not an event object.')
+    event_type = data.get('event')
+    if event_type not in HANDLED_EVENTS:
+        return None
+    PaymentEvent.objects.bulk_create(
+        [PaymentEvent(
+            event_id=event_id or hashlib.sha256(body).hexdigest(),
+            event_type=event_type,
+            payload=data,
+        )],
+        ignore_conflicts=True,
+    )
+    return event_type
+
+
+def _entity(event, name):
+    return event.payload.get('payload', {}).get(name, {}).get('entity', {})
+
+
+def _payment_for_order(order_id):
+    try:
+        return Payment.objects.select_related('booking').get(razorpay_order_id=order_id)
+    except Payment.DoesNotExist:
+        raise LookupError(f'No payment for order {order_id} yet.') from None
+
+
+def _payment_captured(event):
+    entity = _entity(event, 'payment')
+    payment = _payment_for_order(entity.get('order_id'))
+    if entity.get('amount') != int(payment.amount * 100):
+        raise ValueError(f"Captured {entity.get('amount')} paise for a payment of {payment.amount}.")
+    if not confirm_payment(payment, entity.get('id'), payload=event.payload):
+        print(f"Payment {entity.get('id')} captured for booking {payment.booking.booking_reference}, "
+              f"which could not be confirmed (slot taken or already refunded).")
+
+
+def _payment_failed(event):
+    entity = _entity(event, 'payment')
+    payment = _payment_for_order(entity.get('order_id'))
+    # Only releases a pending hold; a later attempt on the same order may still be captured.
+    release_hold(payment.booking, entity.get('error_description') or 'Payment failed.', event.payload)
+
+
+def _refund_processed(event):
+    entity = _entity(event, 'refund')
+    with transaction.atomic():
+        try:
+            payment = Payment.objects.select_for_update().get(razorpay_payment_id=entity.get('payment_id'))
+        except Payment.DoesNotExist:
+            raise LookupError(f"No payment {entity.get('payment_id')} yet.") from None
+        payment.mark_refunded(entity.get('id'), Decimal(entity.get('amount', 0)) / 100, event.payload)
+        if payment.status == Payment.STATUS_REFUNDED:
+            Booking.objects.filter(pk=payment.booking_id).update(
+                payment_status=Booking.PAYMENT_REFUNDED,
+                updated_at=timezone.now(),
+            )
+
+
+HANDLERS = {
+    PAYMENT_CAPTURED: _payment_captured,
+    PAYMENT_FAILED: _payment_failed,
+    REFUND_PROCESSED: _refund_processed,
+}
+
+
+def retry_delay(attempts):
+    """Wait before the next try of an event that has failed ``attempts`` times."""
+    return timedelta(seconds=min(RETRY_BASE_SECONDS * 2 ** (attempts - 1), RETRY_MAX_SECONDS))
+
+
+def process_events(batch_size=BATCH_SIZE):
+    """Apply up to ``batch_size`` due pending events, oldest first; returns how many were tried.
+
+    Rows are claimed with ``skip_locked`` so several workers can run at once.
+    """
+    with transaction.atomic():
+        batch = list(
+            PaymentEvent.objects.select_for_update(skip_locked=True)
+            .filter(status=PaymentEvent.STATUS_PENDING, next_attempt_at__lte=timezone.now())
+            .order_by('received_at', 'pk')[:batch_size]
+        )
+        for event in batch:
+            event.attempts += 1
+            try:
+                with transaction.atomic():
+                    HANDLERS[event.event_type](event)
+            except Exception as exc:
+                event.last_error = str(exc)
+                if event.attempts >= MAX_ATTEMPTS:
+                    event.status = PaymentEvent.STATUS_FAILED
+                else:
+                    event.next_attempt_at = timezone.now() + retry_delay(event.attempts)
+            else:
+                event.status = PaymentEvent.STATUS_PROCESSED
+                event.processed_at = timezone.now()
+                event.last_error = ''
+            event.save(update_fields=['status', 'attempts', 'last_error', 'next_attempt_at', 'processed_at'])
+    return len(batch)
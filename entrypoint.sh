@@ -10,11 +10,16 @@ sleep 3
 # echo "Applying database migrations..."
 # python manage.py migrate --noinput
 
+echo "Indexing counsellors missing from directory search..."
+python manage.py rebuild_search_index --missing
+
 echo "Collecting static files..."
 python manage.py collectstatic --noinput
 
 
 echo "Starting Gunicorn..."
-gunicorn Mind_Ease.wsgi:application \
+# ASGI workers, so long-lived event streams do not tie up a worker each
+gunicorn Mind_Ease.asgi:application \
+    --worker-class uvicorn.workers.UvicornWorker \
     --bind 0.0.0.0:8000 \
     --workers 3
@@ -31,6 +31,13 @@ class Resources(models.Model):
 
     class Meta:
             ordering = ['-featured', '-rating', '-created_at']  # default ordering
+            # One index per listing sort order (see resources.views.SORT_ORDERINGS)
+            indexes = [
+                models.Index(fields=['featured', 'rating', 'created_at', 'id']),
+                models.Index(fields=['views', 'rating', 'id']),
+                models.Index(fields=['created_at', 'id']),
+                models.Index(fields=['title', 'id']),
+            ]
 
     def __str__(self):
         return self.title
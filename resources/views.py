@@ -1,8 +1,18 @@
 from django.shortcuts import render
 from django.core.paginator import Paginator
 from django.db.models import Q
+from Mind_Ease.pagination import KeysetPaginator
 from .models import Resources
 
+SORT_ORDERINGS = {
+    'newest': ('-created_at', '-pk'),
+    # using views then rating
+    'popular': ('-views', '-rating', '-pk'),
+    'title': ('title', 'pk'),
+    # Featured first then rating then newest
+    'recommended': ('-featured', '-rating', '-created_at', '-pk'),
+}
+
 def resource_list(request):
     qs = Resources.objects.all()
 
@@ -33,27 +43,31 @@ def resource_list(request):
         qs = qs.filter(difficulty__iexact=difficulty)
 
     # --- Sorting ---
-    if sort == 'newest':
-        qs = qs.order_by('-created_at')
-    elif sort == 'popular':
-        # using views then rating
-        qs = qs.order_by('-views', '-rating')
-    elif sort == 'title':
-        qs = qs.order_by('title')
-    else:  # recommended (default)
-        # Featured first then rating then newest
-        qs = qs.order_by('-featured', '-rating', '-created_at')
+    # Each ordering ends in the primary key so it can double as a keyset cursor.
+    ordering = SORT_ORDERINGS.get(sort, SORT_ORDERINGS['recommended'])
+    qs = qs.order_by(*ordering)
 
     # --- Pagination ---
+    # ?cursor= switches to keyset paging: no COUNT(*)/OFFSET, approximate total.
     ITEMS_PER_PAGE = 9
-    paginator = Paginator(qs, ITEMS_PER_PAGE)
-    page_obj = paginator.get_page(page)
+    page_obj = None
+    cursor_page = None
+    if 'cursor' in request.GET:
+        cursor_page = KeysetPaginator(qs, ordering, ITEMS_PER_PAGE).get_page(request.GET.get('cursor'))
+        resources = cursor_page.object_list
+        total_resources = cursor_page.approximate_total
+    else:
+        paginator = Paginator(qs, ITEMS_PER_PAGE)
+        page_obj = paginator.get_page(page)
+        resources = page_obj.object_list
+        total_resources = paginator.count  # cached by get_page, no second COUNT
 
     # Useful context to maintain selected filters in the template
     context = {
         'page_obj': page_obj,
-        'resources': page_obj.object_list,
-        'total_resources': qs.count(),
+        'cursor_page': cursor_page,
+        'resources': resources,
+        'total_resources': total_resources,
         'selected_search': search,
         'selected_types': types,
         'selected_categories': categories,
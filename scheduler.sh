@@ -0,0 +1,28 @@
+#!/bin/bash
+# Runs the periodic management commands. Each job runs once its interval has
+# passed; a failing job is logged and retried at its next interval.
+set -u
+
+last_hourly=0
+last_daily=0
+
+while true; do
+    now=$(date +%s)
+
+    # Every pass: frees slots whose payment hold has lapsed.
+    python manage.py release_expired_holds || echo "release_expired_holds failed"
+
+    if (( now - last_hourly >= 3600 )); then
+        # The booking window moves with the clock, so next-available summaries go stale.
+        python manage.py refresh_availability_summaries || echo "refresh_availability_summaries failed"
+        last_hourly=$now
+    fi
+
+    if (( now - last_daily >= 86400 )); then
+        # Keeps CounsellorAvailability down to current and future slots.
+        python manage.py purge_past_slots || echo "purge_past_slots failed"
+        last_daily=$now
+    fi
+
+    sleep 60
+done
@@ -1,6 +1,6 @@
 from django.contrib import admin
 
-from .models import CounsellorAvailability
+from .models import ArchivedAvailability, AvailabilityException, AvailabilityRule, CounsellorAvailability
 
 
 @admin.register(CounsellorAvailability)
@@ -13,3 +13,38 @@ class CounsellorAvailabilityAdmin(admin.ModelAdmin):
         "date",
     )
     ordering = ("-date", "start_time")
+
+
+@admin.register(AvailabilityRule)
+class AvailabilityRuleAdmin(admin.ModelAdmin):
+    list_display = ("counsellor", "weekday", "start_time", "end_time", "is_active")
+    list_filter = ("weekday", "is_active")
+    search_fields = (
+        "counsellor__user__first_name",
+        "counsellor__user__last_name",
+    )
+    ordering = ("counsellor", "weekday", "start_time")
+
+
+@admin.register(AvailabilityException)
+class AvailabilityExceptionAdmin(admin.ModelAdmin):
+    list_display = ("counsellor", "date", "start_time", "end_time", "reason")
+    list_filter = ("date",)
+    search_fields = (
+        "counsellor__user__first_name",
+        "counsellor__user__last_name",
+    )
+    ordering = ("-date", "start_time")
+
+
+@admin.register(ArchivedAvailability)
+class ArchivedAvailabilityAdmin(admin.ModelAdmin):
+    list_display = ("counsellor", "date", "start_time", "end_time", "booking", "archived_at")
+    list_filter = ("date",)
+    search_fields = (
+        "counsellor__user__first_name",
+        "counsellor__user__last_name",
+        "booking__booking_reference",
+    )
+    raw_id_fields = ("counsellor", "booking")
+    ordering = ("-date", "-start_time")
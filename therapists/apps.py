@@ -1,6 +1,23 @@
 from django.apps import AppConfig
+from django.db import connections
+from django.db.models.signals import post_migrate, pre_migrate
+
+
+def ensure_btree_gist(using="default", **kwargs):
+    """Install btree_gist before migrating; the slot overlap constraint needs it (run from ``pre_migrate``)."""
+    connection = connections[using]
+    if connection.vendor == "postgresql":
+        with connection.cursor() as cursor:
+            cursor.execute("CREATE EXTENSION IF NOT EXISTS btree_gist")
 
 
 class TherapistsConfig(AppConfig):
     default_auto_field = 'django.db.models.BigAutoField'
     name = 'therapists'
+
+    def ready(self):
+        from therapists import signals  # noqa: F401
+        from therapists.search import ensure_search_backend
+
+        pre_migrate.connect(ensure_btree_gist, sender=self)
+        post_migrate.connect(ensure_search_backend, sender=self)
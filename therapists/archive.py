@@ -0,0 +1,76 @@
+"""Keep ``CounsellorAvailability`` limited to current and future slots.
+
+Slots from past days are either dead weight (never booked) or history
+(booked). ``purge_expired_slots`` deletes the former and
+``archive_booked_slots`` copies the latter, with the booking they served, into
+``ArchivedAvailability`` before deleting them. Both work in bounded batches,
+each in its own transaction, so a large backlog never holds long locks.
+"""
+from django.db import transaction
+
+from bookings.models import Booking
+from therapists.models import ArchivedAvailability, CounsellorAvailability
+
+DEFAULT_BATCH_SIZE = 1000
+
+
+def _batches(queryset, batch_size):
+    """Yield lists of up to ``batch_size`` primary keys until ``queryset`` is empty."""
+    while True:
+        ids = list(queryset.order_by("pk").values_list("pk", flat=True)[:batch_size])
+        if not ids:
+            return
+        yield ids
+
+
+def purge_expired_slots(cutoff, batch_size=DEFAULT_BATCH_SIZE):
+    """Delete unbooked slots dated before ``cutoff``; returns how many were removed."""
+    removed = 0
+    expired = CounsellorAvailability.objects.filter(date__lt=cutoff, is_booked=False)
+    for ids in _batches(expired, batch_size):
+        with transaction.atomic():
+            # Bookings whose payment failed still point at their released slot; they are set to NULL.
+            _total, per_model = CounsellorAvailability.objects.filter(pk__in=ids, is_booked=False).delete()
+        removed += per_model.get(CounsellorAvailability._meta.label, 0)
+    return removed
+
+
+def archive_booked_slots(cutoff, batch_size=DEFAULT_BATCH_SIZE):
+    """Move booked slots dated before ``cutoff`` to ``ArchivedAvailability``; returns how many moved."""
+    moved = 0
+    booked = CounsellorAvailability.objects.filter(date__lt=cutoff, is_booked=True)
+    for ids in _batches(booked, batch_size):
+        with transaction.atomic():
+            slots = list(
+                CounsellorAvailability.objects.select_for_update()
+                .filter(pk__in=ids, is_booked=True)
+                .values("pk", "counsellor_id", "date", "start_time", "end_time", "duration_minutes")
+            )
+            bookings = {}
+            for slot_id, booking_id in (
+                Booking.objects.filter(availability_slot_id__in=ids)
+                .exclude(payment_status=Booking.PAYMENT_FAILED)
+                .order_by("created_at")
+                .values_list("availability_slot_id", "pk")
+            ):
+                # The latest booking that held the slot is the one it was booked for.
+                bookings[slot_id] = booking_id
+            ArchivedAvailability.objects.bulk_create(
+                [
+                    ArchivedAvailability(
+                        slot_id=slot["pk"],
+                        counsellor_id=slot["counsellor_id"],
+                        booking_id=bookings.get(slot["pk"]),
+                        date=slot["date"],
+                        start_time=slot["start_time"],
+                        end_time=slot["end_time"],
+                        duration_minutes=slot["duration_minutes"],
+                    )
+                    for slot in slots
+                ],
+                # A run interrupted after the insert but before the delete left copies behind.
+                ignore_conflicts=True,
+            )
+            CounsellorAvailability.objects.filter(pk__in=[slot["pk"] for slot in slots]).delete()
+        moved += len(slots)
+    return moved
@@ -0,0 +1,108 @@
+"""In-memory prefix index behind the directory search typeahead.
+
+Each worker holds a sorted array of lowercased keys (counsellor names plus
+active specializations, therapy approaches and languages) and answers a
+prefix with a ``bisect`` into it, so keystroke queries never reach the
+database. The index is built on first use and rebuilt whenever the directory
+or taxonomy version moves.
+"""
+import bisect
+import threading
+from urllib.parse import urlencode
+
+from django.urls import reverse
+
+from accounts.models import Language, Specialization, TherapyApproach
+from accounts.taxonomy import registry as taxonomy
+from accounts.taxonomy import taxonomy_version
+from therapists.directory import directory_version, listed_counsellors
+
+DEFAULT_LIMIT = 8
+MAX_LIMIT = 20
+
+# Suggestion type -> (taxonomy model, directory filter param)
+TAXONOMY_SUGGESTIONS = {
+    "specialization": (Specialization, "specialization"),
+    "approach": (TherapyApproach, "approach"),
+    "language": (Language, "language"),
+}
+
+
+def normalize(text):
+    return " ".join((text or "").lower().split())
+
+
+class PrefixIndex:
+    def __init__(self):
+        self.version = None
+        # (keys, entries) swapped in as one tuple so a reader never pairs new keys with old entries.
+        self.data = ([], [])
+
+    def build(self):
+        pairs = []
+        for user_id, first_name, last_name in listed_counsellors().values_list(
+            "user_id", "user__first_name", "user__last_name",
+        ):
+            label = f"{first_name} {last_name}".strip()
+            entry = {
+                "type": "counsellor",
+                "id": user_id,
+                "label": label,
+                "url": reverse("counsellor_detail", args=[user_id]),
+            }
+            # Match on the full name and on each later name part ("smi" finds "Ann Smith").
+            words = normalize(label).split()
+            for position in range(len(words)):
+                pairs.append((" ".join(words[position:]), entry))
+
+        directory_url = reverse("therapists")
+        for kind, (model, param) in TAXONOMY_SUGGESTIONS.items():
+            for item in taxonomy.active(model):
+                entry = {
+                    "type": kind,
+                    "id": item.id,
+                    "label": item.name,
+                    "url": f"{directory_url}?{urlencode({param: item.id})}",
+                }
+                pairs.append((normalize(item.name), entry))
+
+        pairs.sort(key=lambda pair: (pair[0], pair[1]["label"]))
+        self.data = ([key for key, _entry in pairs], [entry for _key, entry in pairs])
+
+    def search(self, prefix, limit):
+        keys, entries = self.data
+        results = []
+        seen = set()
+        position = bisect.bisect_left(keys, prefix)
+        while position < len(keys) and keys[position].startswith(prefix):
+            entry = entries[position]
+            identity = (entry["type"], entry["id"])
+            if identity not in seen:
+                seen.add(identity)
+                results.append(entry)
+                if len(results) >= limit:
+                    break
+            position += 1
+        return results
+
+
+_index = PrefixIndex()
+_lock = threading.Lock()
+
+
+def get_index():
+    version = (directory_version(), taxonomy_version())
+    if _index.version != version:
+        with _lock:
+            if _index.version != version:
+                _index.build()
+                _index.version = version
+    return _index
+
+
+def suggest(query, limit=DEFAULT_LIMIT):
+    """Suggestions whose name (or a later word of it) starts with ``query``."""
+    prefix = normalize(query)
+    if not prefix:
+        return []
+    return get_index().search(prefix, max(1, min(limit, MAX_LIMIT)))
@@ -0,0 +1,178 @@
+"""Derived availability data kept on ``Counsellor`` for the directory.
+
+``Counsellor.next_available_at`` (first bookable free slot) and
+``Counsellor.free_slots_next_7_days`` let the directory filter and sort by
+availability through an index instead of joining ``CounsellorAvailability``
+for every listed counsellor. They are refreshed whenever a slot changes
+(``slots_changed``) and, because the booking window moves with the clock, by
+the ``refresh_availability_summaries`` command on a schedule. Counsellors with
+weekly rules are summarized from their generated slots over a bounded horizon.
+
+Each counsellor also has an availability version in the cache, bumped on
+commit of any slot, rule or exception write, which keys cached calendars.
+Cached single days are keyed more narrowly: on a version per counsellor-day,
+bumped only when a slot on that day changes, and a schedule version, bumped
+when weekly rules or exceptions change (which can move any day).
+"""
+import time
+from datetime import datetime, timedelta
+
+from django.core.cache import cache
+from django.db import transaction
+from django.db.models import Count, Min, Q
+from django.utils import timezone
+
+from accounts.models import Counsellor
+from therapists.directory import bump_directory_version
+from therapists.models import CounsellorAvailability
+from therapists.rules import counsellors_with_rules, materialize
+
+BOOKING_LEAD_DAYS = 3
+SOON_WINDOW_DAYS = 7
+# How far ahead rule-generated slots are considered for the summary.
+RULE_HORIZON_DAYS = 60
+
+AVAILABILITY_VERSION_KEY = "therapists:availability:version:{}"
+SCHEDULE_VERSION_KEY = "therapists:availability:schedule:{}"
+DAY_VERSION_KEY = "therapists:availability:day:{}:{}"
+# Day versions only need to outlive the cached days keyed on them.
+DAY_VERSION_TIMEOUT = 60 * 60 * 24
+
+
+def _version(key, timeout=None):
+    version = cache.get(key)
+    if version is None:
+        cache.add(key, time.time_ns(), timeout)
+        version = cache.get(key, 0)
+    return version
+
+
+def _bump(key, timeout=None):
+    try:
+        cache.incr(key)
+    except ValueError:
+        cache.set(key, time.time_ns(), timeout)
+
+
+def availability_version(counsellor_id):
+    return _version(AVAILABILITY_VERSION_KEY.format(counsellor_id))
+
+
+def bump_availability_version(counsellor_ids):
+    for counsellor_id in set(counsellor_ids):
+        _bump(AVAILABILITY_VERSION_KEY.format(counsellor_id))
+
+
+def day_version(counsellor_id, day):
+    """(schedule version, day version) for one counsellor-day."""
+    schedule_key = SCHEDULE_VERSION_KEY.format(counsellor_id)
+    day_key = DAY_VERSION_KEY.format(counsellor_id, day.isoformat())
+    versions = cache.get_many([schedule_key, day_key])
+    schedule = versions.get(schedule_key)
+    if schedule is None:
+        schedule = _version(schedule_key)
+    current = versions.get(day_key)
+    if current is None:
+        current = _version(day_key, DAY_VERSION_TIMEOUT)
+    return schedule, current
+
+
+def bump_day_versions(counsellor_id, days):
+    for day in set(days):
+        _bump(DAY_VERSION_KEY.format(counsellor_id, day.isoformat()), DAY_VERSION_TIMEOUT)
+
+
+def bump_schedule_version(counsellor_ids):
+    for counsellor_id in set(counsellor_ids):
+        _bump(SCHEDULE_VERSION_KEY.format(counsellor_id))
+
+
+def earliest_bookable_date():
+    return timezone.localdate() + timedelta(days=BOOKING_LEAD_DAYS)
+
+
+def refresh_availability_summary(counsellor_ids):
+    """Recompute the availability summary for the given counsellors; returns how many changed."""
+    counsellor_ids = set(counsellor_ids)
+    if not counsellor_ids:
+        return 0
+
+    first_day = earliest_bookable_date()
+    window_end = first_day + timedelta(days=SOON_WINDOW_DAYS)
+    free_slots = CounsellorAvailability.objects.filter(
+        counsellor_id__in=counsellor_ids,
+        is_booked=False,
+        date__gte=first_day,
+    ).order_by()
+
+    summary = {}
+    for row in free_slots.values("counsellor_id").annotate(
+        first_date=Min("date"),
+        soon_count=Count("id", filter=Q(date__lt=window_end)),
+    ):
+        summary[row["counsellor_id"]] = [row["first_date"], None, row["soon_count"]]
+
+    if summary:
+        first_day_filter = Q()
+        for counsellor_id, (first_date, _time, _count) in summary.items():
+            first_day_filter |= Q(counsellor_id=counsellor_id, date=first_date)
+        for row in free_slots.filter(first_day_filter).values("counsellor_id").annotate(
+            first_time=Min("start_time"),
+        ):
+            summary[row["counsellor_id"]][1] = row["first_time"]
+
+    rule_ids = counsellors_with_rules(counsellor_ids)
+    if rule_ids:
+        horizon_end = first_day + timedelta(days=RULE_HORIZON_DAYS - 1)
+        rule_counsellors = Counsellor.objects.filter(pk__in=rule_ids).only(
+            "pk", "default_session_duration", "default_break_duration",
+        )
+        for counsellor_id, slots in materialize(rule_counsellors, first_day, horizon_end).items():
+            free = [slot for slot in slots if not slot.is_booked]
+            # Stored slots past the horizon still count when nothing earlier is free.
+            if free:
+                summary[counsellor_id] = [
+                    free[0].date,
+                    free[0].start_time,
+                    sum(1 for slot in free if slot.date < window_end),
+                ]
+
+    changed = []
+    for counsellor in Counsellor.objects.filter(pk__in=counsellor_ids).only(
+        "pk", "next_available_at", "free_slots_next_7_days",
+    ):
+        next_available_at = None
+        soon_count = 0
+        if counsellor.pk in summary:
+            first_date, first_time, soon_count = summary[counsellor.pk]
+            next_available_at = timezone.make_aware(datetime.combine(first_date, first_time))
+        if (counsellor.next_available_at, counsellor.free_slots_next_7_days) != (next_available_at, soon_count):
+            counsellor.next_available_at = next_available_at
+            counsellor.free_slots_next_7_days = soon_count
+            changed.append(counsellor)
+
+    if changed:
+        # Queryset-level update: no post_save, so bump the directory explicitly.
+        Counsellor.objects.bulk_update(changed, ["next_available_at", "free_slots_next_7_days"])
+        changed_ids = [counsellor.pk for counsellor in changed]
+        transaction.on_commit(lambda: bump_directory_version(changed_ids))
+    return len(changed)
+
+
+def slots_changed(counsellor_id, days=None):
+    """Call after any write that creates, removes, books or releases a counsellor's slots.
+
+    ``days`` are the dates whose slots changed; None means any day may have
+    (weekly rules or exceptions were edited).
+    """
+    days = None if days is None else set(days)
+
+    def refresh():
+        bump_availability_version([counsellor_id])
+        if days is None:
+            bump_schedule_version([counsellor_id])
+        else:
+            bump_day_versions(counsellor_id, days)
+        refresh_availability_summary([counsellor_id])
+
+    transaction.on_commit(refresh)
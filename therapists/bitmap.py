@@ -0,0 +1,121 @@
+"""Compact bitmap representation of one counsellor-day.
+
+A day is split into fixed buckets (5 minutes by default, 288 per day) and kept
+as three int bitsets: time covered by free slots, time covered by booked
+slots, and the buckets where a slot starts. "Is this time free" is one shift
+and mask, overlap with a proposed slot is one AND, and the whole day encodes
+to three short base64 strings for the wire instead of one JSON object per
+slot. The start bits keep back-to-back slots apart, so slots can be rebuilt
+from the encoding. Days with times off the 5-minute grid use 1-minute buckets
+so nothing is rounded.
+"""
+import base64
+from datetime import time
+
+MINUTES_PER_DAY = 24 * 60
+DEFAULT_RESOLUTION = 5
+RESOLUTIONS = (1, DEFAULT_RESOLUTION)
+
+
+def _minutes(value):
+    return value.hour * 60 + value.minute
+
+
+class DayBitmap:
+    def __init__(self, resolution=DEFAULT_RESOLUTION):
+        if resolution not in RESOLUTIONS:
+            raise ValueError(f"Unsupported bitmap resolution: {resolution}")
+        self.resolution = resolution
+        self.buckets = MINUTES_PER_DAY // resolution
+        self.free = 0
+        self.booked = 0
+        self.starts = 0
+
+    @classmethod
+    def from_slots(cls, slots, resolution=None):
+        """Bitmap of ``slots`` (objects with start_time, end_time and is_booked)."""
+        return cls.from_spans(((slot.start_time, slot.end_time, slot.is_booked) for slot in slots), resolution)
+
+    @classmethod
+    def from_spans(cls, spans, resolution=None):
+        """Bitmap of (start, end, is_booked) tuples; the resolution is picked to fit them exactly."""
+        spans = list(spans)
+        if resolution is None:
+            aligned = all(
+                _minutes(start) % DEFAULT_RESOLUTION == 0 and _minutes(end) % DEFAULT_RESOLUTION == 0
+                for start, end, _booked in spans
+            )
+            resolution = DEFAULT_RESOLUTION if aligned else 1
+        bitmap = cls(resolution)
+        for start, end, booked in spans:
+            bitmap.add(start, end, booked=booked)
+        return bitmap
+
+    def _bucket(self, value):
+        return _minutes(value) // self.resolution
+
+    def span(self, start, end):
+        """Mask of the buckets touched by [start, end); an end at or before start runs to midnight."""
+        first = self._bucket(start)
+        end_minutes = _minutes(end)
+        if end_minutes <= _minutes(start):
+            end_minutes = MINUTES_PER_DAY
+        last = -(-end_minutes // self.resolution)
+        return ((1 << (last - first)) - 1) << first
+
+    def add(self, start, end, booked=False):
+        mask = self.span(start, end)
+        if booked:
+            self.booked |= mask
+        else:
+            self.free |= mask
+        self.starts |= 1 << self._bucket(start)
+
+    def is_free(self, value):
+        return bool(self.free >> self._bucket(value) & 1)
+
+    def is_booked(self, value):
+        return bool(self.booked >> self._bucket(value) & 1)
+
+    def overlaps(self, start, end):
+        """Whether [start, end) touches any slot already in the bitmap."""
+        return bool((self.free | self.booked) & self.span(start, end))
+
+    def spans(self):
+        """(start, end, is_booked) for each slot, rebuilt from the bits."""
+        occupied = self.free | self.booked
+        bucket = 0
+        while bucket < self.buckets:
+            if not self.starts >> bucket & 1:
+                bucket += 1
+                continue
+            booked = bool(self.booked >> bucket & 1)
+            end = bucket + 1
+            while end < self.buckets and occupied >> end & 1 and not self.starts >> end & 1:
+                end += 1
+            yield self._time(bucket), self._time(end), booked
+            bucket = end
+
+    def _time(self, bucket):
+        minutes = bucket * self.resolution % MINUTES_PER_DAY
+        return time(minutes // 60, minutes % 60)
+
+    def _encode_bits(self, bits):
+        return base64.b64encode(bits.to_bytes((self.buckets + 7) // 8, "little")).decode("ascii")
+
+    def encode(self):
+        """Wire form: bit i of each base64 string is the bucket starting at minute i * resolution."""
+        return {
+            "resolution": self.resolution,
+            "free": self._encode_bits(self.free),
+            "booked": self._encode_bits(self.booked),
+            "starts": self._encode_bits(self.starts),
+        }
+
+    @classmethod
+    def decode(cls, data):
+        bitmap = cls(int(data.get("resolution", DEFAULT_RESOLUTION)))
+        for name in ("free", "booked", "starts"):
+            raw = base64.b64decode(data.get(name) or "")
+            setattr(bitmap, name, int.from_bytes(raw, "little"))
+        return bitmap
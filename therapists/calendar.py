@@ -0,0 +1,111 @@
+"""Per-day availability over a date range for the booking calendar.
+
+A counsellor's calendar for a window (at most ``MAX_CALENDAR_DAYS``) is built
+in one pass: a single grouped query over the ``(counsellor, date)`` index when
+only stored slots exist, or the materialized slots when weekly rules apply.
+Results are cached under the counsellor's availability version, which every
+slot, rule and exception write bumps, so cached calendars are never stale.
+
+The free slots of a single day, read on every date picked in the booking
+widget, are cached under that day's version instead, so a booking only
+retires the day it touched. A miss is written back by one request at a time:
+the first takes a short ``cache.add`` lock, and requests that find it taken
+compute the day themselves without caching it. They never sleep waiting for
+the filler, since sync views share one thread under ASGI and a sleeping
+waiter would stall every other request in the worker.
+"""
+from collections import defaultdict
+from datetime import timedelta
+
+from django.core.cache import cache
+from django.db.models import Count, Q
+
+from therapists.availability import availability_version, day_version
+from therapists.models import CounsellorAvailability
+from therapists.rules import counsellors_with_rules, materialize
+
+DEFAULT_CALENDAR_DAYS = 30
+MAX_CALENDAR_DAYS = 60
+CALENDAR_TIMEOUT = 60 * 60
+DAY_SLOTS_TIMEOUT = 60 * 60
+# Longest a filling request holds the lock.
+FILL_LOCK_TIMEOUT = 5
+
+
+def _day_counts(counsellor, start, end):
+    rows = CounsellorAvailability.objects.filter(
+        counsellor=counsellor,
+        date__gte=start,
+        date__lte=end,
+    ).order_by().values("date").annotate(
+        total=Count("id"),
+        free=Count("id", filter=Q(is_booked=False)),
+    )
+    return {row["date"]: (row["free"], row["total"]) for row in rows}
+
+
+def _build(counsellor, start, end, include_slots):
+    counts = {}
+    free_slots = defaultdict(list)
+    if include_slots or counsellors_with_rules([counsellor.pk]):
+        for slot in materialize([counsellor], start, end)[counsellor.pk]:
+            free, total = counts.get(slot.date, (0, 0))
+            counts[slot.date] = (free + (not slot.is_booked), total + 1)
+            if not slot.is_booked:
+                free_slots[slot.date].append(slot)
+    else:
+        counts = _day_counts(counsellor, start, end)
+
+    days = []
+    day = start
+    while day <= end:
+        free, total = counts.get(day, (0, 0))
+        days.append({"date": day, "free": free, "total": total})
+        day += timedelta(days=1)
+
+    calendar = {"days": days}
+    if include_slots:
+        calendar["slots"] = dict(free_slots)
+    return calendar
+
+
+def availability_calendar(counsellor, start, end, include_slots=False):
+    """Free and total slot counts for every day in [start, end], optionally with the free slots.
+
+    Returns {"days": [{"date", "free", "total"}, ...]} plus, with ``include_slots``,
+    "slots": {date: [CounsellorAvailability, ...]}.
+    """
+    key = (
+        f"therapists:calendar:{counsellor.pk}:{availability_version(counsellor.pk)}"
+        f":{start.isoformat()}:{end.isoformat()}:{int(include_slots)}"
+    )
+    calendar = cache.get(key)
+    if calendar is None:
+        calendar = _build(counsellor, start, end, include_slots)
+        cache.set(key, calendar, CALENDAR_TIMEOUT)
+    return calendar
+
+
+def _free_slots(counsellor, day):
+    return [slot for slot in materialize([counsellor], day, day)[counsellor.pk] if not slot.is_booked]
+
+
+def day_slots(counsellor, day):
+    """The counsellor's free slots on ``day``, stored and rule-generated, from cache when possible."""
+    schedule, version = day_version(counsellor.pk, day)
+    key = f"therapists:day-slots:{counsellor.pk}:{day.isoformat()}:{schedule}:{version}"
+    slots = cache.get(key)
+    if slots is not None:
+        return slots
+
+    lock_key = f"{key}:lock"
+    if not cache.add(lock_key, 1, FILL_LOCK_TIMEOUT):
+        # Another request is filling the cache; answer from the database without writing.
+        return _free_slots(counsellor, day)
+
+    try:
+        slots = _free_slots(counsellor, day)
+        cache.set(key, slots, DAY_SLOTS_TIMEOUT)
+    finally:
+        cache.delete(lock_key)
+    return slots
@@ -0,0 +1,177 @@
+"""Filter parsing and cache versioning for the public therapist directory."""
+import time
+from datetime import timedelta
+from decimal import Decimal, InvalidOperation
+
+from django.core.cache import cache
+from django.db.models import Q, Value
+from django.db.models.functions import Coalesce
+from django.utils import timezone
+
+from accounts.models import NO_OPENING, Counsellor
+from therapists.search import filter_by_search
+
+DIRECTORY_VERSION_KEY = "therapists:directory:version"
+# Counsellor ids touched by each version bump, so worker-local indexes can
+# catch up incrementally instead of rebuilding (see therapists.matching).
+DIRECTORY_CHANGES_KEY = "therapists:directory:changes:{}"
+DIRECTORY_CHANGES_TIMEOUT = 60 * 60
+
+FILTER_KEYS = (
+    "search",
+    "specialization",
+    "language",
+    "approach",
+    "age_group",
+    "min_experience",
+    "max_experience",
+    "min_price",
+    "max_price",
+    "min_rating",
+    "available_within",
+)
+
+# Sort param -> ordering. Every ordering ends in the primary key so it is total,
+# which keeps pages stable and lets them be used as keyset cursors.
+SORT_ORDERINGS = {
+    "price_low": ("session_fee", "pk"),
+    "lowest_fee": ("session_fee", "pk"),
+    "price_high": ("-session_fee", "-pk"),
+    "experience": ("-years_experience", "-pk"),
+    "rating": ("-rating", "-pk"),
+    "highest_rated": ("-rating", "-pk"),
+    "newest": ("-created_at", "-pk"),
+    "soonest": ("next_opening", "pk"),
+}
+DEFAULT_ORDERING = ("user__first_name", "pk")
+# (key, label, lower bound inclusive, upper bound exclusive)
+PRICE_BANDS = (
+    ("under_500", "Under ₹500", None, 500),
+    ("500_1000", "₹500 - ₹1,000", 500, 1000),
+    ("1000_2000", "₹1,000 - ₹2,000", 1000, 2000),
+    ("2000_plus", "₹2,000+", 2000, None),
+)
+
+# Mirrors Counsellor.experience_level().
+EXPERIENCE_BANDS = (
+    ("beginner", "0-2 years", 0, 3),
+    ("intermediate", "3-5 years", 3, 6),
+    ("experienced", "6-10 years", 6, 11),
+    ("expert", "10+ years", 11, None),
+)
+
+
+def band_for(value, bands):
+    for key, _label, low, high in bands:
+        if (low is None or value >= low) and (high is None or value < high):
+            return key
+    return None
+
+
+def _parse_int(value):
+    if not value:
+        return None
+    try:
+        return int(value)
+    except (ValueError, TypeError):
+        return None
+
+
+def _parse_decimal(value):
+    if not value:
+        return None
+    try:
+        parsed = Decimal(value)
+    except (InvalidOperation, TypeError):
+        return None
+    return parsed if parsed.is_finite() else None
+
+
+def parse_filters(params):
+    """Normalize directory query params into a filters dict; invalid values are dropped."""
+    return {
+        "search": (params.get("search") or "").strip(),
+        "specialization": _parse_int(params.get("specialization")),
+        "language": _parse_int(params.get("language")),
+        "approach": _parse_int(params.get("approach")),
+        "age_group": _parse_int(params.get("age_group")),
+        "min_experience": _parse_int(params.get("min_experience")),
+        "max_experience": _parse_int(params.get("max_experience")),
+        "min_price": _parse_decimal(params.get("min_price")),
+        "max_price": _parse_decimal(params.get("max_price")),
+        "min_rating": _parse_decimal(params.get("min_rating")),
+        # Days from now within which the counsellor's first bookable slot falls
+        "available_within": _parse_int(params.get("available_within")),
+    }
+
+
+def ordering_for(sort):
+    return SORT_ORDERINGS.get(sort, DEFAULT_ORDERING)
+
+
+def listed_counsellors():
+    """Counsellors that are visible in the public directory."""
+    return Counsellor.objects.filter(is_active=True, user__is_approved=True)
+
+
+def apply_filters(queryset, filters, skip=()):
+    """Apply a parsed filters dict to a Counsellor queryset, except the names in ``skip``."""
+    filters = {name: None if name in skip else value for name, value in filters.items()}
+    if filters["search"]:
+        queryset = filter_by_search(queryset, filters["search"])
+    if filters["specialization"] is not None:
+        queryset = queryset.filter(specializations__id=filters["specialization"])
+    if filters["language"] is not None:
+        queryset = queryset.filter(languages__id=filters["language"])
+    if filters["approach"] is not None:
+        queryset = queryset.filter(therapy_approaches__id=filters["approach"])
+    if filters["age_group"] is not None:
+        queryset = queryset.filter(age_groups__id=filters["age_group"])
+    if filters["min_experience"] is not None:
+        queryset = queryset.filter(years_experience__gte=filters["min_experience"])
+    if filters["max_experience"] is not None:
+        queryset = queryset.filter(years_experience__lte=filters["max_experience"])
+    if filters["min_price"] is not None:
+        queryset = queryset.filter(session_fee__gte=filters["min_price"])
+    if filters["max_price"] is not None:
+        queryset = queryset.filter(session_fee__lte=filters["max_price"])
+    if filters["min_rating"] is not None:
+        queryset = queryset.filter(rating__gte=filters["min_rating"])
+    if filters["available_within"] is not None:
+        now = timezone.now()
+        queryset = queryset.filter(
+            next_available_at__gte=now,
+            next_available_at__lt=now + timedelta(days=filters["available_within"]),
+        )
+    return queryset
+
+
+def apply_ordering(queryset, ordering):
+    if ordering[0] == "next_opening":
+        # Matches the counsellors_next_opening_idx expression index. An opening already in the
+        # past is stale until the next summary refresh and would sort ahead of real ones.
+        queryset = queryset.filter(
+            Q(next_available_at__isnull=True) | Q(next_available_at__gte=timezone.now()),
+        ).annotate(next_opening=Coalesce("next_available_at", Value(NO_OPENING)))
+    return queryset.order_by(*ordering)
+
+
+def directory_version():
+    """Current generation of directory data; cache keys embed it so bumps invalidate them."""
+    version = cache.get(DIRECTORY_VERSION_KEY)
+    if version is None:
+        # Seed from the clock so an evicted counter never reuses an old generation.
+        cache.add(DIRECTORY_VERSION_KEY, time.time_ns(), None)
+        version = cache.get(DIRECTORY_VERSION_KEY, 0)
+    return version
+
+
+def bump_directory_version(counsellor_ids=None):
+    """Start a new directory generation, recording which counsellors changed when known."""
+    try:
+        version = cache.incr(DIRECTORY_VERSION_KEY)
+    except ValueError:
+        cache.set(DIRECTORY_VERSION_KEY, time.time_ns(), None)
+        return
+    if counsellor_ids is not None:
+        cache.set(DIRECTORY_CHANGES_KEY.format(version), sorted(counsellor_ids), DIRECTORY_CHANGES_TIMEOUT)
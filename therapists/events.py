@@ -0,0 +1,80 @@
+"""Per-counsellor stream of slot change events for the booking page.
+
+Writers call ``publish`` inside their transaction; once it commits the event
+gets the next number in the counsellor's sequence (a cache counter) and is
+stored under that number for a few minutes. Readers, such as the SSE view,
+remember the last number they sent and fetch anything newer, so a client that
+reconnects with ``Last-Event-ID`` picks up where it left off. Events older than
+``EVENT_TTL`` are gone; a client that falls further behind is told to reload.
+
+Writers and readers only meet when the cache is shared between processes
+(Redis in the deployment); ``cache_is_shared`` lets the stream refuse to run
+on a per-process cache, where it would never see most events.
+"""
+from django.core.cache import cache, caches
+from django.core.cache.backends.dummy import DummyCache
+from django.core.cache.backends.locmem import LocMemCache
+from django.db import transaction
+
+EVENT_SEQUENCE_KEY = "therapists:events:{}:sequence"
+EVENT_KEY = "therapists:events:{}:{}"
+EVENT_TTL = 5 * 60
+# Most events a reader fetches in one go; anything beyond means it should reload.
+MAX_BACKLOG = 100
+
+# How often an open stream checks for events, sends a keep-alive, and closes for the client to reconnect.
+POLL_SECONDS = 1
+HEARTBEAT_SECONDS = 15
+STREAM_SECONDS = 5 * 60
+
+SLOT_BOOKED = "slot_booked"
+SLOT_RELEASED = "slot_released"
+AVAILABILITY_CHANGED = "availability_changed"
+
+
+def cache_is_shared():
+    """Whether the default cache is visible to every worker process."""
+    return not isinstance(caches["default"], (LocMemCache, DummyCache))
+
+
+def _next_sequence(counsellor_id):
+    key = EVENT_SEQUENCE_KEY.format(counsellor_id)
+    cache.add(key, 0, None)
+    try:
+        return cache.incr(key)
+    except ValueError:
+        # Evicted between add and incr; start over; readers see the gap and reload.
+        cache.set(key, 1, None)
+        return 1
+
+
+def publish(counsellor_id, event_type, **data):
+    """Queue an event for the counsellor's stream, sent when the current transaction commits."""
+
+    def send():
+        sequence = _next_sequence(counsellor_id)
+        cache.set(EVENT_KEY.format(counsellor_id, sequence), {"type": event_type, **data}, EVENT_TTL)
+
+    transaction.on_commit(send)
+
+
+async def current_sequence(counsellor_id):
+    return await cache.aget(EVENT_SEQUENCE_KEY.format(counsellor_id), 0)
+
+
+async def events_since(counsellor_id, after):
+    """Events after sequence ``after``: (events, lost, latest).
+
+    ``events`` are (sequence, event) pairs in order, ``lost`` says some could
+    not be returned (expired, over ``MAX_BACKLOG`` or the counter was reset)
+    and ``latest`` is the sequence to resume from.
+    """
+    latest = await current_sequence(counsellor_id)
+    if latest <= after:
+        # A sequence that went backwards was reset; the reader should start over.
+        return [], latest < after, latest
+    first = max(after + 1, latest - MAX_BACKLOG + 1)
+    keys = {EVENT_KEY.format(counsellor_id, sequence): sequence for sequence in range(first, latest + 1)}
+    found = await cache.aget_many(list(keys))
+    events = sorted((keys[key], event) for key, event in found.items())
+    return events, len(events) < latest - after, latest
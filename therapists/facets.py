@@ -0,0 +1,169 @@
+"""Per-option result counts for the therapist directory filters.
+
+Rather than one COUNT query per dropdown option, the facet engine keeps a
+cached matrix with one compact row per listed counsellor (fee, experience,
+rating, specialization ids, language ids). It is built from three queries,
+stored under the current directory version and counted in Python, so a page
+view costs at most one extra query (the search id set) once the matrix is warm.
+Approach and age group are not facets; they narrow every count through the
+matching bitmaps.
+
+Counts follow the usual multi-select convention: each facet is counted with
+every active filter applied except its own, so switching an option shows how
+many results the new choice would give.
+"""
+from collections import Counter, defaultdict
+
+from django.core.cache import cache
+from django.utils import timezone
+
+from accounts.models import Counsellor
+from therapists.directory import EXPERIENCE_BANDS, PRICE_BANDS, band_for, directory_version, listed_counsellors
+from therapists.matching import matching_ids
+from therapists.search import filter_by_search
+
+MATRIX_TIMEOUT = 60 * 60
+
+# Matches the "minimum rating" options on the directory page.
+RATING_THRESHOLDS = ("4.5", "4", "3", "2", "1")
+
+FACET_FILTERS = {
+    "specialization": ("specialization",),
+    "language": ("language",),
+    "price": ("min_price", "max_price"),
+    "experience": ("min_experience", "max_experience"),
+    "rating": ("min_rating",),
+}
+
+
+def _matrix_key(version):
+    return f"therapists:facets:matrix:{version}"
+
+
+def build_matrix():
+    """Load one row per listed counsellor.
+
+    Rows are (id, fee, experience, rating, spec ids, language ids, next available timestamp).
+    """
+    specs = defaultdict(set)
+    for counsellor_id, spec_id in Counsellor.specializations.through.objects.filter(
+        counsellor__in=listed_counsellors(),
+    ).values_list("counsellor_id", "specialization_id"):
+        specs[counsellor_id].add(spec_id)
+
+    languages = defaultdict(set)
+    for counsellor_id, language_id in Counsellor.languages.through.objects.filter(
+        counsellor__in=listed_counsellors(),
+    ).values_list("counsellor_id", "language_id"):
+        languages[counsellor_id].add(language_id)
+
+    return [
+        (
+            pk,
+            float(fee),
+            experience,
+            float(rating),
+            frozenset(specs[pk]),
+            frozenset(languages[pk]),
+            next_available_at.timestamp() if next_available_at else None,
+        )
+        for pk, fee, experience, rating, next_available_at in listed_counsellors().values_list(
+            "pk", "session_fee", "years_experience", "rating", "next_available_at",
+        )
+    ]
+
+
+def get_matrix():
+    key = _matrix_key(directory_version())
+    matrix = cache.get(key)
+    if matrix is None:
+        matrix = build_matrix()
+        cache.set(key, matrix, MATRIX_TIMEOUT)
+    return matrix
+
+
+def _failed_filters(row, filters, now):
+    """Names of the active filters this row does not satisfy."""
+    _pk, fee, experience, rating, spec_ids, language_ids, next_available = row
+    failed = set()
+    if filters["specialization"] is not None and filters["specialization"] not in spec_ids:
+        failed.add("specialization")
+    if filters["language"] is not None and filters["language"] not in language_ids:
+        failed.add("language")
+    if filters["min_price"] is not None and fee < filters["min_price"]:
+        failed.add("min_price")
+    if filters["max_price"] is not None and fee > filters["max_price"]:
+        failed.add("max_price")
+    if filters["min_experience"] is not None and experience < filters["min_experience"]:
+        failed.add("min_experience")
+    if filters["max_experience"] is not None and experience > filters["max_experience"]:
+        failed.add("max_experience")
+    if filters["min_rating"] is not None and rating < filters["min_rating"]:
+        failed.add("min_rating")
+    if filters["available_within"] is not None and (
+        next_available is None
+        or not now <= next_available < now + filters["available_within"] * 86400
+    ):
+        failed.add("available_within")
+    return failed
+
+
+def facet_counts(filters):
+    """Return per-option counts for every directory facet under the given filters."""
+    matrix = get_matrix()
+    # Compare floats against floats; the matrix stores them to keep rows small.
+    filters = {
+        key: float(value) if key in ("min_price", "max_price", "min_rating") and value is not None else value
+        for key, value in filters.items()
+    }
+
+    search_ids = None
+    if filters["search"]:
+        search_ids = set(
+            filter_by_search(listed_counsellors(), filters["search"]).values_list("pk", flat=True)
+        )
+    restricted_ids = matching_ids({"approach": filters["approach"], "age_group": filters["age_group"]})
+    if restricted_ids is not None:
+        search_ids = set(restricted_ids) if search_ids is None else search_ids.intersection(restricted_ids)
+
+    specialization = Counter()
+    language = Counter()
+    price = Counter()
+    experience = Counter()
+    rating = Counter()
+
+    now = timezone.now().timestamp()
+    for row in matrix:
+        pk, fee, years, score, spec_ids, language_ids, _next_available = row
+        if search_ids is not None and pk not in search_ids:
+            continue
+        failed = _failed_filters(row, filters, now)
+        if failed.issubset(FACET_FILTERS["specialization"]):
+            specialization.update(spec_ids)
+        if failed.issubset(FACET_FILTERS["language"]):
+            language.update(language_ids)
+        if failed.issubset(FACET_FILTERS["price"]):
+            price[band_for(fee, PRICE_BANDS)] += 1
+        if failed.issubset(FACET_FILTERS["experience"]):
+            experience[band_for(years, EXPERIENCE_BANDS)] += 1
+        if failed.issubset(FACET_FILTERS["rating"]):
+            for threshold in RATING_THRESHOLDS:
+                if score >= float(threshold):
+                    rating[threshold] += 1
+
+    return {
+        "specialization": dict(specialization),
+        "language": dict(language),
+        "price": [
+            {"key": key, "label": label, "min": low, "max": high, "count": price[key]}
+            for key, label, low, high in PRICE_BANDS
+        ],
+        "experience": [
+            {"key": key, "label": label, "min": low, "max": high, "count": experience[key]}
+            for key, label, low, high in EXPERIENCE_BANDS
+        ],
+        "rating": [
+            {"min_rating": threshold, "count": rating[threshold]}
+            for threshold in RATING_THRESHOLDS
+        ],
+    }
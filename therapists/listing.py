@@ -0,0 +1,142 @@
+"""Builds (and caches) the therapist directory result pages.
+
+A listing is everything ``therapist_list`` needs to render the results:
+ordered counsellor ids, plain card dicts, pagination metadata and facet
+counts. It is cached under the directory version plus the normalized
+filter/sort/page tuple, so a repeated search is served without touching the
+database and any counsellor change (which bumps the version) retires every
+cached page at once.
+"""
+import hashlib
+
+from django.core.cache import cache
+from django.core.paginator import Paginator
+
+from Mind_Ease.pagination import KeysetPaginator
+from therapists.directory import (
+    FILTER_KEYS,
+    apply_filters,
+    apply_ordering,
+    directory_version,
+    listed_counsellors,
+)
+from therapists.facets import facet_counts
+from therapists.matching import matched_filters, matching_ids
+from therapists.recommendations import rank_counsellors
+from therapists.search import search_terms
+
+PER_PAGE = 9
+LISTING_TIMEOUT = 60 * 10
+
+
+def counsellor_card(counsellor):
+    """Plain, cacheable data for one directory card."""
+    user = counsellor.user
+    return {
+        "id": user.id,
+        "first_name": user.first_name,
+        "last_name": user.last_name,
+        "profile_picture_url": user.profile_picture.url if user.profile_picture else "",
+        "years_experience": counsellor.years_experience,
+        "rating": counsellor.rating,
+        "session_fee": counsellor.session_fee,
+        "specializations": [spec.name for spec in counsellor.specializations.all()],
+        "next_available_at": counsellor.next_available_at,
+    }
+
+
+def listing_key(filters, ordering, page=None, cursor=None):
+    normalized = [
+        (name, " ".join(search_terms(filters[name])) if name == "search" else str(filters[name]))
+        for name in FILTER_KEYS
+        if filters[name] not in (None, "")
+    ]
+    if cursor is not None:
+        position = ("cursor", cursor)
+    else:
+        position = ("page", str(page or 1))
+    digest = hashlib.sha1(repr((normalized, ordering, position)).encode("utf-8")).hexdigest()
+    return f"therapists:listing:{directory_version()}:{digest}"
+
+
+def filtered_counsellors(filters):
+    # Categorical filters resolve against the in-memory bitmaps; only the rest hit SQL.
+    queryset = apply_filters(listed_counsellors(), filters, skip=matched_filters(filters))
+    candidate_ids = matching_ids(filters)
+    if candidate_ids is not None:
+        queryset = queryset.filter(pk__in=candidate_ids)
+    return queryset
+
+
+def _pagination(page_obj):
+    return {
+        "number": page_obj.number,
+        "num_pages": page_obj.paginator.num_pages,
+        "count": page_obj.paginator.count,
+        "start_index": page_obj.start_index(),
+        "end_index": page_obj.end_index(),
+    }
+
+
+def build_listing(filters, ordering, page=None, cursor=None):
+    queryset = apply_ordering(
+        filtered_counsellors(filters).select_related("user").prefetch_related("specializations"),
+        ordering,
+    )
+
+    listing = {"pagination": None, "cursor_page": None}
+    if cursor is not None:
+        keyset_page = KeysetPaginator(queryset, ordering, PER_PAGE).get_page(cursor)
+        counsellors = keyset_page.object_list
+        listing["cursor_page"] = {
+            "has_next": keyset_page.has_next,
+            "has_previous": keyset_page.has_previous,
+            "next_cursor": keyset_page.next_cursor,
+            "previous_cursor": keyset_page.previous_cursor,
+            "approximate_total": keyset_page.approximate_total,
+        }
+    else:
+        page_obj = Paginator(queryset, PER_PAGE).get_page(page)
+        counsellors = page_obj.object_list
+        listing["pagination"] = _pagination(page_obj)
+
+    listing["ids"] = [counsellor.pk for counsellor in counsellors]
+    listing["cards"] = [counsellor_card(counsellor) for counsellor in counsellors]
+    listing["facets"] = facet_counts(filters)
+    return listing
+
+
+def recommend(filters, client):
+    """Ranked (ids, scores) for ``client`` among counsellors passing ``filters``."""
+    candidate_ids = None
+    if any(filters[name] not in (None, "") for name in FILTER_KEYS):
+        candidate_ids = list(filtered_counsellors(filters).values_list("pk", flat=True))
+    # The price ceiling, when set, doubles as the client's budget.
+    return rank_counsellors(client, candidate_ids, budget=filters["max_price"])
+
+
+def build_recommended_listing(filters, client, page=None):
+    """A listing ranked for ``client``; never cached since it is per client."""
+    ranked_ids, _scores = recommend(filters, client)
+
+    page_obj = Paginator(ranked_ids, PER_PAGE).get_page(page)
+    page_ids = list(page_obj.object_list)
+    counsellors = listed_counsellors().select_related("user").prefetch_related("specializations").in_bulk(page_ids)
+    counsellors = [counsellors[pk] for pk in page_ids if pk in counsellors]
+    return {
+        "pagination": _pagination(page_obj),
+        "cursor_page": None,
+        "ids": [counsellor.pk for counsellor in counsellors],
+        "cards": [counsellor_card(counsellor) for counsellor in counsellors],
+        "facets": facet_counts(filters),
+    }
+
+
+def get_listing(filters, ordering, page=None, cursor=None):
+    """Return the listing for a filter/sort/page combination, from cache when possible."""
+    key = listing_key(filters, ordering, page=page, cursor=cursor)
+    listing = cache.get(key)
+    if listing is None:
+        listing = build_listing(filters, ordering, page=page, cursor=cursor)
+        cache.set(key, listing, LISTING_TIMEOUT)
+    return listing
@@ -0,0 +1,31 @@
+from datetime import timedelta
+
+from django.core.management.base import BaseCommand
+from django.utils import timezone
+
+from therapists.archive import DEFAULT_BATCH_SIZE, archive_booked_slots, purge_expired_slots
+
+
+class Command(BaseCommand):
+    help = (
+        "Delete unbooked availability slots from past days and move booked ones to the archive table. "
+        "Run on a schedule (e.g. nightly) so CounsellorAvailability only holds current and future slots."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--batch-size", type=int, default=DEFAULT_BATCH_SIZE)
+        parser.add_argument(
+            "--keep-days",
+            type=int,
+            default=0,
+            help="Leave slots from this many most recent past days in place.",
+        )
+
+    def handle(self, *args, **options):
+        cutoff = timezone.localdate() - timedelta(days=options["keep_days"])
+        batch_size = options["batch_size"]
+        removed = purge_expired_slots(cutoff, batch_size=batch_size)
+        moved = archive_booked_slots(cutoff, batch_size=batch_size)
+        self.stdout.write(self.style.SUCCESS(
+            f"Removed {removed} expired slot(s) and archived {moved} booked slot(s) dated before {cutoff}."
+        ))
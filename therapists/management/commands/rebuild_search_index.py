@@ -0,0 +1,20 @@
+from django.core.management.base import BaseCommand
+
+from therapists.search import ensure_search_backend, rebuild_all
+
+
+class Command(BaseCommand):
+    help = "Rebuild the denormalized counsellor search documents used by the therapist directory."
+
+    def add_arguments(self, parser):
+        parser.add_argument("--batch-size", type=int, default=500)
+        parser.add_argument(
+            "--missing",
+            action="store_true",
+            help="Only index counsellors without a search document (cheap enough to run on every start).",
+        )
+
+    def handle(self, *args, **options):
+        ensure_search_backend()
+        total = rebuild_all(batch_size=options["batch_size"], missing_only=options["missing"])
+        self.stdout.write(self.style.SUCCESS(f"Indexed {total} counsellor(s)."))
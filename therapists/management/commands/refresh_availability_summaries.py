@@ -0,0 +1,22 @@
+from django.core.management.base import BaseCommand
+
+from accounts.models import Counsellor
+from therapists.availability import refresh_availability_summary
+
+
+class Command(BaseCommand):
+    help = (
+        "Recompute next_available_at / free_slots_next_7_days for every counsellor. "
+        "Run on a schedule (e.g. hourly) since the booking window moves with the clock."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--batch-size", type=int, default=500)
+
+    def handle(self, *args, **options):
+        batch_size = options["batch_size"]
+        ids = list(Counsellor.objects.order_by("pk").values_list("pk", flat=True))
+        changed = 0
+        for start in range(0, len(ids), batch_size):
+            changed += refresh_availability_summary(ids[start:start + batch_size])
+        self.stdout.write(self.style.SUCCESS(f"Updated {changed} of {len(ids)} counsellor(s)."))
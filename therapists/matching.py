@@ -0,0 +1,184 @@
+"""Worker-local bitmap index over the categorical directory filters.
+
+Each worker keeps a snapshot that gives every listed counsellor a bit position
+and stores one int bitset per attribute value (specialization, language, age
+group, therapy approach and experience year). A filter
+combination is then the AND of a handful of bitsets instead of a chain of
+many-to-many joins, and ``therapist_list`` only asks the database for the rows
+of the resulting ids.
+
+The snapshot follows the directory version. When the version moves it replays
+the counsellor ids recorded for each bump (``DIRECTORY_CHANGES_KEY``) and
+reloads just those counsellors; if the log is incomplete or too long it falls
+back to a full rebuild. Updates are made to a copy that then replaces the
+published snapshot, so readers never see one half-updated.
+"""
+import threading
+from collections import defaultdict
+
+from django.core.cache import cache
+
+from accounts.models import Counsellor
+from therapists.directory import DIRECTORY_CHANGES_KEY, directory_version, listed_counsellors
+
+# Past this many pending bumps a full rebuild is cheaper than replaying them.
+MAX_INCREMENTAL_VERSIONS = 100
+
+# Filter name -> (through model, column) for the many-to-many attributes.
+RELATIONS = {
+    "specialization": (Counsellor.specializations.through, "specialization_id"),
+    "language": (Counsellor.languages.through, "language_id"),
+    "approach": (Counsellor.therapy_approaches.through, "therapyapproach_id"),
+    "age_group": (Counsellor.age_groups.through, "agegroup_id"),
+}
+
+# Filters the snapshot can answer on its own.
+MATCHED_FILTERS = tuple(RELATIONS) + ("min_experience", "max_experience")
+
+
+class MatchingSnapshot:
+    def __init__(self):
+        self.version = None
+        self.ids = []
+        self.positions = {}
+        self.listed = 0
+        self.bitsets = defaultdict(int)
+        self.keys_by_counsellor = {}
+
+    def _load(self, counsellor_ids=None):
+        """Attribute keys for listed counsellors, optionally limited to some ids."""
+        counsellors = listed_counsellors()
+        if counsellor_ids is not None:
+            counsellors = counsellors.filter(pk__in=counsellor_ids)
+
+        keys = {}
+        for pk, years in counsellors.values_list("pk", "years_experience"):
+            keys[pk] = [("experience", years)]
+        if not keys:
+            return keys
+
+        for attribute, (through, column) in RELATIONS.items():
+            rows = through.objects.filter(counsellor__in=counsellors).values_list("counsellor_id", column)
+            for counsellor_id, value in rows:
+                if counsellor_id in keys:
+                    keys[counsellor_id].append((attribute, value))
+        return keys
+
+    def _set(self, pk, keys):
+        position = self.positions.get(pk)
+        if position is None:
+            position = len(self.ids)
+            self.ids.append(pk)
+            self.positions[pk] = position
+        bit = 1 << position
+        self.listed |= bit
+        for key in keys:
+            self.bitsets[key] |= bit
+        self.keys_by_counsellor[pk] = keys
+
+    def _clear(self, pk):
+        position = self.positions.get(pk)
+        if position is None:
+            return
+        mask = ~(1 << position)
+        self.listed &= mask
+        for key in self.keys_by_counsellor.pop(pk, ()):
+            self.bitsets[key] &= mask
+
+    def copy(self):
+        snapshot = MatchingSnapshot()
+        snapshot.version = self.version
+        snapshot.ids = list(self.ids)
+        snapshot.positions = dict(self.positions)
+        snapshot.listed = self.listed
+        snapshot.bitsets = defaultdict(int, self.bitsets)
+        snapshot.keys_by_counsellor = dict(self.keys_by_counsellor)
+        return snapshot
+
+    def rebuild(self):
+        self.ids = []
+        self.positions = {}
+        self.listed = 0
+        self.bitsets = defaultdict(int)
+        self.keys_by_counsellor = {}
+        for pk, keys in self._load().items():
+            self._set(pk, keys)
+
+    def refresh(self, counsellor_ids):
+        """Reload the given counsellors; ones no longer listed simply lose their bits."""
+        for pk in counsellor_ids:
+            self._clear(pk)
+        for pk, keys in self._load(counsellor_ids).items():
+            self._set(pk, keys)
+
+    def sync(self, version):
+        pending = version - self.version if self.version is not None else 0
+        changes = None
+        if 0 < pending <= MAX_INCREMENTAL_VERSIONS:
+            keys = [DIRECTORY_CHANGES_KEY.format(self.version + step) for step in range(1, pending + 1)]
+            logged = cache.get_many(keys)
+            if len(logged) == len(keys):
+                changes = set()
+                for counsellor_ids in logged.values():
+                    changes.update(counsellor_ids)
+        if changes is None:
+            self.rebuild()
+        elif changes:
+            self.refresh(changes)
+        self.version = version
+
+    def match(self, filters):
+        """Bitset of listed counsellors satisfying the categorical filters in ``filters``."""
+        bits = self.listed
+        for attribute in RELATIONS:
+            value = filters.get(attribute)
+            if value is not None:
+                bits &= self.bitsets.get((attribute, value), 0)
+        low = filters.get("min_experience")
+        high = filters.get("max_experience")
+        if low is not None or high is not None:
+            in_range = 0
+            for (attribute, value), years_bits in self.bitsets.items():
+                if attribute == "experience" and (low is None or value >= low) and (high is None or value <= high):
+                    in_range |= years_bits
+            bits &= in_range
+        return bits
+
+    def ids_for(self, bits):
+        # Walking the binary string is far cheaper than peeling bits one by one.
+        return [self.ids[position] for position, flag in enumerate(reversed(bin(bits)[2:])) if flag == "1"]
+
+    def count(self, bits):
+        return bin(bits).count("1")
+
+
+_snapshot = MatchingSnapshot()
+_lock = threading.Lock()
+
+
+def get_snapshot():
+    global _snapshot
+    version = directory_version()
+    snapshot = _snapshot
+    if snapshot.version != version:
+        with _lock:
+            if _snapshot.version != version:
+                # Readers keep using the published snapshot while the copy catches up.
+                updated = _snapshot.copy()
+                updated.sync(version)
+                _snapshot = updated
+            snapshot = _snapshot
+    return snapshot
+
+
+def matched_filters(filters):
+    """Names of the active filters that ``matching_ids`` resolves."""
+    return tuple(name for name in MATCHED_FILTERS if filters.get(name) is not None)
+
+
+def matching_ids(filters):
+    """Ids of listed counsellors passing the categorical filters, or None if none are active."""
+    if not matched_filters(filters):
+        return None
+    snapshot = get_snapshot()
+    return snapshot.ids_for(snapshot.match(filters))
@@ -1,11 +1,53 @@
 from datetime import datetime
 
-from django.db import models
+from django.contrib.postgres.constraints import ExclusionConstraint
+from django.contrib.postgres.fields import DateTimeRangeField, RangeOperators
+from django.contrib.postgres.indexes import GinIndex
+from django.contrib.postgres.search import SearchVectorField
+from django.db import DEFAULT_DB_ALIAS, connections, models
 from django.utils import timezone
 
 from accounts.models import Counsellor
 
 
+def _slot_range():
+    """The slot as a timestamp range; a slot ending at or before its start runs to the next day."""
+    day_start = models.ExpressionWrapper(models.F("date") + models.F("start_time"), output_field=models.DateTimeField())
+    same_day_end = models.ExpressionWrapper(models.F("date") + models.F("end_time"), output_field=models.DateTimeField())
+    next_day = models.ExpressionWrapper(models.F("date") + models.Value(1), output_field=models.DateField())
+    next_day_end = models.ExpressionWrapper(next_day + models.F("end_time"), output_field=models.DateTimeField())
+    end = models.Case(
+        models.When(end_time__gt=models.F("start_time"), then=same_day_end),
+        default=next_day_end,
+        output_field=models.DateTimeField(),
+    )
+    return models.Func(day_start, end, function="TSRANGE", output_field=DateTimeRangeField())
+
+
+class PostgresExclusionConstraint(ExclusionConstraint):
+    """An exclusion constraint that other backends (SQLite in development) leave out."""
+
+    def constraint_sql(self, model, schema_editor):
+        if schema_editor.connection.vendor != "postgresql":
+            return None
+        return super().constraint_sql(model, schema_editor)
+
+    def create_sql(self, model, schema_editor):
+        if schema_editor.connection.vendor != "postgresql":
+            return None
+        return super().create_sql(model, schema_editor)
+
+    def remove_sql(self, model, schema_editor):
+        if schema_editor.connection.vendor != "postgresql":
+            return None
+        return super().remove_sql(model, schema_editor)
+
+    def validate(self, model, instance, exclude=None, using=DEFAULT_DB_ALIAS):
+        if connections[using].vendor != "postgresql":
+            return
+        super().validate(model, instance, exclude=exclude, using=using)
+
+
 class CounsellorAvailability(models.Model):
     """Represents a single time slot that a counsellor has marked as available."""
 
@@ -29,6 +71,17 @@ class CounsellorAvailability(models.Model):
             models.Index(fields=["counsellor", "date"]),
             models.Index(fields=["counsellor", "is_booked"]),
         ]
+        constraints = [
+            # Backstop for the sweep in therapists.slots.save_slots, e.g. against
+            # concurrent saves. Needs the btree_gist extension (see therapists.apps).
+            PostgresExclusionConstraint(
+                name="therapists_slot_no_overlap",
+                expressions=[
+                    ("counsellor", RangeOperators.EQUAL),
+                    (_slot_range(), RangeOperators.OVERLAPS),
+                ],
+            ),
+        ]
 
     def __str__(self):
         return (
@@ -40,3 +93,142 @@ class CounsellorAvailability(models.Model):
     def is_future_slot(self):
         combined = timezone.make_aware(datetime.combine(self.date, self.start_time))
         return combined >= timezone.now()
+
+
+class AvailabilityRule(models.Model):
+    """A weekly recurring window from which bookable slots are generated on demand.
+
+    Generated slots are not stored; a ``CounsellorAvailability`` row is only
+    written when one is booked or overridden (see ``therapists.rules``).
+    """
+
+    WEEKDAY_CHOICES = (
+        (0, "Monday"),
+        (1, "Tuesday"),
+        (2, "Wednesday"),
+        (3, "Thursday"),
+        (4, "Friday"),
+        (5, "Saturday"),
+        (6, "Sunday"),
+    )
+
+    counsellor = models.ForeignKey(
+        Counsellor,
+        on_delete=models.CASCADE,
+        related_name="availability_rules",
+    )
+    weekday = models.PositiveSmallIntegerField(choices=WEEKDAY_CHOICES)
+    start_time = models.TimeField()
+    end_time = models.TimeField()
+    # Fall back to the counsellor's default_session_duration / default_break_duration
+    session_minutes = models.PositiveIntegerField(null=True, blank=True)
+    break_minutes = models.PositiveIntegerField(null=True, blank=True)
+    valid_from = models.DateField(null=True, blank=True)
+    valid_until = models.DateField(null=True, blank=True)
+    is_active = models.BooleanField(default=True)
+    created_at = models.DateTimeField(auto_now_add=True)
+    updated_at = models.DateTimeField(auto_now=True)
+
+    class Meta:
+        ordering = ["weekday", "start_time"]
+        indexes = [
+            models.Index(fields=["counsellor", "weekday"]),
+        ]
+
+    def __str__(self):
+        return (
+            f"{self.counsellor.user.get_full_name()} - {self.get_weekday_display()} "
+            f"{self.start_time.strftime('%H:%M')}-{self.end_time.strftime('%H:%M')}"
+        )
+
+    def applies_on(self, day):
+        return (
+            self.is_active
+            and day.weekday() == self.weekday
+            and (self.valid_from is None or day >= self.valid_from)
+            and (self.valid_until is None or day <= self.valid_until)
+        )
+
+
+class AvailabilityException(models.Model):
+    """Time a counsellor is unavailable despite their rules; no times means the whole day."""
+
+    counsellor = models.ForeignKey(
+        Counsellor,
+        on_delete=models.CASCADE,
+        related_name="availability_exceptions",
+    )
+    date = models.DateField()
+    start_time = models.TimeField(null=True, blank=True)
+    end_time = models.TimeField(null=True, blank=True)
+    reason = models.CharField(max_length=255, blank=True)
+    created_at = models.DateTimeField(auto_now_add=True)
+
+    class Meta:
+        ordering = ["date", "start_time"]
+        indexes = [
+            models.Index(fields=["counsellor", "date"]),
+        ]
+
+    def __str__(self):
+        return f"{self.counsellor.user.get_full_name()} - unavailable {self.date}"
+
+    def blocks(self, start_time, end_time):
+        if self.start_time is None or self.end_time is None:
+            return True
+        return start_time < self.end_time and self.start_time < end_time
+
+
+class ArchivedAvailability(models.Model):
+    """A booked slot moved out of ``CounsellorAvailability`` once its day has passed."""
+
+    slot_id = models.PositiveBigIntegerField(unique=True, help_text="Primary key the slot had while live")
+    counsellor = models.ForeignKey(
+        Counsellor,
+        on_delete=models.CASCADE,
+        related_name="archived_slots",
+    )
+    booking = models.ForeignKey(
+        "bookings.Booking",
+        on_delete=models.SET_NULL,
+        null=True,
+        blank=True,
+        related_name="archived_slots",
+    )
+    date = models.DateField()
+    start_time = models.TimeField()
+    end_time = models.TimeField()
+    duration_minutes = models.PositiveIntegerField(default=45)
+    archived_at = models.DateTimeField(auto_now_add=True)
+
+    class Meta:
+        ordering = ["-date", "-start_time"]
+        indexes = [
+            models.Index(fields=["counsellor", "date"]),
+        ]
+
+    def __str__(self):
+        return f"{self.counsellor_id} - {self.date} {self.start_time.strftime('%H:%M')} (archived)"
+
+
+class CounsellorSearchIndex(models.Model):
+    """Denormalized search document (names plus taxonomy names) for a counsellor."""
+
+    counsellor = models.OneToOneField(
+        Counsellor,
+        on_delete=models.CASCADE,
+        primary_key=True,
+        related_name="search_index",
+    )
+    document = models.TextField(blank=True)
+    # Populated on PostgreSQL only; SQLite keeps its FTS5 shadow table instead.
+    search_vector = SearchVectorField(null=True, editable=False)
+    updated_at = models.DateTimeField(auto_now=True)
+
+    class Meta:
+        indexes = [
+            GinIndex(fields=["search_vector"], name="therapists_search_gin"),
+        ]
+
+    def __str__(self):
+        return f"Search index for counsellor {self.counsellor_id}"
@@ -0,0 +1,145 @@
+"""Versioned caching for counsellor profile pages.
+
+A profile's version combines ``Counsellor.updated_at``, the counsellor's
+reviews version (``accounts.review_stats``) and a profile version bumped when
+directory-visible data outside the counsellor row changes (user fields,
+taxonomy links, certifications). Any write moves the version, so cached
+profile data, review pages and template fragments keyed on it never need to
+be deleted. Only the version lookup itself touches the database on a hit.
+
+Keyset slices for the JSON reviews API are cached under the reviews version
+alone, since they do not depend on the rest of the profile. Reviews are cached
+as plain dicts of the fields the page shows, never as model instances, so no
+reviewer's account data ends up in the cache.
+"""
+import hashlib
+import time
+
+from django.core.cache import cache
+from django.core.paginator import EmptyPage, Page, PageNotAnInteger, Paginator
+from django.db.models import F
+
+from accounts.models import Counsellor, Review
+from accounts.review_stats import get_review_stats, reviews_version
+from Mind_Ease.pagination import KeysetPaginator
+
+PROFILE_VERSION_KEY = "therapists:profile:version:{}"
+PROFILE_TIMEOUT = 60 * 60
+REVIEWS_PER_PAGE = 5
+# Newest first; the id breaks ties so the order can be used as a keyset cursor.
+REVIEW_ORDERING = ("-created_at", "-id")
+# What the profile page renders for a review (plus the author's first name).
+REVIEW_FIELDS = ("id", "title", "content", "rating", "is_verified", "client_id", "created_at")
+
+
+def _profile_generation(counsellor_id):
+    key = PROFILE_VERSION_KEY.format(counsellor_id)
+    version = cache.get(key)
+    if version is None:
+        cache.add(key, time.time_ns(), None)
+        version = cache.get(key, 0)
+    return version
+
+
+def bump_profile_version(counsellor_ids):
+    for counsellor_id in set(counsellor_ids):
+        key = PROFILE_VERSION_KEY.format(counsellor_id)
+        try:
+            cache.incr(key)
+        except ValueError:
+            cache.set(key, time.time_ns(), None)
+
+
+def profile_version(counsellor_id):
+    """Version string for a listed counsellor's profile, or None if it is not public."""
+    updated_at = Counsellor.objects.filter(
+        user_id=counsellor_id,
+        is_active=True,
+        user__is_approved=True,
+    ).values_list("updated_at", flat=True).first()
+    if updated_at is None:
+        return None
+    return f"{counsellor_id}:{updated_at.timestamp()}:{reviews_version(counsellor_id)}:{_profile_generation(counsellor_id)}"
+
+
+def get_profile(counsellor_id, version):
+    """The counsellor (with its profile relations prefetched) and review stats."""
+    key = f"therapists:profile:{version}"
+    profile = cache.get(key)
+    if profile is None:
+        # The cached copy must not carry the counsellor's credentials or contact details.
+        counsellor = Counsellor.objects.select_related("user").defer(
+            "user__password", "user__email", "user__phone",
+        ).prefetch_related(
+            "specializations",
+            "languages",
+            "therapy_approaches",
+            "age_groups",
+            "certifications",
+        ).get(user_id=counsellor_id)
+        profile = {"counsellor": counsellor, "review_stats": get_review_stats(counsellor)}
+        cache.set(key, profile, PROFILE_TIMEOUT)
+    return profile
+
+
+def get_review_page(counsellor, review_stats, version, number):
+    """A page of published reviews; the count comes from the stats row, the rows from cache."""
+    reviews = published_reviews(counsellor.pk).order_by(*REVIEW_ORDERING)
+    paginator = Paginator(reviews, REVIEWS_PER_PAGE)
+    # Paginator.count is a cached_property; seeding it skips the COUNT query.
+    paginator.count = review_stats.review_count
+    try:
+        number = paginator.validate_number(number)
+    except PageNotAnInteger:
+        number = 1
+    except EmptyPage:
+        number = paginator.num_pages
+
+    key = f"therapists:profile:{version}:reviews:{number}"
+    object_list = cache.get(key)
+    if object_list is None:
+        bottom = (number - 1) * REVIEWS_PER_PAGE
+        object_list = list(reviews.values(*REVIEW_FIELDS, author=F("client__user__first_name"))[
+            bottom:bottom + REVIEWS_PER_PAGE
+        ])
+        cache.set(key, object_list, PROFILE_TIMEOUT)
+    return Page(object_list, number, paginator)
+
+
+def published_reviews(counsellor_id):
+    return Review.objects.filter(
+        counsellor_id=counsellor_id,
+        is_published=True,
+    ).select_related("client__user")
+
+
+def review_paginator(counsellor_id, per_page=REVIEWS_PER_PAGE):
+    return KeysetPaginator(published_reviews(counsellor_id), REVIEW_ORDERING, per_page)
+
+
+def serialize_review(review):
+    return {
+        "id": review.id,
+        "title": review.title,
+        "content": review.content,
+        "rating": review.rating,
+        "is_verified": review.is_verified,
+        "author": review.client.user.first_name,
+        "client_id": review.client_id,
+        "created_at": review.created_at.isoformat(),
+    }
+
+
+def get_review_slice(counsellor_id, cursor=None, per_page=REVIEWS_PER_PAGE):
+    """The published reviews after ``cursor``, cached per reviews version."""
+    digest = hashlib.sha1(repr((cursor, per_page)).encode("utf-8")).hexdigest()
+    key = f"therapists:reviews:{counsellor_id}:{reviews_version(counsellor_id)}:{digest}"
+    review_slice = cache.get(key)
+    if review_slice is None:
+        page = review_paginator(counsellor_id, per_page).get_page(cursor)
+        review_slice = {
+            "reviews": [serialize_review(review) for review in page.object_list],
+            "next_cursor": page.next_cursor,
+        }
+        cache.set(key, review_slice, PROFILE_TIMEOUT)
+    return review_slice
@@ -0,0 +1,146 @@
+"""Vectorized "recommended for you" ranking of counsellors for a client.
+
+Each worker keeps a NumPy feature matrix over every listed counsellor:
+specialization and age-group membership as boolean columns plus rating,
+experience and fee vectors. Scoring a client is a handful of array operations
+over the whole matrix, so ranking thousands of counsellors takes milliseconds.
+The matrix is rebuilt when the directory or taxonomy version moves.
+"""
+import threading
+
+import numpy as np
+
+from accounts.models import AgeGroup, Counsellor, Specialization
+from accounts.taxonomy import registry as taxonomy
+from accounts.taxonomy import taxonomy_version
+from therapists.directory import directory_version, listed_counsellors
+
+# Client.primary_concern -> specialization names offered at counsellor registration.
+CONCERN_SPECIALIZATIONS = {
+    # "Anxiety & Stress" at registration is stored as "Anxiety".
+    "anxiety": ("Anxiety", "OCD"),
+    "depression": ("Depression", "Grief"),
+    "relationship": ("Relationship", "Family", "LGBTQ+ Issues"),
+    "trauma": ("Trauma", "Grief"),
+    "self_improvement": ("Self-esteem", "Career", "Anger Management"),
+}
+
+WEIGHTS = {
+    "concern": 0.40,
+    "age_group": 0.20,
+    "rating": 0.20,
+    "experience": 0.10,
+    "fee": 0.10,
+}
+
+# Experience beyond this many years no longer raises the score.
+EXPERIENCE_CAP = 20.0
+
+
+class FeatureMatrix:
+    def __init__(self):
+        self.version = None
+        self.ids = np.empty(0, dtype=np.int64)
+
+    def build(self):
+        rows = list(listed_counsellors().order_by("pk").values_list(
+            "pk", "rating", "years_experience", "session_fee",
+        ))
+        self.ids = np.array([row[0] for row in rows], dtype=np.int64)
+        self.rating = np.array([float(row[1]) for row in rows], dtype=np.float64)
+        self.experience = np.array([row[2] for row in rows], dtype=np.float64)
+        self.fee = np.array([float(row[3]) for row in rows], dtype=np.float64)
+        positions = {pk: position for position, pk in enumerate(self.ids.tolist())}
+
+        self.specialization_columns = {
+            entry.id: column for column, entry in enumerate(taxonomy.active(Specialization))
+        }
+        self.specializations = self._membership(
+            Counsellor.specializations.through, "specialization_id", positions, self.specialization_columns,
+        )
+
+        age_groups = taxonomy.active(AgeGroup)
+        self.age_group_columns = {entry.id: column for column, entry in enumerate(age_groups)}
+        self.age_min = np.array([entry.min_age for entry in age_groups], dtype=np.float64)
+        self.age_max = np.array([entry.max_age for entry in age_groups], dtype=np.float64)
+        self.age_groups = self._membership(
+            Counsellor.age_groups.through, "agegroup_id", positions, self.age_group_columns,
+        )
+
+    def _membership(self, through, column, positions, columns):
+        matrix = np.zeros((len(positions), len(columns)), dtype=bool)
+        links = through.objects.filter(counsellor__in=listed_counsellors()).values_list("counsellor_id", column)
+        for counsellor_id, value in links:
+            if counsellor_id in positions and value in columns:
+                matrix[positions[counsellor_id], columns[value]] = True
+        return matrix
+
+    def scores(self, client, budget=None):
+        """Score every counsellor in the matrix for ``client``; returns an array aligned with ``ids``."""
+        if not len(self.ids):
+            return np.empty(0, dtype=np.float64)
+
+        concern_columns = [
+            self.specialization_columns[spec_id]
+            for spec_id in (
+                taxonomy.id_for(Specialization, name)
+                for name in CONCERN_SPECIALIZATIONS.get(client.primary_concern, ())
+            )
+            if spec_id in self.specialization_columns
+        ]
+        if concern_columns:
+            concern = self.specializations[:, concern_columns].any(axis=1)
+        else:
+            concern = np.zeros(len(self.ids), dtype=bool)
+
+        age = client.age()
+        matching_groups = (self.age_min <= age) & (age <= self.age_max)
+        age_hit = self.age_groups[:, matching_groups].any(axis=1)
+
+        rating = self.rating / 5.0
+        experience = np.minimum(self.experience, EXPERIENCE_CAP) / EXPERIENCE_CAP
+        if budget:
+            budget = float(budget)
+            # Full marks within budget, falling to zero at twice the budget.
+            fee = np.clip(1.0 - (self.fee - budget) / budget, 0.0, 1.0)
+        else:
+            spread = self.fee.max() - self.fee.min()
+            fee = 1.0 - (self.fee - self.fee.min()) / spread if spread else np.ones(len(self.ids))
+
+        return (
+            WEIGHTS["concern"] * concern
+            + WEIGHTS["age_group"] * age_hit
+            + WEIGHTS["rating"] * rating
+            + WEIGHTS["experience"] * experience
+            + WEIGHTS["fee"] * fee
+        )
+
+
+_matrix = FeatureMatrix()
+_lock = threading.Lock()
+
+
+def get_matrix():
+    version = (directory_version(), taxonomy_version())
+    if _matrix.version != version:
+        with _lock:
+            if _matrix.version != version:
+                _matrix.build()
+                _matrix.version = version
+    return _matrix
+
+
+def rank_counsellors(client, candidate_ids=None, budget=None):
+    """Counsellor ids ordered best match first, with their scores.
+
+    ``candidate_ids`` limits the ranking to counsellors that passed other filters.
+    """
+    matrix = get_matrix()
+    scores = matrix.scores(client, budget=budget)
+    ids = matrix.ids
+    if candidate_ids is not None:
+        keep = np.isin(ids, np.fromiter(candidate_ids, dtype=np.int64))
+        ids, scores = ids[keep], scores[keep]
+    # Stable sort on the negated score keeps ties in id order.
+    order = np.argsort(-scores, kind="stable")
+    return ids[order].tolist(), scores[order].tolist()
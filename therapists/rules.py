@@ -0,0 +1,130 @@
+"""Lazy slot generation from weekly availability rules.
+
+A counsellor's ``AvailabilityRule`` rows describe recurring windows; slots are
+cut from them (session length plus break) only for the dates being asked
+about, minus any ``AvailabilityException``. Stored ``CounsellorAvailability``
+rows take precedence over any generated slot they overlap, so a slot is only
+written to the database once it is booked or explicitly overridden.
+"""
+from collections import defaultdict
+from datetime import datetime, timedelta
+
+from django.db.models import Q
+
+from therapists.bitmap import DayBitmap
+from therapists.models import AvailabilityException, AvailabilityRule, CounsellorAvailability
+
+DEFAULT_SESSION_MINUTES = 45
+
+
+def _days(start, end):
+    day = start
+    while day <= end:
+        yield day
+        day += timedelta(days=1)
+
+
+def _cut(day, window_start, window_end, session_minutes, break_minutes):
+    """(start, end) times of the sessions that fit in one window."""
+    length = timedelta(minutes=session_minutes)
+    step = timedelta(minutes=session_minutes + break_minutes)
+    current = datetime.combine(day, window_start)
+    last = datetime.combine(day, window_end)
+    while current + length <= last:
+        yield current.time(), (current + length).time()
+        current += step
+
+
+def materialize(counsellors, start, end):
+    """Slots between ``start`` and ``end`` (inclusive) for each counsellor.
+
+    Returns {counsellor_id: [CounsellorAvailability, ...]} ordered by date and
+    start time. Generated slots are unsaved instances whose ``pk`` is None.
+    """
+    counsellors = {counsellor.pk: counsellor for counsellor in counsellors}
+    if not counsellors:
+        return {}
+
+    rules = defaultdict(list)
+    for rule in AvailabilityRule.objects.filter(
+        counsellor_id__in=counsellors,
+        is_active=True,
+    ).filter(
+        Q(valid_from__isnull=True) | Q(valid_from__lte=end),
+        Q(valid_until__isnull=True) | Q(valid_until__gte=start),
+    ):
+        rules[rule.counsellor_id].append(rule)
+
+    exceptions = defaultdict(list)
+    if rules:
+        for exception in AvailabilityException.objects.filter(
+            counsellor_id__in=rules,
+            date__gte=start,
+            date__lte=end,
+        ):
+            exceptions[(exception.counsellor_id, exception.date)].append(exception)
+
+    slots = {counsellor_id: {} for counsellor_id in counsellors}
+    stored = defaultdict(lambda: DayBitmap(1))
+    for slot in CounsellorAvailability.objects.filter(
+        counsellor_id__in=counsellors,
+        date__gte=start,
+        date__lte=end,
+    ):
+        slots[slot.counsellor_id][(slot.date, slot.start_time)] = slot
+        if slot.counsellor_id in rules:
+            stored[(slot.counsellor_id, slot.date)].add(slot.start_time, slot.end_time, booked=slot.is_booked)
+
+    for counsellor_id, counsellor_rules in rules.items():
+        counsellor = counsellors[counsellor_id]
+        counsellor_slots = slots[counsellor_id]
+        for day in _days(start, end):
+            blocked = exceptions.get((counsellor_id, day), ())
+            taken = stored.get((counsellor_id, day))
+            for rule in counsellor_rules:
+                if not rule.applies_on(day):
+                    continue
+                session_minutes = max(
+                    rule.session_minutes or counsellor.default_session_duration or DEFAULT_SESSION_MINUTES, 1,
+                )
+                break_minutes = (
+                    rule.break_minutes if rule.break_minutes is not None else counsellor.default_break_duration or 0
+                )
+                for slot_start, slot_end in _cut(day, rule.start_time, rule.end_time, session_minutes, break_minutes):
+                    if any(exception.blocks(slot_start, slot_end) for exception in blocked):
+                        continue
+                    if taken is not None and taken.overlaps(slot_start, slot_end):
+                        continue
+                    counsellor_slots.setdefault((day, slot_start), CounsellorAvailability(
+                        counsellor_id=counsellor_id,
+                        date=day,
+                        start_time=slot_start,
+                        end_time=slot_end,
+                        duration_minutes=session_minutes,
+                    ))
+
+    return {
+        counsellor_id: [counsellor_slots[key] for key in sorted(counsellor_slots)]
+        for counsellor_id, counsellor_slots in slots.items()
+    }
+
+
+def slots_for(counsellor, start, end):
+    return materialize([counsellor], start, end)[counsellor.pk]
+
+
+def generated_slot(counsellor, day, start_time):
+    """The unsaved slot a rule yields at this time, if any."""
+    for slot in slots_for(counsellor, day, day):
+        if slot.start_time == start_time and slot.pk is None:
+            return slot
+    return None
+
+
+def counsellors_with_rules(counsellor_ids):
+    return set(
+        AvailabilityRule.objects.filter(
+            counsellor_id__in=counsellor_ids,
+            is_active=True,
+        ).values_list("counsellor_id", flat=True)
+    )
@@ -0,0 +1,146 @@
+"""Full-text search over the denormalized counsellor search documents.
+
+Every counsellor gets one ``CounsellorSearchIndex`` row holding their names and
+the names of their specializations, therapy approaches and languages. The
+directory search then hits a single indexed column instead of OR-ing
+``icontains`` lookups across four joins:
+
+* PostgreSQL: ``search_vector`` (tsvector) with a GIN index, prefix tsquery.
+* SQLite: an FTS5 shadow table keyed by the counsellor id.
+* Anything else: ``icontains`` on the single ``document`` column.
+"""
+import re
+
+from django.contrib.postgres.search import SearchQuery, SearchVector
+from django.db import OperationalError, connection
+from django.db.models.expressions import RawSQL
+
+from accounts.models import Counsellor
+from therapists.models import CounsellorSearchIndex
+
+FTS_TABLE = "therapists_counsellorsearch_fts"
+MAX_TERMS = 8
+
+_TERM_RE = re.compile(r"\w+", re.UNICODE)
+_fts_available = None
+
+
+def build_document(counsellor):
+    """Return the search text for a counsellor (expects the M2Ms prefetched)."""
+    user = counsellor.user
+    parts = [user.first_name, user.last_name]
+    parts += [spec.name for spec in counsellor.specializations.all()]
+    parts += [approach.name for approach in counsellor.therapy_approaches.all()]
+    parts += [language.name for language in counsellor.languages.all()]
+    return " ".join(part for part in parts if part)
+
+
+def refresh_documents(counsellor_ids):
+    """Rebuild the search documents for the given counsellors."""
+    counsellor_ids = set(counsellor_ids)
+    if not counsellor_ids:
+        return
+
+    counsellors = Counsellor.objects.filter(pk__in=counsellor_ids).select_related("user").prefetch_related(
+        "specializations",
+        "therapy_approaches",
+        "languages",
+    )
+    documents = {counsellor.pk: build_document(counsellor) for counsellor in counsellors}
+
+    existing = set(
+        CounsellorSearchIndex.objects.filter(pk__in=documents).values_list("pk", flat=True)
+    )
+    CounsellorSearchIndex.objects.bulk_create([
+        CounsellorSearchIndex(counsellor_id=pk, document=document)
+        for pk, document in documents.items()
+        if pk not in existing
+    ])
+    to_update = [
+        CounsellorSearchIndex(counsellor_id=pk, document=document)
+        for pk, document in documents.items()
+        if pk in existing
+    ]
+    CounsellorSearchIndex.objects.bulk_update(to_update, ["document"])
+
+    if connection.vendor == "postgresql":
+        CounsellorSearchIndex.objects.filter(pk__in=documents).update(
+            search_vector=SearchVector("document", config="simple"),
+        )
+    elif _has_fts_table():
+        with connection.cursor() as cursor:
+            cursor.executemany(f"DELETE FROM {FTS_TABLE} WHERE rowid = %s", [(pk,) for pk in counsellor_ids])
+            cursor.executemany(
+                f"INSERT INTO {FTS_TABLE} (rowid, document) VALUES (%s, %s)",
+                list(documents.items()),
+            )
+
+
+def remove_documents(counsellor_ids):
+    """Drop FTS5 rows for deleted counsellors (the model rows cascade on their own)."""
+    if connection.vendor == "sqlite" and _has_fts_table():
+        with connection.cursor() as cursor:
+            cursor.executemany(f"DELETE FROM {FTS_TABLE} WHERE rowid = %s", [(pk,) for pk in counsellor_ids])
+
+
+def rebuild_all(batch_size=500, missing_only=False):
+    """Rebuild every search document (or only absent ones); returns the number of counsellors indexed."""
+    counsellors = Counsellor.objects.order_by("pk")
+    if missing_only:
+        counsellors = counsellors.filter(search_index__isnull=True)
+    ids = list(counsellors.values_list("pk", flat=True))
+    for start in range(0, len(ids), batch_size):
+        refresh_documents(ids[start:start + batch_size])
+    return len(ids)
+
+
+def search_terms(query):
+    """Split a free-text query into lower-cased word tokens."""
+    return _TERM_RE.findall((query or "").lower())[:MAX_TERMS]
+
+
+def filter_by_search(queryset, query):
+    """Restrict a Counsellor queryset to rows whose document matches every term as a prefix."""
+    terms = search_terms(query)
+    if not terms:
+        return queryset
+
+    if connection.vendor == "postgresql":
+        tsquery = " & ".join(f"{term}:*" for term in terms)
+        return queryset.filter(
+            search_index__search_vector=SearchQuery(tsquery, search_type="raw", config="simple"),
+        )
+
+    if connection.vendor == "sqlite" and _has_fts_table():
+        match = " ".join(f'"{term}"*' for term in terms)
+        return queryset.filter(
+            pk__in=RawSQL(f"SELECT rowid FROM {FTS_TABLE} WHERE {FTS_TABLE} MATCH %s", [match]),
+        )
+
+    for term in terms:
+        queryset = queryset.filter(search_index__document__icontains=term)
+    return queryset
+
+
+def ensure_search_backend(using=None, **kwargs):
+    """Create the SQLite FTS5 shadow table (run from ``post_migrate``); PostgreSQL's GIN index is in the model."""
+    global _fts_available
+
+    if connection.vendor == "sqlite":
+        try:
+            with connection.cursor() as cursor:
+                cursor.execute(
+                    f"CREATE VIRTUAL TABLE IF NOT EXISTS {FTS_TABLE} "
+                    f"USING fts5(document, tokenize='unicode61')"
+                )
+            _fts_available = True
+        except OperationalError:
+            # SQLite built without FTS5: searches fall back to icontains.
+            _fts_available = False
+
+
+def _has_fts_table():
+    global _fts_available
+    if _fts_available is None:
+        _fts_available = FTS_TABLE in connection.introspection.table_names()
+    return _fts_available
@@ -0,0 +1,128 @@
+"""Keep derived directory data in sync with counsellor and taxonomy changes."""
+from django.db import transaction
+from django.db.models.signals import m2m_changed, post_delete, post_save, pre_delete
+from django.dispatch import receiver
+from django.utils import timezone
+
+from accounts.models import Certification, Counsellor, Language, ReviewStats, Specialization, TherapyApproach, User
+from accounts.review_stats import review_stats_changed
+from therapists import search
+from therapists.availability import bump_availability_version, bump_day_versions, bump_schedule_version
+from therapists.directory import bump_directory_version
+from therapists.models import AvailabilityException, AvailabilityRule, CounsellorAvailability, CounsellorSearchIndex
+from therapists.profile_cache import bump_profile_version
+
+# User fields that show up in the directory (search document, visibility, cards).
+DIRECTORY_USER_FIELDS = {"first_name", "last_name", "is_approved", "profile_picture"}
+
+
+def counsellors_changed(counsellor_ids):
+    """Refresh everything derived from the given counsellors once the transaction commits."""
+    counsellor_ids = set(counsellor_ids)
+    if not counsellor_ids:
+        return
+
+    def refresh():
+        search.refresh_documents(counsellor_ids)
+        bump_directory_version(counsellor_ids)
+        bump_profile_version(counsellor_ids)
+
+    transaction.on_commit(refresh)
+
+
+@receiver(post_save, sender=Counsellor)
+def counsellor_saved(sender, instance, **kwargs):
+    counsellors_changed([instance.pk])
+
+
+@receiver(post_save, sender=User)
+def counsellor_user_saved(sender, instance, update_fields=None, **kwargs):
+    if instance.role != "counsellor":
+        return
+    if update_fields is not None and not DIRECTORY_USER_FIELDS.intersection(update_fields):
+        return
+    if Counsellor.objects.filter(pk=instance.pk).exists():
+        counsellors_changed([instance.pk])
+
+
+def _counsellor_m2m_changed(sender, instance, action, reverse, pk_set, **kwargs):
+    if action in ("post_add", "post_remove", "post_clear") and not reverse:
+        counsellors_changed([instance.pk])
+    elif action in ("post_add", "post_remove") and reverse:
+        counsellors_changed(pk_set or [])
+    elif action == "pre_clear" and reverse:
+        # The affected counsellors are gone from the through table after the clear.
+        counsellors_changed(instance.counsellors.values_list("pk", flat=True))
+
+
+for _through in (
+    Counsellor.specializations.through,
+    Counsellor.therapy_approaches.through,
+    Counsellor.languages.through,
+    Counsellor.age_groups.through,
+):
+    m2m_changed.connect(_counsellor_m2m_changed, sender=_through)
+
+
+@receiver(post_save, sender=Specialization)
+@receiver(post_save, sender=TherapyApproach)
+@receiver(post_save, sender=Language)
+def taxonomy_saved(sender, instance, created, **kwargs):
+    if not created:
+        counsellors_changed(instance.counsellors.values_list("pk", flat=True))
+
+
+@receiver(pre_delete, sender=Specialization)
+@receiver(pre_delete, sender=TherapyApproach)
+@receiver(pre_delete, sender=Language)
+def taxonomy_deleted(sender, instance, **kwargs):
+    counsellors_changed(instance.counsellors.values_list("pk", flat=True))
+
+
+@receiver(post_delete, sender=CounsellorSearchIndex)
+def search_index_deleted(sender, instance, **kwargs):
+    search.remove_documents([instance.pk])
+
+
+@receiver(post_delete, sender=Counsellor)
+def counsellor_deleted(sender, instance, **kwargs):
+    transaction.on_commit(lambda: bump_directory_version([instance.pk]))
+
+
+@receiver(review_stats_changed, sender=ReviewStats)
+def counsellor_ratings_changed(sender, counsellor_ids, **kwargs):
+    # Ratings are copied with a queryset update, so no Counsellor post_save fires.
+    bump_directory_version(counsellor_ids)
+
+
+@receiver(post_save, sender=Certification)
+@receiver(post_delete, sender=Certification)
+def certification_changed(sender, instance, **kwargs):
+    transaction.on_commit(lambda: bump_profile_version([instance.counsellor_id]))
+
+
+# These cover admin edits; bulk writes go through ``slots_changed`` instead.
+@receiver(post_save, sender=CounsellorAvailability)
+@receiver(post_delete, sender=CounsellorAvailability)
+def slot_row_changed(sender, instance, **kwargs):
+    if instance.date < timezone.localdate():
+        # Past days are never served from cache; skipping them keeps purges cheap.
+        return
+
+    def refresh():
+        bump_availability_version([instance.counsellor_id])
+        bump_day_versions(instance.counsellor_id, [instance.date])
+
+    transaction.on_commit(refresh)
+
+
+@receiver(post_save, sender=AvailabilityRule)
+@receiver(post_delete, sender=AvailabilityRule)
+@receiver(post_save, sender=AvailabilityException)
+@receiver(post_delete, sender=AvailabilityException)
+def schedule_row_changed(sender, instance, **kwargs):
+    def refresh():
+        bump_availability_version([instance.counsellor_id])
+        bump_schedule_version([instance.counsellor_id])
+
+    transaction.on_commit(refresh)
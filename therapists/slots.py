@@ -0,0 +1,213 @@
+"""Set-based writes for counsellor availability slots.
+
+Saving a range of slots from the availability editor used to cost one query
+per slot. ``save_slots`` diffs the submitted slots against what is stored and
+applies the difference with one filtered delete, one ``bulk_update`` and one
+``bulk_create`` (upserting on the ``(counsellor, date, start_time)`` unique
+key), so the number of queries no longer grows with the range.
+Weekly rules are replaced wholesale the same way, and ``lock_slot`` persists a
+rule-generated slot at the moment it is booked.
+
+Saves are checked for overlapping slots (and slots closer together than the
+break) with one sorted sweep over the submitted and kept booked slots. On
+PostgreSQL the model's exclusion constraint rejects overlaps that get past
+it, e.g. from concurrent saves.
+"""
+from datetime import datetime, timedelta
+
+from django.db import IntegrityError, transaction
+from django.db.models import Count, Q
+from django.utils import timezone
+
+from therapists.availability import slots_changed
+from therapists.models import AvailabilityException, AvailabilityRule, CounsellorAvailability
+from therapists.rules import generated_slot
+
+
+OVERLAP_CONSTRAINT = "therapists_slot_no_overlap"
+
+
+class SlotOverlapError(ValueError):
+    """Raised when slots overlap; ``conflicts`` holds (date, start, end) pairs that clash."""
+
+    def __init__(self, conflicts):
+        self.conflicts = conflicts
+        super().__init__(f"{len(conflicts)} overlapping slot(s)")
+
+
+def _bounds(slot_date, start_time, end_time):
+    start = datetime.combine(slot_date, start_time)
+    end = datetime.combine(slot_date, end_time)
+    if end <= start:
+        # A slot ending at midnight runs to the end of its day.
+        end += timedelta(days=1)
+    return start, end
+
+
+def find_overlaps(slots, gap_minutes=0):
+    """Pairs of slots that overlap or sit less than ``gap_minutes`` apart.
+
+    ``slots`` are (date, start_time, end_time) tuples. Sorting by start and
+    tracking the latest end seen so far finds every clash in O(n log n).
+    """
+    gap = timedelta(minutes=gap_minutes)
+    conflicts = []
+    latest = None
+    latest_end = None
+    for slot in sorted(slots, key=lambda slot: _bounds(*slot)):
+        start, end = _bounds(*slot)
+        if latest is not None and start < latest_end + gap:
+            conflicts.append((latest, slot))
+        if latest is None or end > latest_end:
+            latest, latest_end = slot, end
+    return conflicts
+
+
+def save_slots(counsellor, slots, range_start, range_end, duration_minutes, break_minutes=0):
+    """Make the counsellor's unbooked slots in [range_start, range_end] match ``slots``.
+
+    ``slots`` is a list of {"date", "start_time", "end_time"} dicts; any outside
+    the range are added without removing anything on their days. Booked slots
+    are never removed. Raises ``SlotOverlapError`` if the result would have slots
+    overlapping or less than ``break_minutes`` apart. Returns (created, updated,
+    deleted) counts.
+    """
+    incoming = {(slot["date"], slot["start_time"]): slot for slot in slots}
+    # Slots may be submitted outside the range, and a slot past midnight reaches into the next
+    # day, so stored slots on the days around every submitted one are checked against too.
+    nearby_days = {range_start - timedelta(days=1), range_end + timedelta(days=1)}
+    nearby_days.update(
+        slot_date + timedelta(days=offset) for slot_date, _start in incoming for offset in (-1, 0, 1)
+    )
+    existing = {
+        (slot.date, slot.start_time): slot
+        for slot in CounsellorAvailability.objects.filter(
+            Q(date__gte=range_start, date__lte=range_end) | Q(date__in=nearby_days),
+            counsellor=counsellor,
+        ).only("id", "date", "start_time", "end_time", "duration_minutes", "is_booked")
+    }
+
+    def in_range(slot_date):
+        return range_start <= slot_date <= range_end
+
+    to_create = []
+    to_update = []
+    now = timezone.now()
+    for key, slot in incoming.items():
+        current = existing.get(key)
+        if current is None:
+            to_create.append(CounsellorAvailability(
+                counsellor=counsellor,
+                date=slot["date"],
+                start_time=slot["start_time"],
+                end_time=slot["end_time"],
+                duration_minutes=duration_minutes,
+            ))
+        elif (current.end_time, current.duration_minutes) != (slot["end_time"], duration_minutes):
+            current.end_time = slot["end_time"]
+            current.duration_minutes = duration_minutes
+            current.updated_at = now
+            to_update.append(current)
+
+    stale_ids = [
+        slot.id for key, slot in existing.items()
+        if key not in incoming and in_range(slot.date) and not slot.is_booked
+    ]
+
+    # Booked slots and slots outside the range stay as they are, so submitted slots must fit around them.
+    submitted = {(slot["date"], slot["start_time"], slot["end_time"]) for slot in incoming.values()}
+    kept = list(submitted)
+    kept.extend(
+        (slot.date, slot.start_time, slot.end_time)
+        for key, slot in existing.items()
+        if key not in incoming and (slot.is_booked or not in_range(slot.date))
+    )
+    # Only clashes involving a submitted slot are this save's doing.
+    conflicts = [pair for pair in find_overlaps(kept, break_minutes) if submitted.intersection(pair)]
+    if conflicts:
+        raise SlotOverlapError(conflicts)
+
+    try:
+        with transaction.atomic():
+            # Delete, then update, then create: the overlap constraint is checked row by row,
+            # so a slot moved within the range must leave before its replacement arrives.
+            deleted = 0
+            if stale_ids:
+                _total, per_model = CounsellorAvailability.objects.filter(pk__in=stale_ids, is_booked=False).delete()
+                deleted = per_model.get(CounsellorAvailability._meta.label, 0)
+            if to_update:
+                CounsellorAvailability.objects.bulk_update(
+                    to_update, ["end_time", "duration_minutes", "updated_at"],
+                )
+            if to_create:
+                # A concurrent save may have inserted the same slot; overwrite it rather than fail.
+                CounsellorAvailability.objects.bulk_create(
+                    to_create,
+                    update_conflicts=True,
+                    unique_fields=["counsellor", "date", "start_time"],
+                    update_fields=["end_time", "duration_minutes", "updated_at"],
+                )
+            if to_create or to_update or deleted:
+                days = {slot.date for slot in to_create + to_update}
+                days.update(key[0] for key, slot in existing.items() if slot.id in stale_ids)
+                slots_changed(counsellor.pk, days)
+    except IntegrityError as exc:
+        # The exclusion constraint caught an overlap the sweep could not see (a concurrent save).
+        if OVERLAP_CONSTRAINT in str(exc):
+            raise SlotOverlapError([]) from exc
+        raise
+
+    return len(to_create), len(to_update), deleted
+
+
+def future_slot_summary(counsellor, today):
+    """Start of the first upcoming slot, end of the last one, and free/total counts of upcoming slots.
+
+    First and last are in (date, start_time) order, as before; the counts come
+    from one aggregate.
+    """
+    upcoming = CounsellorAvailability.objects.filter(counsellor=counsellor, date__gte=today)
+    summary = upcoming.aggregate(
+        total=Count("id"),
+        free=Count("id", filter=Q(is_booked=False)),
+    )
+    summary["first_start"] = summary["last_end"] = None
+    if summary["total"]:
+        summary["first_start"] = upcoming.order_by("date", "start_time").values_list("start_time", flat=True).first()
+        summary["last_end"] = upcoming.order_by("-date", "-start_time").values_list("end_time", flat=True).first()
+    return summary
+
+
+def lock_slot(counsellor, slot_date, start_time):
+    """Lock the slot at this time for booking, persisting it first if a rule generates it.
+
+    Must be called inside a transaction. Returns None when the counsellor has no
+    slot at that time.
+    """
+    slots = CounsellorAvailability.objects.select_for_update()
+    try:
+        return slots.get(counsellor=counsellor, date=slot_date, start_time=start_time)
+    except CounsellorAvailability.DoesNotExist:
+        pass
+
+    slot = generated_slot(counsellor, slot_date, start_time)
+    if slot is None:
+        return None
+    try:
+        with transaction.atomic():
+            slot.save()
+    except IntegrityError:
+        # Persisted by a concurrent booking; lock that row instead.
+        pass
+    return slots.get(counsellor=counsellor, date=slot_date, start_time=start_time)
+
+
+def replace_rules(counsellor, rules, exceptions):
+    """Swap the counsellor's weekly rules and exceptions for the given unsaved instances."""
+    with transaction.atomic():
+        AvailabilityRule.objects.filter(counsellor=counsellor).delete()
+        AvailabilityException.objects.filter(counsellor=counsellor).delete()
+        AvailabilityRule.objects.bulk_create(rules)
+        AvailabilityException.objects.bulk_create(exceptions)
+        slots_changed(counsellor.pk)
+
@@ -1,3 +1,172 @@
-from django.test import TestCase
+from datetime import date, time, timedelta
+from decimal import Decimal
 
-# Create your tests here.
+from django.test import SimpleTestCase, TestCase
+from django.utils import timezone
+
+from accounts.models import Counsellor, User
+from therapists.models import CounsellorAvailability
+from therapists.slots import SlotOverlapError, find_overlaps, save_slots
+
+DAY = date(2030, 1, 7)
+
+
+class FindOverlapsTests(SimpleTestCase):
+    def test_back_to_back_slots_do_not_overlap(self):
+        slots = [(DAY, time(9, 0), time(9, 45)), (DAY, time(9, 45), time(10, 30))]
+
+        self.assertEqual(find_overlaps(slots), [])
+
+    def test_overlapping_slots_are_paired(self):
+        first = (DAY, time(9, 0), time(9, 45))
+        second = (DAY, time(9, 30), time(10, 15))
+
+        self.assertEqual(find_overlaps([second, first]), [(first, second)])
+
+    def test_break_gap_is_enforced(self):
+        first = (DAY, time(9, 0), time(9, 45))
+        second = (DAY, time(9, 50), time(10, 35))
+
+        self.assertEqual(find_overlaps([first, second], gap_minutes=15), [(first, second)])
+        self.assertEqual(find_overlaps([first, second], gap_minutes=5), [])
+
+    def test_slot_ending_at_midnight_runs_to_end_of_day(self):
+        late = (DAY, time(23, 15), time(0, 0))
+        earlier = (DAY, time(22, 45), time(23, 30))
+        next_day = (DAY + timedelta(days=1), time(0, 0), time(0, 45))
+
+        self.assertEqual(find_overlaps([late, earlier]), [(earlier, late)])
+        self.assertEqual(find_overlaps([late, next_day]), [])
+        self.assertEqual(find_overlaps([late, next_day], gap_minutes=5), [(late, next_day)])
+
+    def test_slot_contained_in_a_longer_one_is_found(self):
+        long_slot = (DAY, time(9, 0), time(12, 0))
+        inside = (DAY, time(10, 0), time(10, 30))
+        after = (DAY, time(11, 0), time(11, 30))
+
+        self.assertEqual(find_overlaps([long_slot, inside, after]), [(long_slot, inside), (long_slot, after)])
+
+
+class SaveSlotsTests(TestCase):
+    def setUp(self):
+        user = User.objects.create_user(
+            username="counsellor", email="counsellor@example.com", password="pw",
+            role="counsellor", is_approved=True,
+        )
+        self.counsellor = Counsellor.objects.create(
+            user=user,
+            license_number="L-1",
+            license_type="other",
+            license_authority="Board",
+            license_expiry=date(2030, 1, 1),
+            years_experience=5,
+            highest_degree="phd",
+            university="University",
+            graduation_year=2010,
+            session_fee=Decimal("1000.00"),
+            google_meet_link="https://meet.example.com/room",
+            professional_experience="Experience",
+            about_me="About",
+        )
+        self.day = timezone.localdate() + timedelta(days=5)
+
+    def slot(self, start, end, day=None):
+        return {"date": day or self.day, "start_time": start, "end_time": end}
+
+    def store(self, start, end, day=None, is_booked=False):
+        return CounsellorAvailability.objects.create(
+            counsellor=self.counsellor,
+            date=day or self.day,
+            start_time=start,
+            end_time=end,
+            is_booked=is_booked,
+        )
+
+    def stored(self):
+        return list(
+            CounsellorAvailability.objects.filter(counsellor=self.counsellor)
+            .order_by("date", "start_time")
+            .values_list("date", "start_time", "end_time")
+        )
+
+    def test_diff_creates_updates_and_deletes(self):
+        self.store(time(9, 0), time(9, 45))
+        self.store(time(10, 0), time(10, 45))
+        self.store(time(11, 0), time(11, 45))
+
+        counts = save_slots(
+            self.counsellor,
+            [self.slot(time(9, 0), time(9, 45)), self.slot(time(10, 0), time(11, 0)), self.slot(time(14, 0), time(14, 45))],
+            self.day, self.day, 45,
+        )
+
+        self.assertEqual(counts, (1, 1, 1))
+        self.assertEqual(self.stored(), [
+            (self.day, time(9, 0), time(9, 45)),
+            (self.day, time(10, 0), time(11, 0)),
+            (self.day, time(14, 0), time(14, 45)),
+        ])
+
+    def test_slot_moved_within_the_range_replaces_the_old_one(self):
+        self.store(time(10, 0), time(10, 45))
+
+        save_slots(self.counsellor, [self.slot(time(10, 15), time(11, 0))], self.day, self.day, 45)
+
+        self.assertEqual(self.stored(), [(self.day, time(10, 15), time(11, 0))])
+
+    def test_break_gap_between_submitted_slots(self):
+        slots = [self.slot(time(9, 0), time(9, 45)), self.slot(time(9, 50), time(10, 35))]
+
+        with self.assertRaises(SlotOverlapError) as raised:
+            save_slots(self.counsellor, slots, self.day, self.day, 45, break_minutes=15)
+
+        self.assertEqual(len(raised.exception.conflicts), 1)
+        self.assertEqual(self.stored(), [])
+
+    def test_booked_slots_are_kept_and_checked_against(self):
+        self.store(time(9, 0), time(9, 45), is_booked=True)
+
+        with self.assertRaises(SlotOverlapError):
+            save_slots(self.counsellor, [self.slot(time(9, 30), time(10, 15))], self.day, self.day, 45)
+
+        save_slots(self.counsellor, [self.slot(time(10, 0), time(10, 45))], self.day, self.day, 45, break_minutes=15)
+        self.assertEqual(self.stored(), [
+            (self.day, time(9, 0), time(9, 45)),
+            (self.day, time(10, 0), time(10, 45)),
+        ])
+
+    def test_slot_outside_the_range_is_checked_against_its_day(self):
+        next_day = self.day + timedelta(days=1)
+        self.store(time(9, 0), time(9, 45), day=next_day)
+
+        with self.assertRaises(SlotOverlapError) as raised:
+            save_slots(
+                self.counsellor, [self.slot(time(9, 10), time(9, 55), day=next_day)], self.day, self.day, 45,
+            )
+
+        self.assertEqual(len(raised.exception.conflicts), 1)
+        self.assertEqual(self.stored(), [(next_day, time(9, 0), time(9, 45))])
+
+    def test_slot_outside_the_range_does_not_remove_its_day(self):
+        next_day = self.day + timedelta(days=1)
+        self.store(time(9, 0), time(9, 45), day=next_day)
+
+        save_slots(self.counsellor, [self.slot(time(11, 0), time(11, 45), day=next_day)], self.day, self.day, 45)
+
+        self.assertEqual(self.stored(), [
+            (next_day, time(9, 0), time(9, 45)),
+            (next_day, time(11, 0), time(11, 45)),
+        ])
+
+    def test_slot_ending_at_midnight_is_checked_against_the_next_day(self):
+        next_day = self.day + timedelta(days=1)
+        self.store(time(0, 0), time(0, 45), day=next_day)
+
+        with self.assertRaises(SlotOverlapError):
+            save_slots(self.counsellor, [self.slot(time(23, 15), time(0, 0))], self.day, self.day, 45, break_minutes=5)
+
+        save_slots(self.counsellor, [self.slot(time(23, 15), time(0, 0))], self.day, self.day, 45)
+        self.assertEqual(self.stored(), [
+            (self.day, time(23, 15), time(0, 0)),
+            (next_day, time(0, 0), time(0, 45)),
+        ])
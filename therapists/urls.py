@@ -3,7 +3,11 @@ from .views import *
 
 urlpatterns = [
     path('therapists/', therapist_list , name='therapists'),
+    path('therapists/api/facets/', therapist_facets, name='therapist_facets'),
+    path('therapists/api/autocomplete/', therapist_autocomplete, name='therapist_autocomplete'),
+    path('therapists/api/recommended/', recommended_counsellors, name='recommended_counsellors'),
     path('therapists/<int:counsellor_id>/', counsellor_detail, name='counsellor_detail'),
+    path('therapists/<int:counsellor_id>/reviews/', counsellor_reviews_api, name='counsellor_reviews_api'),
     path('therapists/<int:counsellor_id>/review/submit/', submit_review, name='submit_review'),
     path('review/<int:review_id>/edit/', edit_review, name='edit_review'),
     path('review/<int:review_id>/delete/', delete_review, name='delete_review'),
@@ -15,5 +19,8 @@ urlpatterns = [
     path('therapists/<int:counsellor_id>/dashboard/', counsellor_dashboard, name='counsellor_dashboard_public'),
     path('therapists/manage-slots/', counsellor_manage_slots, name='counsellor_manage_slots'),
     path('therapists/api/availability/', counsellor_availability_api, name='counsellor_availability_api'),
+    path('therapists/api/availability/rules/', counsellor_availability_rules_api, name='counsellor_availability_rules_api'),
     path('therapists/<int:counsellor_id>/availability/', public_counsellor_availability, name='counsellor_public_availability'),
+    path('therapists/<int:counsellor_id>/availability/calendar/', public_counsellor_calendar, name='counsellor_public_calendar'),
+    path('therapists/<int:counsellor_id>/availability/events/', counsellor_slot_events, name='counsellor_slot_events'),
 ]
\ No newline at end of file
@@ -1,168 +1,157 @@
+import asyncio
 import json
 import os
-from datetime import date, datetime, timedelta
+from datetime import date, datetime, time, timedelta
 from decimal import Decimal, InvalidOperation
 
+from django.conf import settings
 from django.contrib import messages
 from django.contrib.auth.decorators import login_required
-from django.core.paginator import Paginator
-from django.db.models import Avg, Q, Sum
-from django.http import JsonResponse
+from django.db import transaction
+from django.db.models import Avg, Sum
+from django.http import Http404, JsonResponse, StreamingHttpResponse
 from django.shortcuts import get_object_or_404, redirect, render
 from django.views.decorators.http import require_http_methods
 
-from accounts.models import Client, Counsellor, Language, Review, Specialization, TherapyApproach
+from accounts.models import AgeGroup, Client, Counsellor, Language, Review, Specialization, TherapyApproach
+from accounts.review_stats import record_review_change, review_state
+from accounts.taxonomy import registry as taxonomy
 from bookings.models import Booking
-from therapists.models import CounsellorAvailability
+from therapists.availability import slots_changed
+from therapists.autocomplete import DEFAULT_LIMIT, suggest
+from therapists.bitmap import DayBitmap
+from therapists.calendar import DEFAULT_CALENDAR_DAYS, MAX_CALENDAR_DAYS, availability_calendar, day_slots
+from therapists import events
+from therapists.directory import ordering_for, parse_filters
+from therapists.facets import facet_counts
+from therapists.listing import build_recommended_listing, counsellor_card, get_listing, recommend
+from therapists.models import AvailabilityException, AvailabilityRule
+from therapists.profile_cache import (
+    PROFILE_TIMEOUT,
+    get_profile,
+    get_review_page,
+    get_review_slice,
+    profile_version,
+    review_paginator,
+)
+from therapists.slots import SlotOverlapError, future_slot_summary, replace_rules, save_slots
 
 def therapist_list(request):
-    therapists = Counsellor.objects.filter(
-        is_active=True,
-        user__is_approved=True
-    ).select_related("user").prefetch_related(
-        "specializations",
-        "languages",
-        "therapy_approaches",
-        "age_groups",
-    )
+    filters = parse_filters(request.GET)
+    ordering = ordering_for(request.GET.get("sort"))
+
+    # Keyset cursors when requested (no COUNT/OFFSET), page numbers otherwise.
+    # Result pages are cached per directory version, see therapists.listing.
+    # "For you" ranking for signed-in clients; see therapists.recommendations.
+    client = getattr(request.user, "client", None) if request.user.is_authenticated else None
+    if request.GET.get("sort") == "recommended" and client is not None:
+        listing = build_recommended_listing(filters, client, page=request.GET.get("page"))
+    elif "cursor" in request.GET:
+        listing = get_listing(filters, ordering, cursor=request.GET.get("cursor"))
+    else:
+        listing = get_listing(filters, ordering, page=request.GET.get("page"))
+    facets = listing["facets"]
+
+    # Provide lists for filter dropdowns / checkboxes (served from the taxonomy
+    # registry) with result counts per option, e.g. "Anxiety (42)"
+    specializations_list = [
+        {"id": spec.id, "name": spec.name, "result_count": facets["specialization"].get(spec.id, 0)}
+        for spec in taxonomy.active(Specialization)
+    ]
+    languages_list = [
+        {"id": language.id, "name": language.name, "result_count": facets["language"].get(language.id, 0)}
+        for language in taxonomy.active(Language)
+    ]
+    approaches_list = taxonomy.active(TherapyApproach)
+    age_groups_list = taxonomy.active(AgeGroup)
 
-    # Search
-    q = request.GET.get("search")
-    if q:
-        therapists = therapists.filter(
-            Q(user__first_name__icontains=q)
-            | Q(user__last_name__icontains=q)
-            | Q(specializations__name__icontains=q)
-            | Q(therapy_approaches__name__icontains=q)
-            | Q(languages__name__icontains=q)
-        ).distinct()
-
-    # Specialization Filter (by id)
-    specialization = request.GET.get("specialization")
-    if specialization:
-        try:
-            spec_id = int(specialization)
-            therapists = therapists.filter(specializations__id=spec_id)
-        except (ValueError, TypeError):
-            pass
+    return render(request, "therapists/therapists.html", {
+        "pagination": listing["pagination"],
+        "cursor_page": listing["cursor_page"],
+        "therapists": listing["cards"],
+        "specializations_list": specializations_list,
+        "languages_list": languages_list,
+        "approaches_list": approaches_list,
+        "age_groups_list": age_groups_list,
+        "facets": facets,
+        "can_recommend": client is not None,
+    })
 
-    # Experience filters
-    min_exp = request.GET.get("min_experience")
-    max_exp = request.GET.get("max_experience")
-    if min_exp:
-        try:
-            therapists = therapists.filter(years_experience__gte=int(min_exp))
-        except ValueError:
-            pass
-    if max_exp:
-        try:
-            therapists = therapists.filter(years_experience__lte=int(max_exp))
-        except ValueError:
-            pass
 
-    # Price filters
-    min_price = request.GET.get("min_price")
-    max_price = request.GET.get("max_price")
-    if min_price:
-        try:
-            therapists = therapists.filter(session_fee__gte=Decimal(min_price))
-        except (InvalidOperation, TypeError):
-            pass
-    if max_price:
-        try:
-            therapists = therapists.filter(session_fee__lte=Decimal(max_price))
-        except (InvalidOperation, TypeError):
-            pass
+@require_http_methods(["GET"])
+def therapist_facets(request):
+    """Per-option result counts for the directory filters as JSON."""
+    facets = facet_counts(parse_filters(request.GET))
+    return JsonResponse({
+        "success": True,
+        "specialization": {str(pk): count for pk, count in facets["specialization"].items()},
+        "language": {str(pk): count for pk, count in facets["language"].items()},
+        "price": facets["price"],
+        "experience": facets["experience"],
+        "rating": facets["rating"],
+    })
 
-    # Rating filter (minimum rating)
-    min_rating = request.GET.get("min_rating")
-    if min_rating:
-        try:
-            therapists = therapists.filter(rating__gte=Decimal(min_rating))
-        except (InvalidOperation, TypeError):
-            pass
 
-    # Language Filter
-    lang = request.GET.get("language")
-    if lang:
-        therapists = therapists.filter(languages__id=lang)
-
-    # Sorting
-    sort = request.GET.get("sort")
-    if sort == "price_low" or sort == "lowest_fee":
-        therapists = therapists.order_by("session_fee")
-    elif sort == "price_high":
-        therapists = therapists.order_by("-session_fee")
-    elif sort == "experience":
-        therapists = therapists.order_by("-years_experience")
-    elif sort == "rating" or sort == "highest_rated":
-        therapists = therapists.order_by("-rating")
-    elif sort == "newest":
-        therapists = therapists.order_by("-created_at")
-    else:
-        therapists = therapists.order_by("user__first_name")
+@require_http_methods(["GET"])
+def therapist_autocomplete(request):
+    """Typeahead suggestions for the directory search box as JSON."""
+    query = request.GET.get("q", "")
+    try:
+        limit = int(request.GET.get("limit", DEFAULT_LIMIT))
+    except ValueError:
+        limit = DEFAULT_LIMIT
+    return JsonResponse({
+        "success": True,
+        "query": query,
+        "results": suggest(query, limit),
+    })
 
-    # Pagination
-    paginator = Paginator(therapists, 9)
-    page_number = request.GET.get("page")
-    page_obj = paginator.get_page(page_number)
 
-    # Provide lists for filter dropdowns / checkboxes
-    specializations_list = Specialization.objects.filter(is_active=True).order_by("name")
-    languages_list = Language.objects.filter(is_active=True).order_by("name")
-    approaches_list = TherapyApproach.objects.filter(is_active=True).order_by("name")
+@login_required
+@require_http_methods(["GET"])
+def recommended_counsellors(request):
+    """Best-matching counsellors for the signed-in client as JSON."""
+    client = getattr(request.user, "client", None)
+    if client is None:
+        return JsonResponse({"success": False, "error": "Recommendations are only available to clients."}, status=403)
 
-    return render(request, "therapists/therapists.html", {
-        "page_obj": page_obj,
-        "therapists": page_obj.object_list,
-        "specializations_list": specializations_list,
-        "languages_list": languages_list,
-        "approaches_list": approaches_list,
-    })
+    try:
+        limit = max(1, min(int(request.GET.get("limit", 6)), 50))
+    except ValueError:
+        limit = 6
+    ranked_ids, scores = recommend(parse_filters(request.GET), client)
+    ranked_ids, scores = ranked_ids[:limit], scores[:limit]
+
+    counsellors = Counsellor.objects.select_related("user").prefetch_related("specializations").in_bulk(ranked_ids)
+    results = []
+    for pk, score in zip(ranked_ids, scores):
+        if pk in counsellors:
+            card = counsellor_card(counsellors[pk])
+            card["match_score"] = round(score, 4)
+            results.append(card)
+    return JsonResponse({"success": True, "results": results})
 
 
 def counsellor_detail(request, counsellor_id):
     """View for displaying a single counsellor's detailed profile"""
-    counsellor = get_object_or_404(
-        Counsellor.objects.select_related("user").prefetch_related(
-            "specializations",
-            "languages",
-            "therapy_approaches",
-            "age_groups",
-            "certifications"
-        ),
-        user_id=counsellor_id,
-        is_active=True,
-        user__is_approved=True
-    )
+    # Profile data and review pages are cached under the profile version,
+    # see therapists.profile_cache; only per-user pieces are looked up live.
+    version = profile_version(counsellor_id)
+    if version is None:
+        raise Http404("Counsellor not found.")
+    profile = get_profile(counsellor_id, version)
+    counsellor = profile["counsellor"]
+    review_stats = profile["review_stats"]
+    reviews_page_obj = get_review_page(counsellor, review_stats, version, request.GET.get('reviews_page', 1))
+    # "Load more" continues from the first page through the JSON reviews API
+    reviews_next_cursor = None
+    if reviews_page_obj.number == 1 and reviews_page_obj.has_next():
+        reviews_next_cursor = review_paginator(counsellor.pk).encode_cursor(reviews_page_obj.object_list[-1], "n")
     
-    # Get reviews for this counsellor
-    reviews = Review.objects.filter(
-        counsellor=counsellor,
-        is_published=True
-    ).select_related('client__user').order_by('-created_at')
-    
-    # Pagination for reviews
-    reviews_paginator = Paginator(reviews, 5)
-    reviews_page = request.GET.get('reviews_page', 1)
-    reviews_page_obj = reviews_paginator.get_page(reviews_page)
-    
-    # Calculate rating distribution
-    rating_distribution = {
-        5: reviews.filter(rating=5).count(),
-        4: reviews.filter(rating=4).count(),
-        3: reviews.filter(rating=3).count(),
-        2: reviews.filter(rating=2).count(),
-        1: reviews.filter(rating=1).count(),
-    }
-    
-    total_reviews = reviews.count()
-    rating_percentages = {}
-    for rating, count in rating_distribution.items():
-        if total_reviews > 0:
-            rating_percentages[rating] = round((count / total_reviews) * 100)
-        else:
-            rating_percentages[rating] = 0
+    # Rating distribution comes from the maintained stats row
+    rating_distribution = review_stats.distribution()
+    rating_percentages = review_stats.percentages()
+    total_reviews = review_stats.review_count
     
     # Check if current user has already reviewed this counsellor
     user_has_reviewed = False
@@ -188,6 +177,35 @@ def counsellor_detail(request, counsellor_id):
         "user_review": user_review,
         "min_booking_date": date.today() + timedelta(days=booking_lead_time_days),
         "booking_lead_time_days": booking_lead_time_days,
+        "reviews_next_cursor": reviews_next_cursor,
+        "profile_version": version,
+        "profile_cache_timeout": PROFILE_TIMEOUT,
+    })
+
+
+@require_http_methods(["GET"])
+def counsellor_reviews_api(request, counsellor_id):
+    """Published reviews for a counsellor as JSON, newest first, with keyset cursors."""
+    if not Counsellor.objects.filter(user_id=counsellor_id, is_active=True, user__is_approved=True).exists():
+        return JsonResponse({'success': False, 'error': 'Counsellor not found.'}, status=404)
+
+    try:
+        limit = max(1, min(int(request.GET.get('limit', 5)), 50))
+    except ValueError:
+        limit = 5
+    review_slice = get_review_slice(counsellor_id, request.GET.get('cursor'), limit)
+
+    own_client_id = request.user.pk if request.user.is_authenticated and hasattr(request.user, 'client') else None
+    reviews = []
+    for review in review_slice["reviews"]:
+        review = dict(review)
+        review["is_own"] = review.pop("client_id") == own_client_id
+        reviews.append(review)
+    return JsonResponse({
+        'success': True,
+        'reviews': reviews,
+        'next_cursor': review_slice["next_cursor"],
+        'has_next': review_slice["next_cursor"] is not None,
     })
 
 
@@ -247,19 +265,18 @@ def submit_review(request, counsellor_id):
             messages.error(request, error)
         return redirect('counsellor_detail', counsellor_id=counsellor_id)
     
-    # Create the review
-    review = Review.objects.create(
-        counsellor=counsellor,
-        client=request.user.client,
-        rating=rating,
-        title=title,
-        content=content,
-        is_verified=False,  # Admin needs to verify
-        is_published=True   # Publish immediately, but mark as unverified
-    )
-    
-    # Update counsellor's rating and review count
-    update_counsellor_rating(counsellor)
+    # Create the review and count it in the counsellor's stats
+    with transaction.atomic():
+        review = Review.objects.create(
+            counsellor=counsellor,
+            client=request.user.client,
+            rating=rating,
+            title=title,
+            content=content,
+            is_verified=False,  # Admin needs to verify
+            is_published=True   # Publish immediately, but mark as unverified
+        )
+        record_review_change(after=review_state(review))
     
     messages.success(request, 'Thank you for your review! It has been submitted successfully.')
     return redirect('counsellor_detail', counsellor_id=counsellor_id)
@@ -311,15 +328,20 @@ def edit_review(request, review_id):
             messages.error(request, error)
         return redirect('counsellor_detail', counsellor_id=review.counsellor.user_id)
     
-    # Update the review
-    review.rating = rating
-    review.title = title
-    review.content = content
-    review.is_verified = False  # Reset verification status
-    review.save()
-    
-    # Update counsellor's rating
-    update_counsellor_rating(review.counsellor)
+    # Update the review and move its rating in the counsellor's stats
+    with transaction.atomic():
+        # Lock the row so a concurrent edit cannot apply its delta from the same old state
+        review = Review.objects.select_for_update().filter(pk=review.pk).first()
+        if review is None:
+            messages.error(request, 'This review no longer exists.')
+            return redirect('therapists')
+        before = review_state(review)
+        review.rating = rating
+        review.title = title
+        review.content = content
+        review.is_verified = False  # Reset verification status
+        review.save()
+        record_review_change(before, review_state(review))
     
     messages.success(request, 'Your review has been updated successfully.')
     return redirect('counsellor_detail', counsellor_id=review.counsellor.user_id)
@@ -342,36 +364,19 @@ def delete_review(request, review_id):
     counsellor = review.counsellor
     counsellor_id = counsellor.user_id
     
-    # Delete the review
-    review.delete()
-    
-    # Update counsellor's rating
-    update_counsellor_rating(counsellor)
+    # Delete the review and drop it from the counsellor's stats
+    with transaction.atomic():
+        # A double-submitted delete finds the row gone and leaves the stats alone
+        review = Review.objects.select_for_update().filter(pk=review.pk).first()
+        if review is not None:
+            before = review_state(review)
+            review.delete()
+            record_review_change(before)
     
     messages.success(request, 'Your review has been deleted successfully.')
     return redirect('counsellor_detail', counsellor_id=counsellor_id)
 
 
-def update_counsellor_rating(counsellor):
-    """Helper function to update counsellor's average rating and review count"""
-    reviews = Review.objects.filter(
-        counsellor=counsellor,
-        is_published=True
-    )
-    
-    total_reviews = reviews.count()
-    
-    if total_reviews > 0:
-        avg_rating = reviews.aggregate(Avg('rating'))['rating__avg']
-        counsellor.rating = round(avg_rating, 2)
-        counsellor.total_reviews = total_reviews
-    else:
-        counsellor.rating = 0.00
-        counsellor.total_reviews = 0
-    
-    counsellor.save()
-
-
 
 @login_required
 def counsellor_dashboard(request, counsellor_id=None):
@@ -684,6 +689,15 @@ def _serialize_slot(slot):
     }
 
 
+def _encode_days(slots):
+    """{date: DayBitmap wire form} for a slot queryset, read as plain rows."""
+    by_day = {}
+    for slot_date, start_time, end_time, is_booked in slots.values_list("date", "start_time", "end_time", "is_booked"):
+        by_day.setdefault(slot_date, []).append((start_time, end_time, is_booked))
+
+    return {slot_date.isoformat(): DayBitmap.from_spans(spans).encode() for slot_date, spans in by_day.items()}
+
+
 @login_required
 @require_http_methods(["GET", "POST"])
 def counsellor_availability_api(request):
@@ -702,16 +716,19 @@ def counsellor_availability_api(request):
         if range_end:
             slots_qs = slots_qs.filter(date__lte=range_end)
 
-        slots_data = [_serialize_slot(slot) for slot in slots_qs]
-        return JsonResponse({
+        response = {
             "success": True,
-            "slots": slots_data,
             "session_duration": counsellor.default_session_duration,
             "break_duration": counsellor.default_break_duration,
             "profile_visible": counsellor.is_available,
             "start_time": counsellor.available_from.strftime("%H:%M") if counsellor.available_from else "09:00",
             "end_time": counsellor.available_to.strftime("%H:%M") if counsellor.available_to else "18:00",
-        })
+        }
+        if request.GET.get("format") == "bitmap":
+            response["days"] = _encode_days(slots_qs)
+        else:
+            response["slots"] = [_serialize_slot(slot) for slot in slots_qs]
+        return JsonResponse(response)
 
     try:
         payload = json.loads(request.body.decode("utf-8"))
@@ -719,7 +736,9 @@ def counsellor_availability_api(request):
         return JsonResponse({'success': False, 'error': 'Invalid payload.'}, status=400)
 
     session_duration = int(payload.get("session_duration") or counsellor.default_session_duration or 45)
-    break_duration = int(payload.get("break_duration") or counsellor.default_break_duration or 5)
+    break_duration = payload.get("break_duration")
+    # An explicit 0 means back-to-back sessions are allowed.
+    break_duration = int(break_duration) if break_duration not in (None, "") else int(counsellor.default_break_duration or 5)
     profile_visible = bool(payload.get("profile_visible", True))
     slots_payload = payload.get("slots", [])
     range_start = _parse_iso_date(payload.get("range_start"))
@@ -751,6 +770,11 @@ def counsellor_availability_api(request):
 
         calculated_end = (datetime.combine(slot_date, slot_start) + timedelta(minutes=session_duration)).time()
         slot_end = slot_end or calculated_end
+        if slot_end <= slot_start and slot_end != time.min:
+            return JsonResponse({
+                'success': False,
+                'error': f'The slot starting {slot_start.strftime("%H:%M")} on {slot_date.isoformat()} must end after it starts.',
+            }, status=400)
 
         valid_slots.append({
             "date": slot_date,
@@ -758,42 +782,39 @@ def counsellor_availability_api(request):
             "end_time": slot_end,
         })
 
-    existing_qs = counsellor.availability_slots.filter(date__gte=range_start, date__lte=range_end)
-    existing_map = {(slot.date, slot.start_time): slot for slot in existing_qs}
-    incoming_keys = {(slot["date"], slot["start_time"]) for slot in valid_slots}
-
-    for slot in valid_slots:
-        slot_obj = existing_map.get((slot["date"], slot["start_time"]))
-        if slot_obj:
-            updates = []
-            if slot_obj.end_time != slot["end_time"]:
-                slot_obj.end_time = slot["end_time"]
-                updates.append("end_time")
-            if slot_obj.duration_minutes != session_duration:
-                slot_obj.duration_minutes = session_duration
-                updates.append("duration_minutes")
-            if updates:
-                slot_obj.save(update_fields=updates + ["updated_at"])
-        else:
-            CounsellorAvailability.objects.create(
-                counsellor=counsellor,
-                date=slot["date"],
-                start_time=slot["start_time"],
-                end_time=slot["end_time"],
-                duration_minutes=session_duration,
-            )
-
-    for key, slot in existing_map.items():
-        if key not in incoming_keys and not slot.is_booked:
-            slot.delete()
+    # Apply the diff set-wise (see therapists.slots) and summarize in one aggregate
+    try:
+        save_slots(counsellor, valid_slots, range_start, range_end, session_duration, break_minutes=break_duration)
+    except SlotOverlapError as exc:
+        return JsonResponse({
+            'success': False,
+            'error': 'Some slots overlap or leave less than the break between sessions.',
+            'conflicts': [
+                {
+                    "date": first[0].isoformat(),
+                    "first": [first[1].strftime("%H:%M"), first[2].strftime("%H:%M")],
+                    "second": [second[1].strftime("%H:%M"), second[2].strftime("%H:%M")],
+                }
+                for first, second in exc.conflicts
+            ],
+        }, status=400)
+    events.publish(
+        counsellor.pk,
+        events.AVAILABILITY_CHANGED,
+        start=range_start.isoformat(),
+        end=range_end.isoformat(),
+    )
 
-    future_slots = counsellor.availability_slots.filter(date__gte=today).order_by("date", "start_time")
-    has_future_availability = future_slots.filter(is_booked=False).exists()
+    summary = future_slot_summary(counsellor, today)
+    has_future_availability = summary["free"] > 0
 
-    if future_slots.exists():
-        counsellor.available_from = future_slots.first().start_time
-        counsellor.available_to = future_slots.last().end_time
+    if summary["total"]:
+        counsellor.available_from = summary["first_start"]
+        counsellor.available_to = summary["last_end"]
 
+    durations_changed = (
+        (counsellor.default_session_duration, counsellor.default_break_duration) != (session_duration, break_duration)
+    )
     counsellor.default_session_duration = session_duration
     counsellor.default_break_duration = break_duration
     counsellor.is_available = profile_visible and has_future_availability
@@ -805,6 +826,9 @@ def counsellor_availability_api(request):
         "is_available",
         "updated_at",
     ])
+    if durations_changed:
+        # Rule-generated slots are cut from these, so every cached day and the summary may be stale.
+        slots_changed(counsellor.pk)
 
     refreshed_slots = counsellor.availability_slots.filter(date__gte=range_start, date__lte=range_end)
     return JsonResponse({
@@ -818,6 +842,110 @@ def counsellor_availability_api(request):
     })
 
 
+def _serialize_rule(rule):
+    return {
+        "id": rule.id,
+        "weekday": rule.weekday,
+        "start_time": rule.start_time.strftime("%H:%M"),
+        "end_time": rule.end_time.strftime("%H:%M"),
+        "session_minutes": rule.session_minutes,
+        "break_minutes": rule.break_minutes,
+        "valid_from": rule.valid_from.isoformat() if rule.valid_from else None,
+        "valid_until": rule.valid_until.isoformat() if rule.valid_until else None,
+        "is_active": rule.is_active,
+    }
+
+
+def _serialize_exception(exception):
+    return {
+        "id": exception.id,
+        "date": exception.date.isoformat(),
+        "start_time": exception.start_time.strftime("%H:%M") if exception.start_time else None,
+        "end_time": exception.end_time.strftime("%H:%M") if exception.end_time else None,
+        "reason": exception.reason,
+    }
+
+
+def _parse_minutes(value):
+    if value in (None, ""):
+        return None
+    try:
+        minutes = int(value)
+    except (TypeError, ValueError):
+        return None
+    return minutes if minutes >= 0 else None
+
+
+@login_required
+@require_http_methods(["GET", "POST"])
+def counsellor_availability_rules_api(request):
+    """Read or replace the logged-in counsellor's weekly availability rules and exceptions."""
+    if not hasattr(request.user, 'counsellor'):
+        return JsonResponse({'success': False, 'error': 'Only counsellors can manage availability.'}, status=403)
+
+    counsellor = request.user.counsellor
+
+    if request.method == "POST":
+        try:
+            payload = json.loads(request.body.decode("utf-8"))
+        except json.JSONDecodeError:
+            return JsonResponse({'success': False, 'error': 'Invalid payload.'}, status=400)
+
+        rules = []
+        for item in payload.get("rules", []):
+            weekday = item.get("weekday")
+            start_time = _parse_time_value(item.get("start_time"))
+            end_time = _parse_time_value(item.get("end_time"))
+            # bool is an int subclass and 1.0 == 1, so `in range(7)` alone would accept True or 1.0
+            valid_weekday = type(weekday) is int and 0 <= weekday <= 6
+            if not valid_weekday or not start_time or not end_time or end_time <= start_time:
+                return JsonResponse({'success': False, 'error': 'Each rule needs a weekday (0-6) and a valid time window.'}, status=400)
+            is_active = item.get("is_active", True)
+            if not isinstance(is_active, bool):
+                return JsonResponse({'success': False, 'error': 'is_active must be true or false.'}, status=400)
+            rules.append(AvailabilityRule(
+                counsellor=counsellor,
+                weekday=weekday,
+                start_time=start_time,
+                end_time=end_time,
+                session_minutes=_parse_minutes(item.get("session_minutes")) or None,
+                break_minutes=_parse_minutes(item.get("break_minutes")),
+                valid_from=_parse_iso_date(item.get("valid_from")),
+                valid_until=_parse_iso_date(item.get("valid_until")),
+                is_active=is_active,
+            ))
+
+        exceptions = []
+        for item in payload.get("exceptions", []):
+            exception_date = _parse_iso_date(item.get("date"))
+            start_time = _parse_time_value(item.get("start_time"))
+            end_time = _parse_time_value(item.get("end_time"))
+            if not exception_date or bool(start_time) != bool(end_time) or (start_time and end_time <= start_time):
+                return JsonResponse({'success': False, 'error': 'Each exception needs a date and, optionally, a valid time window.'}, status=400)
+            exceptions.append(AvailabilityException(
+                counsellor=counsellor,
+                date=exception_date,
+                start_time=start_time,
+                end_time=end_time,
+                reason=(item.get("reason") or "")[:255],
+            ))
+
+        replace_rules(counsellor, rules, exceptions)
+        # Rules can move any day, so no range: the page reloads everything.
+        events.publish(counsellor.pk, events.AVAILABILITY_CHANGED)
+
+    return JsonResponse({
+        "success": True,
+        "rules": [_serialize_rule(rule) for rule in counsellor.availability_rules.all()],
+        "exceptions": [
+            _serialize_exception(exception)
+            for exception in counsellor.availability_exceptions.filter(date__gte=date.today())
+        ],
+        "session_duration": counsellor.default_session_duration,
+        "break_duration": counsellor.default_break_duration,
+    })
+
+
 @login_required
 def counsellor_manage_slots(request):
     """Render the counsellor weekly availability management page.
@@ -861,14 +989,115 @@ def public_counsellor_availability(request, counsellor_id):
     if selected_date < min_booking_date:
         return JsonResponse({'success': False, 'error': 'Appointments must be booked at least 3 days in advance.'}, status=400)
 
-    slots = counsellor.availability_slots.filter(
-        date=selected_date,
-        is_booked=False,
-    ).order_by("start_time")
+    # Stored slots merged over those generated from weekly rules, cached per day
+    slots = day_slots(counsellor, selected_date)
 
-    return JsonResponse({
+    response = {
         "success": True,
-        "slots": [_serialize_slot(slot) for slot in slots],
         "session_duration": counsellor.default_session_duration,
         "min_booking_date": min_booking_date.isoformat(),
-    })
+    }
+    if request.GET.get("format") == "bitmap":
+        response["bitmap"] = DayBitmap.from_slots(slots).encode()
+    else:
+        response["slots"] = [_serialize_slot(slot) for slot in slots]
+    return JsonResponse(response)
+
+
+@require_http_methods(["GET"])
+def public_counsellor_calendar(request, counsellor_id):
+    """Free-slot counts per day (and optionally the slots) for up to MAX_CALENDAR_DAYS days."""
+    counsellor = get_object_or_404(
+        Counsellor,
+        user_id=counsellor_id,
+        is_active=True,
+        user__is_approved=True,
+    )
+
+    min_booking_date = date.today() + timedelta(days=3)
+    start = _parse_iso_date(request.GET.get("start")) or min_booking_date
+    start = max(start, min_booking_date)
+    end = _parse_iso_date(request.GET.get("end")) or start + timedelta(days=DEFAULT_CALENDAR_DAYS - 1)
+    if end < start:
+        return JsonResponse({'success': False, 'error': 'The end date must not be before the start date.'}, status=400)
+    if (end - start).days + 1 > MAX_CALENDAR_DAYS:
+        return JsonResponse({'success': False, 'error': f'Please request at most {MAX_CALENDAR_DAYS} days.'}, status=400)
+
+    include_slots = request.GET.get("slots") in ("1", "true")
+    calendar = availability_calendar(counsellor, start, end, include_slots=include_slots)
+
+    response = {
+        "success": True,
+        "start": start.isoformat(),
+        "end": end.isoformat(),
+        "days": [
+            {"date": day["date"].isoformat(), "free": day["free"], "total": day["total"]}
+            for day in calendar["days"]
+        ],
+        "session_duration": counsellor.default_session_duration,
+        "min_booking_date": min_booking_date.isoformat(),
+    }
+    if include_slots:
+        response["slots"] = {
+            day.isoformat(): [_serialize_slot(slot) for slot in slots]
+            for day, slots in calendar["slots"].items()
+        }
+    return JsonResponse(response)
+
+
+def _sse(event_type, data, event_id=None):
+    lines = [f"id: {event_id}"] if event_id is not None else []
+    lines += [f"event: {event_type}", f"data: {json.dumps(data)}"]
+    return "\n".join(lines) + "\n\n"
+
+
+@require_http_methods(["GET"])
+async def counsellor_slot_events(request, counsellor_id):
+    """Server-sent events for a counsellor's slots being booked, released or edited.
+
+    Meant to be served by the ASGI application; each stream closes after
+    ``events.STREAM_SECONDS`` and the browser reconnects with ``Last-Event-ID``.
+    Answers 503 on a per-process cache outside DEBUG, where the stream would
+    miss events published by other workers.
+    """
+    if not settings.DEBUG and not events.cache_is_shared():
+        return JsonResponse({"error": "Live slot updates are not available."}, status=503)
+
+    exists = await Counsellor.objects.filter(
+        user_id=counsellor_id,
+        is_active=True,
+        user__is_approved=True,
+    ).aexists()
+    if not exists:
+        raise Http404("Counsellor not found")
+
+    try:
+        last_id = int(request.headers.get("Last-Event-ID", ""))
+    except ValueError:
+        last_id = None
+
+    async def stream():
+        loop = asyncio.get_running_loop()
+        last = last_id if last_id is not None else await events.current_sequence(counsellor_id)
+        closes_at = loop.time() + events.STREAM_SECONDS
+        next_heartbeat = loop.time() + events.HEARTBEAT_SECONDS
+        yield f"retry: {events.POLL_SECONDS * 3000}\n\n"
+        while loop.time() < closes_at:
+            found, lost, latest = await events.events_since(counsellor_id, last)
+            if lost:
+                yield _sse("reload", {}, event_id=latest)
+            for sequence, event in found:
+                yield _sse(event["type"], event, event_id=sequence)
+            if found or lost:
+                last = latest
+                next_heartbeat = loop.time() + events.HEARTBEAT_SECONDS
+            elif loop.time() >= next_heartbeat:
+                yield ": keep-alive\n\n"
+                next_heartbeat = loop.time() + events.HEARTBEAT_SECONDS
+            await asyncio.sleep(events.POLL_SECONDS)
+
+    response = StreamingHttpResponse(stream(), content_type="text/event-stream")
+    response["Cache-Control"] = "no-cache"
+    # Stop nginx from buffering the stream.
+    response["X-Accel-Buffering"] = "no"
+    return response